@@ -0,0 +1,794 @@
+"""
+acquisition.py
+
+asyncio-Kern der Datenerfassung, den waage.py und app_2.py einbetten.
+
+Die Erfassung ist eine Pipeline aus drei Stufen, verbunden über begrenzte
+asyncio-Queues:
+
+    Transport (ein Task pro Board)  ->  Dekodierung  ->  Senken (ein Task pro Senke)
+    SerialTransport / FakeTransport     Text/Frames      CsvRowSink, CallbackSink, ...
+
+Transporte liefern rohe Bytes mit Empfangszeitpunkt. Unter Linux/macOS wird der
+Dateideskriptor des Ports per loop.add_reader() direkt in der Event-Schleife
+überwacht (ein Thread für alle Ports). Unter Windows haben COM-Ports keinen
+selektierbaren Deskriptor; dort liest jedes Gerät blockierend mit Timeout in
+einem Executor-Thread. Reconnects laufen mit Backoff im Transport selbst.
+
+Die Dekodierstufe hält pro Board den Zustand (angefangene Zeile bzw.
+angefangenes Frame) und verteilt fertige Batches von StampedSample an alle
+Senken. Senken mit Datei-I/O (ThreadedSink: CSV, Pyramide, Spaltenformat)
+schreiben in einem eigenen Thread, nicht in der Event-Schleife. Ist eine Senke zu langsam, füllt sich ihre Queue, die Dekodierung
+wartet, die Roh-Queue läuft voll und die Transporte hören auf zu lesen; bis
+dahin puffert das Betriebssystem die Bytes. Es wird nichts verworfen.
+
+Reihenfolge: Die Samples eines Boards kommen immer in seiner eigenen
+Reihenfolge an. Zwischen den Boards gilt ohne `reorder_window` die
+Empfangsreihenfolge der Blöcke; bei Textzeilen (Zeitstempel = Empfang) ist das
+zugleich die Zeitfolge, bei binären Boards mit eigener Uhr nicht unbedingt.
+Mit `reorder_window` (Sekunden) sortiert ein TimeMerger die Samples aller
+Boards über dieses Fenster nach Zeitstempel; alles kommt dafür um das Fenster
+später bei den Senken an. Samples, die noch später eintreffen, werden sofort
+weitergegeben und in TimeMerger.late gezählt.
+
+stop() lässt die Transporte enden und die Queues leerlaufen, sodass alle
+bereits empfangenen Samples noch bei den Senken ankommen. Hängt eine Stufe
+länger als `timeout`, werden die Tasks abgebrochen.
+
+Beispiel (asyncio):
+    core = AcquisitionCore(
+        [DeviceConfig("links_platte", "/dev/ttyUSB0"), DeviceConfig("rechts_platte", "/dev/ttyUSB1")],
+        [CallbackSink(print)],
+    )
+    await core.start()
+    ...
+    await core.stop()
+
+Beispiel (aus synchronem Code, z. B. Dash):
+    runner = AcquisitionThread(core).start()
+    ...
+    runner.stop()
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from binary_protocol import DeviceClock, FrameDecoder
+from line_decoder import LEFT, RIGHT, LineDecoder
+from serial_reader import ChunkedLineReader
+from telemetry import DEBUG_LOG, REGISTRY, SampledLog
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+_STOP = object()
+
+# Fehler in der Dekodierstufe: wiederholen sich meist pro Block, also gedrosselt ausgeben
+ERROR_LOG = SampledLog(per_s=1.0, enabled=True, prefix="[ERROR]")
+
+
+@dataclass
+class DeviceConfig:
+    """
+    name:     Name des Boards, wird den Kanalnamen vorangestellt.
+    port:     z. B. COM11 oder /dev/ttyUSB0.
+    channels: Umbenennung der Kanäle, z. B. {"Left": "Platte1 Ferse"}.
+              Ohne Eintrag heißt ein Kanal "<name>/<Left|Right>".
+    scale:    Faktor für die Werte der Textzeilen (siehe LineDecoder).
+    protocol: "text" (Firmware-Zeilen) oder "binary" (siehe binary_protocol.py).
+    """
+
+    name: str
+    port: str
+    baudrate: int = 115200
+    channels: dict = field(default_factory=dict)
+    scale: float = 1.0
+    protocol: str = "text"
+
+    def channel_name(self, channel: str) -> str:
+        return self.channels.get(channel, f"{self.name}/{channel}")
+
+
+class StampedSample(NamedTuple):
+    t: float       # Unix-Zeit beim Empfang (binär: aus der Board-Uhr)
+    device: str
+    channel: str   # Ausgabename, siehe DeviceConfig.channel_name()
+    value: float
+
+
+class RawChunk(NamedTuple):
+    t: float       # Empfangszeitpunkt
+    source: int    # Index des Transports
+    data: bytes    # None: neue Verbindung, Dekoderzustand verwerfen
+
+
+@dataclass
+class DeviceStatus:
+    connected: bool = False
+    reconnects: int = 0
+    samples: int = 0
+    decode_errors: int = 0  # verworfene Blöcke (Fehler in decoder.feed oder process)
+    last_error: str = ""
+
+
+# ------------------------------------------------------------
+# Stufe 1: Transporte
+# ------------------------------------------------------------
+class SerialTransport:
+    """Ein Board: verbinden, rohe Bytes lesen, bei Fehlern neu verbinden."""
+
+    RECONNECT_MIN_S = 0.5
+    RECONNECT_MAX_S = 5.0
+    READ_TIMEOUT_S = 0.2  # nur für den Executor-Pfad (Windows)
+    MAX_CHUNK = 65536
+
+    def __init__(self, config: DeviceConfig):
+        self.config = config
+        self.status = DeviceStatus()
+
+    def _open(self):
+        if serial is None:
+            raise RuntimeError("pyserial ist nicht installiert")
+        return serial.Serial(self.config.port, self.config.baudrate, timeout=self.READ_TIMEOUT_S)
+
+    async def run(self, source: int, queue: asyncio.Queue, stop: asyncio.Event):
+        """Läuft bis stop gesetzt ist; RawChunks gehen in queue."""
+        loop = asyncio.get_running_loop()
+        delay = self.RECONNECT_MIN_S
+        while not stop.is_set():
+            try:
+                port = await loop.run_in_executor(None, self._open)
+            except Exception as err:
+                self.status.last_error = str(err)
+                await _sleep_or_stop(stop, delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_S)
+                continue
+
+            self.status.connected = True
+            delay = self.RECONNECT_MIN_S
+            print(f"[INFO] {self.config.name}: verbunden mit {self.config.port}")
+            await queue.put(RawChunk(time.time(), source, None))
+            try:
+                if _selectable(port):
+                    await self._read_selector(port, source, queue, stop)
+                else:
+                    await self._read_executor(port, source, queue, stop)
+            except Exception as err:
+                self.status.last_error = str(err)
+                print(f"[WARN] {self.config.name}: Verbindung verloren ({err}), verbinde neu...")
+            finally:
+                self.status.connected = False
+                try:
+                    port.close()
+                except Exception:
+                    pass
+            if not stop.is_set():
+                self.status.reconnects += 1
+                await _sleep_or_stop(stop, delay)
+
+    async def _read_selector(self, port, source, queue, stop):
+        """Event-getrieben: die Schleife meldet, wann der Port lesbar ist."""
+        loop = asyncio.get_running_loop()
+        port.timeout = 0  # nicht blockierend, gelesen wird nur nach Readiness
+        failed = loop.create_future()
+        pending = []  # put(), das auf Platz in der Queue wartet
+
+        def on_readable():
+            try:
+                data = port.read(min(max(1, port.in_waiting), self.MAX_CHUNK))
+            except Exception as err:
+                if not failed.done():
+                    failed.set_exception(err)
+                return
+            if not data:
+                return
+            chunk = RawChunk(time.time(), source, data)
+            if queue.full():
+                # Back-Pressure: Port nicht mehr überwachen, bis wieder Platz ist;
+                # bis dahin puffert das Betriebssystem die Bytes
+                loop.remove_reader(fd)
+                resume = asyncio.ensure_future(queue.put(chunk))
+                resume.add_done_callback(
+                    lambda _: failed.done() or stop.is_set() or loop.add_reader(fd, on_readable)
+                )
+                pending[:] = [resume]
+            else:
+                queue.put_nowait(chunk)
+
+        fd = port.fileno()
+        loop.add_reader(fd, on_readable)
+        stop_wait = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.wait({failed, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if failed.done():
+                failed.result()  # Fehler weiterreichen -> Reconnect
+        finally:
+            stop_wait.cancel()
+            loop.remove_reader(fd)
+            if pending and not pending[0].done():
+                await pending[0]  # den bereits gelesenen Block nicht verlieren
+
+    async def _read_executor(self, port, source, queue, stop):
+        """Blockierendes Lesen mit Timeout in einem Thread (COM-Ports unter Windows)."""
+        loop = asyncio.get_running_loop()
+
+        def read():
+            return port.read(min(max(1, port.in_waiting), self.MAX_CHUNK))
+
+        while not stop.is_set():
+            data = await loop.run_in_executor(None, read)
+            if data:
+                await queue.put(RawChunk(time.time(), source, data))
+
+
+class FakeTransport:
+    """
+    Erzeugt Firmware-Zeilen aus einem Sinus (abwechselnd links/rechts), damit
+    auch ohne Board der komplette Weg über die Dekodierung getestet wird.
+    """
+
+    def __init__(self, config: DeviceConfig, interval_s: float = 0.2):
+        self.config = config
+        self.interval_s = interval_s
+        self.status = DeviceStatus()
+
+    def _line(self, i: int) -> bytes:
+        value = round(math.sin(i / 10) + 0.5 * math.sin(i / 5), 2)
+        side = "links" if i % 2 == 0 else "rechts"
+        return f"Gewicht {side}: {value / self.config.scale:.2f} kg\r\n".encode()
+
+    async def run(self, source: int, queue: asyncio.Queue, stop: asyncio.Event):
+        self.status.connected = True
+        await queue.put(RawChunk(time.time(), source, None))
+        i = 0
+        try:
+            while not stop.is_set():
+                await queue.put(RawChunk(time.time(), source, self._line(i)))
+                i += 1
+                await _sleep_or_stop(stop, self.interval_s)
+        finally:
+            self.status.connected = False
+
+
+def _selectable(port) -> bool:
+    if os.name != "posix":
+        return False
+    try:
+        port.fileno()
+        return True
+    except Exception:
+        return False
+
+
+async def _sleep_or_stop(stop: asyncio.Event, seconds: float):
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+# ------------------------------------------------------------
+# Stufe 2: Dekodierung (zustandsbehaftet pro Board)
+# ------------------------------------------------------------
+class TextStreamDecoder:
+    """Firmware-Textzeilen; eine angefangene Zeile wartet auf den nächsten Block."""
+
+    def __init__(self, config: DeviceConfig):
+        self.config = config
+        self.lines = ChunkedLineReader(None, LineDecoder(scale=config.scale))
+        self._names = {}
+
+    def feed(self, t: float, data: bytes) -> list:
+        out = []
+        for sample in self.lines.feed(data):
+            name = self._names.get(sample.channel)
+            if name is None:
+                name = self._names[sample.channel] = self.config.channel_name(sample.channel)
+            out.append(StampedSample(t, self.config.name, name, sample.value))
+        return out
+
+    def reset(self):
+        self.lines.reset()
+
+
+class FrameStreamDecoder:
+    """Binäre Frames; Zeitstempel aus der Board-Uhr (siehe DeviceClock)."""
+
+    def __init__(self, config: DeviceConfig):
+        self.config = config
+        self.frames = FrameDecoder()
+        self.clock = DeviceClock()
+        self._left = config.channel_name(LEFT)
+        self._right = config.channel_name(RIGHT)
+        self._lost = 0
+
+    def feed(self, t: float, data: bytes) -> list:
+        out = []
+        name = self.config.name
+        for frame in self.frames.feed(data):
+            timestamp = self.clock.to_host(frame.t_us, t)
+            if frame.left_ready:
+                out.append(StampedSample(timestamp, name, self._left, frame.left))
+            if frame.right_ready:
+                out.append(StampedSample(timestamp, name, self._right, frame.right))
+        if self.frames.stats.lost != self._lost:
+            self._lost = self.frames.stats.lost
+            print(f"[WARN] {name}: {self._lost} Frames verloren (Lücken in der Sequenznummer).")
+        return out
+
+    def reset(self):
+        # Neue Verbindung: das Board kann neu gestartet sein, also auch die Uhr neu anheften
+        self.frames.reset()
+        self.clock = DeviceClock()
+
+
+class TimeMerger:
+    """
+    Führt die Batches mehrerer Boards zu einer Zeitfolge zusammen: ein Heap
+    über alle wartenden Samples, freigegeben wird, was älter als `window`
+    Sekunden ist (gemessen an der Host-Uhr). Gleiche Zeitstempel behalten die
+    Reihenfolge, in der sie angekommen sind.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.late = 0  # Samples, die erst nach Ablauf des Fensters ankamen
+        self._heap = []
+        self._order = itertools.count()
+        self._released = -math.inf  # Zeitstempel des zuletzt freigegebenen Samples
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, batch: list):
+        heap = self._heap
+        order = self._order
+        for sample in batch:
+            if sample.t < self._released:
+                self.late += 1
+            heapq.heappush(heap, (sample.t, next(order), sample))
+
+    @property
+    def due(self) -> float:
+        """Host-Zeit, zu der das älteste wartende Sample frei wird (None: nichts wartet)."""
+        return self._heap[0][0] + self.window if self._heap else None
+
+    def pop_ready(self, now: float) -> list:
+        return self._pop(now - self.window)
+
+    def pop_all(self) -> list:
+        return self._pop(math.inf)
+
+    def _pop(self, limit: float) -> list:
+        heap = self._heap
+        out = []
+        while heap and heap[0][0] <= limit:
+            out.append(heapq.heappop(heap)[2])
+        if out:
+            self._released = max(self._released, out[-1].t)
+        return out
+
+
+DECODERS = {"text": TextStreamDecoder, "binary": FrameStreamDecoder}
+
+_DECODER_HELP = {
+    "lines": "Gelesene Zeilen",
+    "parse_failures": "Unlesbare Zeilen bzw. Frames mit CRC-Fehler",
+    "not_ready": "Zeilen 'nicht bereit'",
+    "frames": "Gelesene Frames",
+    "frames_lost": "Aus Lücken in der Sequenznummer geschätzte verlorene Frames",
+    "bytes_skipped": "Beim Resync verworfene Bytes",
+}
+
+
+def _decoder_counts(decoder):
+    """(Name, Zähler) aus DecoderStats bzw. FrameStats; andere Dekoder liefern nichts."""
+    if isinstance(decoder, TextStreamDecoder):
+        stats = decoder.lines.decoder.stats
+        return [("lines", stats.lines), ("parse_failures", stats.malformed), ("not_ready", stats.not_ready)]
+    if isinstance(decoder, FrameStreamDecoder):
+        stats = decoder.frames.stats
+        return [("frames", stats.frames), ("parse_failures", stats.crc_errors),
+                ("frames_lost", stats.lost), ("bytes_skipped", stats.bytes_skipped)]
+    return []
+
+
+def _make_decoder(transport):
+    """Transporte mit eigenem Format (z. B. sample_bus) bringen ihren Dekoder mit."""
+    make = getattr(transport, "make_decoder", None)
+    if make is not None:
+        return make()
+    return DECODERS[transport.config.protocol](transport.config)
+
+
+# ------------------------------------------------------------
+# Stufe 3: Senken
+# ------------------------------------------------------------
+class Sink:
+    """
+    Basisklasse: start() einmal vor dem ersten Batch, handle() bekommt Listen
+    von StampedSample, close() einmal am Ende.
+    """
+
+    name = "sink"
+
+    async def start(self):
+        pass
+
+    async def handle(self, batch: list):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class CallbackSink(Sink):
+    """
+    Ruft fn(batch) in der Event-Schleife auf. fn muss schnell sein (z. B. in
+    RingBuffer schreiben); Langsames gehört in eine eigene Senke.
+    """
+
+    def __init__(self, fn, name: str = "callback"):
+        self.fn = fn
+        self.name = name
+
+    async def handle(self, batch: list):
+        self.fn(batch)
+
+
+class ThreadedSink(Sink):
+    """
+    Basis für Senken mit blockierender Arbeit (Datei, memmap): write(batch)
+    läuft in einem eigenen Thread pro Senke, damit eine langsame Platte weder
+    die Transporte noch die Dekodierstufe aufhält. Die Back-Pressure kommt
+    weiter über die Queue der Senke im Kern.
+    """
+
+    _executor = None
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sink-{self.name}")
+
+    async def handle(self, batch: list):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.write, batch)
+
+    def write(self, batch: list):
+        raise NotImplementedError
+
+    async def close(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+
+class CsvRowSink(ThreadedSink):
+    """
+    Schreibt über einen CsvSink. `row` macht aus einem StampedSample eine
+    CSV-Zeile. Der CsvSink gehört dem Aufrufer (start()/stop() dort), damit
+    ein Neustart der Erfassung in dieselbe Datei weiterschreiben kann.
+    """
+
+    def __init__(self, csv_sink, row=None, name: str = "csv"):
+        self.csv_sink = csv_sink
+        self.row = row if row is not None else (lambda s: [s.t, s.channel, s.value])
+        self.name = name
+
+    def write(self, batch: list):
+        # Blockiert nur, wenn die Queue des Writer-Threads voll ist (Platte hängt)
+        self.csv_sink.write_many(map(self.row, batch))
+
+
+class PyramidSink(ThreadedSink):
+    """
+    Schreibt die Aggregat-Pyramide des Runs mit (pyramid.PyramidWriter), damit
+    das Dashboard lange Messungen ohne kompletten CSV-Scan anzeigen kann.
+    Wie bei CsvRowSink gehört der Writer dem Aufrufer (close() dort).
+    """
+
+    def __init__(self, writer, name: str = "pyramid"):
+        self.writer = writer
+        self.name = name
+
+    def write(self, batch: list):
+        self.writer.add_samples(batch)
+
+
+class ColumnarSink(ThreadedSink):
+    """
+    Schreibt den Run zusätzlich im binären Spaltenformat (run_format.py), das
+    sich ohne Parsen per memmap öffnen lässt. Der Writer gehört dem Aufrufer.
+    """
+
+    def __init__(self, writer, name: str = "columnar"):
+        self.writer = writer
+        self.name = name
+
+    def write(self, batch: list):
+        self.writer.add_samples(batch)
+
+
+# ------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------
+class AcquisitionCore:
+    """
+    sources:    DeviceConfig (wird zu SerialTransport) oder Transport-Objekte
+                mit .config, .status und async run(source, queue, stop),
+                optional make_decoder() für ein eigenes Datenformat.
+    sinks:      Sink-Objekte; jede bekommt alle Batches in eigener Queue.
+    process:    optional batch -> batch, läuft in der Dekodierstufe
+                (z. B. Werte verwerfen); leere Batches werden nicht verteilt.
+    queue_size: Größe jeder Queue in Batches (Back-Pressure statt Verlust).
+    reorder_window: Sekunden, über die die Samples aller Boards nach
+                Zeitstempel sortiert werden (TimeMerger); 0: Empfangsreihenfolge.
+    """
+
+    STOP_TIMEOUT_S = 5.0
+
+    def __init__(self, sources, sinks, process=None, queue_size: int = 256, reorder_window: float = 0.0):
+        self.transports = [
+            SerialTransport(s) if isinstance(s, DeviceConfig) else s for s in sources
+        ]
+        self.sinks = list(sinks)
+        self.process = process
+        self.queue_size = queue_size
+        self.reorder_window = reorder_window
+        self.merger = None
+        self._stop = None
+        self._raw = None
+        self._sink_queues = []
+        self._transport_tasks = []
+        self._pipeline_tasks = []
+        self._decoders = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._transport_tasks or self._pipeline_tasks)
+
+    async def start(self):
+        """Startet alle Stufen; kehrt sofort zurück."""
+        if self.running:
+            return self
+        for sink in self.sinks:
+            await sink.start()
+        self._stop = asyncio.Event()
+        self._raw = asyncio.Queue(maxsize=self.queue_size)
+        self._sink_queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.sinks]
+        self._pipeline_tasks = [
+            asyncio.create_task(self._sink_loop(sink, q), name=f"sink:{sink.name}")
+            for sink, q in zip(self.sinks, self._sink_queues)
+        ]
+        self._decoders = [_make_decoder(t) for t in self.transports]
+        self.merger = TimeMerger(self.reorder_window) if self.reorder_window > 0 else None
+        self._pipeline_tasks.append(asyncio.create_task(self._decode_loop(), name="decode"))
+        REGISTRY.add_collector(self._collect)
+        self._transport_tasks = [
+            asyncio.create_task(t.run(i, self._raw, self._stop), name=f"transport:{t.config.name}")
+            for i, t in enumerate(self.transports)
+        ]
+        return self
+
+    async def stop(self, timeout: float = None):
+        """
+        Beendet die Transporte und wartet, bis alle bereits empfangenen Samples
+        bei den Senken angekommen sind. Danach wird close() jeder Senke aufgerufen.
+        """
+        if not self.running:
+            return
+        timeout = self.STOP_TIMEOUT_S if timeout is None else timeout
+        self._stop.set()
+        tasks = self._transport_tasks + self._pipeline_tasks
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[WARN] Erfassung nach {timeout} s nicht beendet, breche ab.")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._transport_tasks = []
+            self._pipeline_tasks = []
+            REGISTRY.remove_collector(self._collect)
+            for sink in self.sinks:
+                try:
+                    await sink.close()
+                except Exception as err:
+                    print(f"[ERROR] Senke {sink.name}: {err}")
+
+    async def _drain(self):
+        await asyncio.gather(*self._transport_tasks, return_exceptions=True)
+        await self._raw.put(_STOP)
+        await asyncio.gather(*self._pipeline_tasks, return_exceptions=True)
+
+    async def wait(self):
+        """Wartet, bis stop() aufgerufen wurde und die Pipeline leer ist."""
+        if self._stop is not None:
+            await self._stop.wait()
+        await asyncio.gather(*self._pipeline_tasks, return_exceptions=True)
+
+    async def _decode_loop(self):
+        raw = self._raw
+        merger = self.merger
+        decode_time = REGISTRY.histogram("waage_decode_seconds", "Dekodieren und Filtern eines Blocks")
+        getter = None
+        try:
+            while True:
+                if merger is not None and merger:
+                    # Wartende Samples spätestens zu ihrer Frist freigeben, auch ohne neue Blöcke;
+                    # der get() bleibt dabei offen, damit kein Block verloren geht
+                    if getter is None:
+                        getter = asyncio.ensure_future(raw.get())
+                    await asyncio.wait({getter}, timeout=max(0.0, merger.due - time.time()))
+                    chunk = None
+                    if getter.done():
+                        chunk, getter = getter.result(), None
+                else:
+                    chunk = await getter if getter is not None else await raw.get()
+                    getter = None
+                if chunk is _STOP:
+                    break
+                batch = self._decode(chunk, decode_time) if chunk is not None else None
+                if merger is not None:
+                    if batch:
+                        merger.push(batch)
+                    batch = merger.pop_ready(time.time())
+                if batch:
+                    await self._publish(batch)
+        finally:
+            if getter is not None:
+                getter.cancel()
+        if merger is not None:
+            batch = merger.pop_all()
+            if batch:
+                await self._publish(batch)
+        for q in self._sink_queues:
+            await q.put(_STOP)
+
+    def _decode(self, chunk: RawChunk, decode_time) -> list:
+        """Ein Block durch Dekoder und process; None, wenn nichts zu verteilen ist."""
+        decoder = self._decoders[chunk.source]
+        if chunk.data is None:
+            decoder.reset()
+            return None
+        timing = REGISTRY.enabled
+        if timing:
+            start = time.perf_counter()
+        # Ein fehlerhafter Block darf die Dekodierstufe nicht beenden: verwerfen, weiter
+        try:
+            batch = decoder.feed(chunk.t, chunk.data)
+        except Exception as err:
+            decoder.reset()  # Zustand nach dem Fehler unklar, neu synchronisieren
+            self._decode_error(chunk.source, "decoder.feed", err)
+            return None
+        if not batch:
+            return None
+        self.transports[chunk.source].status.samples += len(batch)
+        if self.process is not None:
+            try:
+                batch = self.process(batch)
+            except Exception as err:
+                self._decode_error(chunk.source, "process", err)
+                return None
+        if timing:
+            decode_time.observe(time.perf_counter() - start)
+        return batch
+
+    async def _publish(self, batch: list):
+        if DEBUG_LOG.enabled:
+            # Statt einer Ausgabe pro Zeile: höchstens einige pro Sekunde
+            DEBUG_LOG.log(lambda: f"Empfangen: {len(batch)} Samples, zuletzt {batch[-1]}")
+        for q in self._sink_queues:
+            await q.put(batch)
+
+    def _decode_error(self, source: int, stage: str, err: Exception):
+        status = self.transports[source].status
+        status.decode_errors += 1
+        status.last_error = f"{stage}: {err}"
+        name = self.transports[source].config.name
+        ERROR_LOG.log(lambda: f"{name}: Block verworfen, {stage} fehlgeschlagen ({type(err).__name__}: {err})")
+
+    async def _sink_loop(self, sink: Sink, queue: asyncio.Queue):
+        handle_time = REGISTRY.histogram("waage_sink_seconds", "Dauer von handle() pro Batch", sink=sink.name)
+        latency = REGISTRY.histogram(
+            "waage_sample_latency_seconds", "Empfang bis verarbeitet, ältestes Sample eines Batches", sink=sink.name
+        )
+        while True:
+            batch = await queue.get()
+            if batch is _STOP:
+                return
+            timing = REGISTRY.enabled
+            if timing:
+                start = time.perf_counter()
+            try:
+                await sink.handle(batch)
+            except Exception as err:
+                # Eine fehlerhafte Senke darf die anderen nicht aufhalten
+                print(f"[ERROR] Senke {sink.name}: {err}")
+            if timing:
+                handle_time.observe(time.perf_counter() - start)
+                latency.observe(time.time() - batch[0].t)
+
+    def _collect(self):
+        """Collector für telemetry.REGISTRY: Zähler der Dekoder und Transporte, Queue-Füllstände."""
+        yield ("waage_queue_depth", "gauge", "Batches in der Queue", {"queue": "raw"},
+               self._raw.qsize() if self._raw is not None else 0)
+        for sink, q in zip(self.sinks, self._sink_queues):
+            yield "waage_queue_depth", "gauge", "Batches in der Queue", {"queue": sink.name}, q.qsize()
+        merger = self.merger
+        if merger is not None:
+            yield "waage_reorder_pending", "gauge", "Samples im Sortierfenster", {}, len(merger)
+            yield "waage_reorder_late_total", "counter", "Nach dem Sortierfenster angekommen", {}, merger.late
+        for transport, decoder in zip(self.transports, self._decoders):
+            device = {"device": transport.config.name}
+            status = transport.status
+            yield "waage_reconnects_total", "counter", "Neue Verbindungen nach Fehlern", device, status.reconnects
+            yield "waage_connected", "gauge", "Board verbunden", device, int(status.connected)
+            yield "waage_samples_total", "counter", "Dekodierte Samples", device, status.samples
+            yield "waage_decode_errors_total", "counter", "Verworfene Blöcke", device, status.decode_errors
+            for name, value in _decoder_counts(decoder):
+                yield f"waage_{name}_total", "counter", _DECODER_HELP.get(name, ""), device, value
+
+    def status(self) -> dict:
+        return {t.config.name: t.status for t in self.transports}
+
+
+class AcquisitionThread:
+    """
+    Betreibt einen AcquisitionCore in einer eigenen Event-Schleife in einem
+    Hintergrund-Thread, für synchrone Anwendungen wie die Dash-App.
+    start() und stop() blockieren, bis die Pipeline läuft bzw. leer ist.
+    """
+
+    def __init__(self, core: AcquisitionCore):
+        self.core = core
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="acquisition", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.core.start(), self._loop).result()
+        return self
+
+    def stop(self, timeout: float = None):
+        if self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.core.stop(timeout), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+            self._loop = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+
+def parse_device_spec(spec: str, baudrate: int = 115200, protocol: str = "text") -> DeviceConfig:
+    """
+    Liest eine Geräteangabe der Form "PORT" oder "NAME=PORT", optional mit
+    Kanalnamen: "platte1=/dev/ttyUSB0,Left=Ferse,Right=Ballen".
+    """
+    device, *channel_specs = spec.split(",")
+    name, sep, port = device.partition("=")
+    if not sep:
+        name, port = "", device
+    channels = dict(item.split("=", 1) for item in channel_specs if "=" in item)
+    name = name or port.replace("\\", "/").rsplit("/", 1)[-1]
+    return DeviceConfig(name, port, baudrate, channels, protocol=protocol)
@@ -0,0 +1,217 @@
+"""
+analysis.py
+
+Vektorisierte Auswertung einer Messung (ersetzt das zeilenweise Parsen in plot.py).
+
+Unterstützte CSV-Layouts:
+    Unix Timestamp, Position, Value [kg]        (waage.py)
+    Unix Timestamp, Left Value, Right Value     (app_2.py)
+
+Beispiel:
+    run = load_run(Path("data/serial_data_Any.csv"))
+    result = analyze(run)  # Stehphase und Körpergewicht automatisch (segmentation.py)
+    print(result.start, result.end, result.person_weight, result.mean_difference)
+    result = analyze(run, person_weight=60, start=28, end=67)
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from filters import DEFAULT_SPEC, FilterPipeline
+from line_decoder import LEFT, RIGHT
+from resample import align
+from run_format import open_columnar, read_columnar
+from segmentation import Phase, standing_phase
+
+# Left/Right zeitlich paaren; "index" (Paarung über den Index) nur noch auf Wunsch
+DEFAULT_PAIRING = "linear"
+
+
+@dataclass
+class Run:
+    """Rohdaten einer Messung, getrennt nach Kanal (absolute Unix-Zeitstempel)."""
+
+    times_left: np.ndarray
+    vals_left: np.ndarray
+    times_right: np.ndarray
+    vals_right: np.ndarray
+
+    @property
+    def t0(self) -> float:
+        """Kleinster Zeitstempel beider Kanäle."""
+        firsts = [t.min() for t in (self.times_left, self.times_right) if len(t)]
+        if not firsts:
+            raise ValueError("Keine Daten gefunden!")
+        return float(min(firsts))
+
+
+@dataclass
+class Analysis:
+    """Ergebnisse von analyze(); Zeiten relativ zum ersten Messwert in Sekunden."""
+
+    times_left_rel: np.ndarray
+    times_right_rel: np.ndarray
+    common_times: np.ndarray
+    difference: np.ndarray
+    offset_left: np.ndarray
+    offset_right: np.ndarray
+    integral_difference: np.ndarray
+    window_times: np.ndarray
+    window_difference: np.ndarray
+    window_integral_difference: np.ndarray
+    mean_left: float
+    mean_right: float
+    mean_difference: float         # über die ganze Messung, wie im ursprünglichen Skript
+    window_mean_difference: float  # nur über das Zeitfenster [start, end]
+    start: float           # tatsächlich verwendetes Zeitfenster (None: offen)
+    end: float
+    person_weight: float   # angegeben oder aus der Stehphase geschätzt
+    phase: Phase = None    # erkannte Stehphase, falls eine gesucht wurde
+
+
+def _split_channels(df: pd.DataFrame, filters: str) -> Run:
+    times = df["Unix Timestamp"].to_numpy(dtype=np.float64)
+    if "Position" in df.columns:
+        values = df["Value [kg]"].to_numpy(dtype=np.float64)
+        position = df["Position"].astype(str).str.strip().to_numpy()
+        channels = [(times[position == name], values[position == name]) for name in (LEFT, RIGHT)]
+    elif {"Left Value", "Right Value"}.issubset(df.columns):
+        channels = []
+        for column in ("Left Value", "Right Value"):
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+            present = ~np.isnan(values)  # jede Zeile enthält nur einen der beiden Kanäle
+            channels.append((times[present], values[present]))
+    else:
+        raise ValueError(f"Unbekanntes CSV-Layout: {list(df.columns)}")
+    return _filter_channels(channels, filters)
+
+
+def _filter_channels(channels, filters: str) -> Run:
+    """Filterkette (filters.py) pro Kanal, wie im Live-Pfad."""
+    out = []
+    for times, values in channels:
+        out += FilterPipeline.from_spec(filters).process(times, values)
+    return Run(*out)
+
+
+def load_run(path: Path, filters: str = DEFAULT_SPEC) -> Run:
+    """
+    Liest eine CSV-Datei vektorisiert ein, trennt Left/Right und wendet die
+    Filterkette `filters` an (Standard: Werte > filters.MAX_VALUE verwerfen). Liegt
+    daneben ein vollständiger Run im Spaltenformat (run_format.py), wird
+    dieser stattdessen per memmap geöffnet (nur wenn er die Werte verlustfrei
+    enthält, siehe run_format.open_columnar).
+    """
+    folder = open_columnar(path)
+    if folder is not None:
+        run = read_columnar(folder)
+        empty = (np.empty(0), np.empty(0))
+        return _filter_channels([run.channels.get(name, empty) for name in (LEFT, RIGHT)], filters)
+    df = pd.read_csv(path, engine="c", skipinitialspace=True)
+    return _split_channels(df, filters)
+
+
+def exclusive_cumsum(values: np.ndarray) -> np.ndarray:
+    """out[i] = sum(values[:i]) in O(n) (entspricht dem früheren sum(differenz[:i]))."""
+    out = np.zeros(len(values), dtype=np.float64)
+    if len(values) > 1:
+        np.cumsum(values[:-1], out=out[1:])
+    return out
+
+
+def _mean(values: np.ndarray) -> float:
+    return float(np.mean(values)) if len(values) else float("nan")
+
+
+def _in_window(times: np.ndarray, start: float, end: float) -> np.ndarray:
+    mask = np.ones(len(times), dtype=bool)
+    if start is not None:
+        mask &= times >= start
+    if end is not None:
+        mask &= times <= end
+    return mask
+
+
+def analyze(
+    run: Run,
+    person_weight: float = None,
+    start: float = None,
+    end: float = None,
+    pairing: str = DEFAULT_PAIRING,
+    tolerance: float = 1.0,
+    segment: bool = True,
+) -> Analysis:
+    """
+    Berechnet Differenz, Offset vom halben Körpergewicht, Integral der Differenz
+    und die Mittelwerte.
+
+    start/end:     Zeitfenster in Sekunden (relativ) für Integral und Mittelwerte.
+    person_weight: Körpergewicht in kg.
+    segment:       fehlende start/end/person_weight aus der automatisch erkannten
+                   Stehphase (segmentation.py) übernehmen; sonst gilt ein
+                   fehlendes start/end als offen.
+    pairing:       "linear"/"nearest" (Standard: linear) richten beide Kanäle
+                   über resample.align() auf gemeinsame Zeitstempel aus
+                   (tolerance in Sekunden); "index" paart Left/Right wie das
+                   ursprüngliche Skript über den Index.
+    """
+    t0 = run.t0
+    times_left_rel = run.times_left - t0
+    times_right_rel = run.times_right - t0
+
+    if pairing == "index":
+        min_length = min(len(run.vals_left), len(run.vals_right))
+        common_times = times_left_rel[:min_length]
+        left = run.vals_left[:min_length]
+        right = run.vals_right[:min_length]
+    else:
+        common_times, left, right = align(
+            times_left_rel, run.vals_left, times_right_rel, run.vals_right, pairing, tolerance
+        )
+        min_length = len(common_times)
+    difference = left - right
+
+    phase = None
+    if segment and None in (start, end, person_weight):
+        phase = standing_phase(common_times, left + right)
+        if phase is not None:
+            start = phase.start if start is None else start
+            end = phase.end if end is None else end
+            person_weight = phase.weight if person_weight is None else person_weight
+    if person_weight is None:
+        raise ValueError("Keine Stehphase erkannt, bitte Körpergewicht angeben")
+
+    average_weight = person_weight / 2
+    offset_left = np.abs(left - average_weight)
+    offset_right = np.abs(right - average_weight)
+
+    integral_difference = exclusive_cumsum(difference)
+
+    start_idx = 0 if start is None else int(np.searchsorted(common_times, start, side="left"))
+    end_idx = min_length if end is None else int(np.searchsorted(common_times, end, side="right"))
+    window_difference = difference[start_idx:end_idx]
+
+    return Analysis(
+        times_left_rel=times_left_rel,
+        times_right_rel=times_right_rel,
+        common_times=common_times,
+        difference=difference,
+        offset_left=offset_left,
+        offset_right=offset_right,
+        integral_difference=integral_difference,
+        window_times=common_times[start_idx:end_idx],
+        window_difference=window_difference,
+        window_integral_difference=np.cumsum(window_difference),
+        # Mittelwerte über das Zeitfenster (früher über den Index-Bereich [start:end])
+        mean_left=_mean(run.vals_left[_in_window(times_left_rel, start, end)]),
+        mean_right=_mean(run.vals_right[_in_window(times_right_rel, start, end)]),
+        mean_difference=_mean(difference),
+        window_mean_difference=_mean(window_difference),
+        start=start,
+        end=end,
+        person_weight=float(person_weight),
+        phase=phase,
+    )
@@ -5,11 +5,19 @@ import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 import threading
 import time
-import csv
-from datetime import datetime
-import pandas as pd  # For handling CSV files
 import base64  # For decoding the uploaded file contents
-from io import StringIO
+from collections import OrderedDict
+from io import BytesIO
+
+from csv_tail import CsvTail, latest_run
+from pyramid import open_pyramid
+from downsample import minmax_downsample, window
+from ring_buffer import RingBuffer
+from run_cache import RunCache, content_key, file_key, stat_key
+from run_catalog import RunCatalog
+from run_format import load_run
+from run_store import RunData, load_run_csv
+from telemetry import CONTENT_TYPE, REGISTRY, timed
 
 
 # Try to import serial, but handle it gracefully if it fails
@@ -29,6 +37,32 @@ BAUD_RATE = 115200
 SERIAL_PORT = "COM11"  # Change to your serial port
 SHOWN_POINTS = 100
 N_NACHKOMMASTELLEN = 2
+MAX_POINTS_PER_TRACE = 2000  # Upper bound of points sent to the browser per trace
+CHANNEL_COLORS = {"Left": "blue", "Right": "red"}  # Other channels get plotly defaults
+
+DATA_FOLDER = Path("data")
+FOLLOW_POINTS = 2000  # Points per trace shown while following the active run
+FOLLOW_CAPACITY = 100_000  # Samples kept in memory per channel while following
+FOLLOW_RESCAN_S = 2.0  # How often data/ is checked for a newer run file
+
+UPLOAD_FOLDER = DATA_FOLDER / "uploads"  # Target of the streaming upload route
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+RUN_CACHE_BYTES = 1 << 30  # Memory budget for parsed runs shared by all sessions
+RUN_CACHE_SPILL_DIR = None  # e.g. DATA_FOLDER / ".run_cache" to keep evicted runs on disk
+OPEN_PYRAMIDS = 16  # Pyramids (and their memory maps) kept open; older ones are reopened on demand
+RUN_CATALOG_DB = DATA_FOLDER / ".run_catalog.sqlite"  # Indexed summaries of the runs in DATA_FOLDER
+TELEMETRY = True  # Runtime counters/latencies at /metrics (see telemetry.py)
+
+# Parsed runs, kept server-side so zooming can re-query full resolution.
+# Keyed by content hash; callbacks only pass the key around.
+run_cache = RunCache(RUN_CACHE_BYTES, RUN_CACHE_SPILL_DIR)
+catalog = RunCatalog(RUN_CATALOG_DB)
+# Server-side runs with an aggregate pyramid (pyramid.py): key -> (Pyramid, path),
+# least recently used first. Their CSV is only parsed once the user zooms in
+# past the finest level.
+pyramids = OrderedDict()
+pyramids_lock = threading.Lock()
 
 ser = None
 connected = False
@@ -41,6 +75,16 @@ app.layout = html.Div(
         html.H1("Arduino-based Data Monitor", className="text-center mb-4"),
         dcc.Graph(id="live-plot", style={"height": "65vh"}),
         dcc.Interval(id="interval-component", interval=500, n_intervals=0),
+        dbc.Checklist(
+            id="follow-run",
+            options=[{"label": "Follow the active run in data/", "value": "follow"}],
+            value=[],
+            switch=True,
+            className="mt-2",
+        ),
+        html.Div(id="follow-info", className="mt-1 text-muted"),
+        # Per-client cursor for incremental updates of the followed run
+        dcc.Store(id="follow-cursor", storage_type="memory"),
         html.Div(
             [
                 dbc.Row(
@@ -95,7 +139,29 @@ app.layout = html.Div(
             },
             multiple=False,
         ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="server-run",
+                        placeholder=f"... or load a recording from {DATA_FOLDER}/ on the server",
+                    ),
+                    width=10,
+                ),
+                dbc.Col(
+                    dbc.Button("Refresh", id="refresh-server-runs", n_clicks=0, className="btn btn-secondary"),
+                    width=2,
+                ),
+            ],
+            className="mx-1",
+        ),
+        html.Small(
+            "Large files: PUT them to /upload/<name>.csv (streamed to disk, e.g. "
+            "curl -T run.csv http://host:8050/upload/run.csv) and pick them from the list.",
+            className="text-muted mx-2",
+        ),
         html.Div(id="uploaded-file-info", className="mt-2"),
+        dcc.Store(id="uploaded-run-key"),
         dcc.Graph(id="csv-data-plot", style={"height": "65vh"}),
     ],
     style={
@@ -107,62 +173,420 @@ app.layout = html.Div(
 )
 
 
+class RunFollower:
+    """
+    Follows the newest CSV in DATA_FOLDER while another process writes it.
+
+    Shared by all browser tabs: poll() reads only the newly appended bytes
+    (see csv_tail.py) into one ring buffer per channel. Switching to a newer
+    run file starts a new epoch, which makes every client redraw.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.tail = None
+        self.buffers = {}  # channel -> RingBuffer, in order of appearance
+        self.epoch = 0
+        self.error = None
+        self._next_rescan = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_rescan:
+                self._next_rescan = now + FOLLOW_RESCAN_S
+                path = latest_run(self.folder)
+                if path is not None and (self.tail is None or path != self.tail.path):
+                    if self.tail is not None:
+                        self.tail.close()
+                    self.tail = CsvTail(path)
+                    self.buffers = {}
+                    self.epoch += 1
+            if self.tail is None:
+                return
+            restarts = self.tail.restarts
+            try:
+                new = self.tail.poll()
+                self.error = None
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+                return
+            if self.tail.restarts != restarts:
+                # File was truncated or replaced: start the plot over
+                self.buffers = {}
+                self.epoch += 1
+            for channel, (t, v) in new.items():
+                buffer = self.buffers.get(channel)
+                if buffer is None:
+                    buffer = self.buffers[channel] = RingBuffer(FOLLOW_CAPACITY)
+                buffer.extend(t, v)
+
+    def channels(self):
+        with self._lock:
+            return list(self.buffers.items())
+
+
+follower = RunFollower(DATA_FOLDER)
+
+
+def _follow_figure(channels, epoch):
+    """Full redraw of the followed run; returns (figure, cursor)."""
+    snapshots = [buffer.snapshot(FOLLOW_POINTS) for _, buffer in channels]
+    starts = [times[0] for times, _, _ in snapshots if len(times)]
+    t0 = float(min(starts)) if starts else None
+    cursor = {
+        "epoch": epoch,
+        "t0": t0,
+        "channels": [name for name, _ in channels],
+        "seq": [seq for _, _, seq in snapshots],
+    }
+    figure = go.Figure(
+        data=[
+            go.Scatter(x=(times - t0) if t0 is not None else [], y=values, mode="lines", name=name)
+            for (name, _), (times, values, _) in zip(channels, snapshots)
+        ],
+        layout=go.Layout(
+            title=follower.tail.path.name if follower.tail is not None else "No run in data/ yet...",
+            xaxis_title="Time (s)",
+            yaxis_title="Value [kg]",
+            template="plotly_white",
+            uirevision=f"follow-{epoch}",
+        ),
+    )
+    return figure, cursor
+
+
 @app.callback(
-    Output("csv-data-plot", "figure"),
+    Output("live-plot", "figure"),
+    Output("live-plot", "extendData"),
+    Output("follow-cursor", "data"),
+    Output("follow-info", "children"),
+    Input("interval-component", "n_intervals"),
+    State("follow-run", "value"),
+    State("follow-cursor", "data"),
+)
+@timed("update_follow_plot")
+def update_follow_plot(n, follow_value, cursor):
+    """
+    Stream the run file that the logger is currently writing.
+
+    Only rows appended since the last tick are read from disk and only rows
+    the client has not seen yet are sent (extendData), so the cost per tick
+    does not grow with the length of the session.
+    """
+    if "follow" not in (follow_value or []):
+        return dash.no_update, dash.no_update, None, ""
+
+    follower.poll()
+    channels = follower.channels()
+    tail = follower.tail
+    info = follower.error or (
+        f"Following {tail.path} ({tail.rows} rows, {tail.offset / 1e6:.1f} MB read)" if tail else
+        f"No CSV file in {DATA_FOLDER}/ yet."
+    )
+
+    names = [name for name, _ in channels]
+    if (not cursor or cursor.get("epoch") != follower.epoch
+            or cursor.get("channels") != names or cursor.get("t0") is None):
+        figure, cursor = _follow_figure(channels, follower.epoch)
+        return figure, dash.no_update, cursor, info
+
+    new = [buffer.since(seq, limit=FOLLOW_POINTS) for (_, buffer), seq in zip(channels, cursor["seq"])]
+    if any(chunk is None for chunk in new):
+        figure, cursor = _follow_figure(channels, follower.epoch)
+        return figure, dash.no_update, cursor, info
+    if not any(len(times) for times, _, _ in new):
+        return dash.no_update, dash.no_update, dash.no_update, info
+
+    if REGISTRY.enabled:
+        screen_latency.observe(time.time() - max(times[-1] for times, _, _ in new if len(times)))
+    t0 = cursor["t0"]
+    extend = (
+        {
+            "x": [(times - t0).tolist() for times, _, _ in new],
+            "y": [values.tolist() for _, values, _ in new],
+        },
+        list(range(len(channels))),
+        FOLLOW_POINTS,
+    )
+    cursor = dict(cursor, seq=[seq for _, _, seq in new])
+    return dash.no_update, extend, cursor, info
+
+
+def _visible_range(relayout_data):
+    """
+    Extract the x-range from relayoutData.
+
+    Returns (x_min, x_max), (None, None) when the x-axis was reset to the full
+    range, or None when the x-axis did not change (y-only zoom, autosize, ...).
+    """
+    if not relayout_data:
+        return None
+    if relayout_data.get("xaxis.autorange"):
+        return None, None
+    if "xaxis.range[0]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"])
+    return None
+
+
+def _server_runs():
+    """CSV files below DATA_FOLDER (including UPLOAD_FOLDER), newest first.
+
+    Only new or changed files are parsed; everything else comes from the catalog,
+    so the list stays fast with hundreds of recordings.
+    """
+    catalog.update(DATA_FOLDER)
+    root = DATA_FOLDER.resolve()
+    options = []
+    for run in catalog.runs(folder=DATA_FOLDER):
+        path = Path(run.path)
+        if run.error:
+            details = "unreadable"
+        else:
+            details = f"{run.person}, {run.duration_s / 60:.1f} min, {run.samples:,} samples"
+        options.append({
+            "label": f"{path.relative_to(root)} ({details}, {path.stat().st_size / 1e6:.1f} MB)",
+            "value": str(path),
+        })
+    return options
+
+
+def _server_path(value):
+    """Resolve a dropdown value, refusing anything outside DATA_FOLDER."""
+    path = Path(value).resolve()
+    if DATA_FOLDER.resolve() not in path.parents or path.suffix != ".csv":
+        raise ValueError(f"{value} is not a CSV file in {DATA_FOLDER}/")
+    return path
+
+
+def _pyramid_key(path, server_file):
+    # (path, size, mtime) plus the dropdown value, so an evicted pyramid can be reopened
+    return f"{stat_key(path)}:{server_file}"
+
+
+def _remember_pyramid(key, pyramid, path):
+    with pyramids_lock:
+        pyramids[key] = (pyramid, path)
+        pyramids.move_to_end(key)
+        while len(pyramids) > OPEN_PYRAMIDS:
+            pyramids.popitem(last=False)
+
+
+def _get_pyramid(key):
+    """(Pyramid, path) for a pyramid key, reopened if it was evicted; None for other keys."""
+    with pyramids_lock:
+        entry = pyramids.get(key)
+        if entry is not None:
+            pyramids.move_to_end(key)
+            return entry
+    if not key or not key.startswith("stat-"):
+        return None
+    stamp, _, server_file = key.partition(":")
+    try:
+        path = _server_path(server_file)
+        pyramid = open_pyramid(path) if stat_key(path) == stamp else None
+    except (OSError, ValueError):
+        return None
+    if pyramid is None:
+        return None  # the file changed since it was selected
+    _remember_pyramid(key, pyramid, path)
+    return pyramid, path
+
+
+REGISTRY.enable(TELEMETRY)
+# Age of the newest followed sample when it leaves the server (includes the logger's flush interval)
+screen_latency = REGISTRY.histogram("waage_sample_to_screen_seconds", "Sample received until sent to the browser")
+
+
+@app.server.route("/metrics")
+def telemetry_metrics():
+    """Runtime counters and histograms in the Prometheus text format."""
+    return REGISTRY.render(), 200, {"Content-Type": CONTENT_TYPE}
+
+
+@app.server.route("/upload/<name>", methods=["PUT", "POST"])
+def upload_stream(name):
+    """
+    Streaming upload for files too large for dcc.Upload: the request body is
+    written to UPLOAD_FOLDER in UPLOAD_CHUNK_BYTES pieces, never held in memory.
+    """
+    from flask import jsonify, request
+
+    name = Path(name).name
+    if not name.endswith(".csv"):
+        return jsonify(error="Only .csv files can be uploaded."), 400
+    UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
+    target = UPLOAD_FOLDER / name
+    partial = target.with_name(name + ".part")
+    size = 0
+    with partial.open("wb") as f:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            f.write(chunk)
+            size += len(chunk)
+    partial.replace(target)  # only complete files show up in the list
+    return jsonify(path=str(target), bytes=size)
+
+
+@app.callback(
+    Output("server-run", "options"),
+    Input("refresh-server-runs", "n_clicks"),
+)
+@timed("list_server_runs")
+def list_server_runs(n_clicks):
+    return _server_runs()
+
+
+@app.callback(
+    Output("uploaded-run-key", "data"),
     Output("uploaded-file-info", "children"),
     Input("upload-data", "contents"),
+    Input("server-run", "value"),
     State("upload-data", "filename"),
     prevent_initial_call=True,
 )
-def upload_and_display_csv(contents, filename):
-    if not contents or not filename.endswith(".csv"):
-        return go.Figure(), "Invalid file. Please upload a CSV file."
+@timed("upload_and_display_csv")
+def upload_and_display_csv(contents, server_file, filename):
+    """
+    Parse a run into per-channel columns (run_store.load_run_csv) and keep it
+    server-side; the browser only gets the key.
 
-    # Decode and parse the uploaded CSV data
-    content_type, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string)
+    Server-side files with a pyramid are keyed on (path, size, mtime) and not
+    read at all; the CSV is hashed only if raw samples are needed later. Other
+    server-side files are opened from their columnar .run (run_format.py) if
+    there is one, else parsed straight from disk in bounded-memory chunks.
+    Browser uploads are decoded once to bytes and parsed from there, without
+    the extra text and StringIO copies.
+    """
+    triggered = [t["prop_id"] for t in dash.callback_context.triggered]
     try:
-        df = pd.read_csv(StringIO(decoded.decode("utf-8")))
-
-        # Ensure the CSV has the expected columns
-        if not {"Unix Timestamp", "Position", "Value [kg]"}.issubset(df.columns):
-            return (
-                go.Figure(),
-                "CSV file must contain 'Unix Timestamp', 'Position', and 'Value [kg]' columns.",
-            )
-
-        # Prepare data for plotting
-        left_values = df[df["Position"] == "Left"]
-        right_values = df[df["Position"] == "Right"]
-
-        figure = go.Figure(
-            data=[
-                go.Scatter(
-                    x=left_values["Unix Timestamp"],
-                    y=left_values["Value [kg]"],
-                    mode="lines+markers",
-                    name="Left",
-                    line=dict(color="blue"),
-                ),
-                go.Scatter(
-                    x=right_values["Unix Timestamp"],
-                    y=right_values["Value [kg]"],
-                    mode="lines+markers",
-                    name="Right",
-                    line=dict(color="red"),
-                ),
-            ],
-            layout=go.Layout(
-                title="Uploaded CSV Data",
-                xaxis_title="Unix Timestamp",
-                yaxis_title="Value [kg]",
-                template="plotly_white",
-            ),
-        )
-        return figure, f"Uploaded file: {filename}"
+        if "server-run.value" in triggered:
+            if not server_file:
+                return dash.no_update, dash.no_update
+            path = _server_path(server_file)
+            pyramid = open_pyramid(path)
+            if pyramid is not None:
+                # Keyed on (path, size, mtime): the CSV is only hashed if raw samples are needed
+                key = _pyramid_key(path, server_file)
+                _remember_pyramid(key, pyramid, path)
+                counts = ", ".join(f"{channel}: {pyramid.count(channel)}" for channel in pyramid.channels)
+                return key, f"Loaded file: {path.name} (aggregates; {counts})"
+            key = file_key(path)
+            run = run_cache.get_or_load(key, lambda: load_run(path))
+        else:
+            if not contents or not filename.endswith(".csv"):
+                return None, "Invalid file. Please upload a CSV file."
+            content_type, content_string = contents.split(",")
+            decoded = base64.b64decode(content_string)
+            key = content_key(decoded)
+            run = run_cache.get_or_load(key, lambda: load_run_csv(BytesIO(decoded), name=filename))
+            del decoded
+
+        counts = ", ".join(f"{channel}: {len(t)}" for channel, (t, _) in run.channels.items())
+        return key, f"Loaded file: {run.name} ({run.rows} rows; {counts})"
 
     except Exception as e:
-        return go.Figure(), f"Error processing file: {e}"
+        return None, f"Error processing file: {e}"
+
+
+def _overview(key, run):
+    """Zoomed-out traces of a run, computed once and cached next to the run."""
+    return run_cache.get_or_load(key + "-overview", lambda: RunData(
+        run.name,
+        {channel: minmax_downsample(t, v, MAX_POINTS_PER_TRACE) for channel, (t, v) in run.channels.items()},
+        run.rows,
+    ))
+
+
+def _trace(channel, t, v, raw):
+    return go.Scatter(
+        x=t,
+        y=v,
+        mode="lines+markers" if raw else "lines",
+        name=channel,
+        line=dict(color=CHANNEL_COLORS.get(channel)),
+    )
+
+
+def _run_traces(key, run, x_min, x_max):
+    overview = _overview(key, run) if x_min is None and x_max is None else None
+    traces = []
+    for position, (times, values) in run.channels.items():
+        if overview is not None:
+            t = times
+            shown_t, shown_v = overview.channels[position]
+        else:
+            t, v = window(times, values, x_min, x_max)
+            shown_t, shown_v = minmax_downsample(t, v, MAX_POINTS_PER_TRACE)
+        traces.append(_trace(position, shown_t, shown_v, len(shown_t) == len(t)))
+    return traces
+
+
+def _pyramid_traces(pyramid, path, x_min, x_max):
+    """Traces from the pyramid level matching the zoom; raw samples only when zoomed in far."""
+    traces = []
+    for channel in pyramid.channels:
+        def raw(channel=channel):
+            return run_cache.get_or_load(file_key(path), lambda: load_run(path)).channels[channel]
+
+        t, v, factor = pyramid.query(channel, x_min, x_max, MAX_POINTS_PER_TRACE, raw=raw)
+        traces.append(_trace(channel, t, v, factor == 1 and len(t) < MAX_POINTS_PER_TRACE))
+    return path.name, traces
+
+
+@app.callback(
+    Output("csv-data-plot", "figure"),
+    Input("uploaded-run-key", "data"),
+    Input("csv-data-plot", "relayoutData"),
+    prevent_initial_call=True,
+)
+@timed("update_csv_plot")
+def update_csv_plot(key, relayout_data):
+    """
+    Plot the uploaded run with at most MAX_POINTS_PER_TRACE points per trace.
+
+    On zoom, relayoutData triggers this callback again and the visible window
+    is re-sampled from the full-resolution data, so detail appears as soon as
+    the window is small enough. Runs with a pyramid are answered from the
+    aggregate level that matches the zoom instead.
+    """
+    triggered = [t["prop_id"] for t in dash.callback_context.triggered]
+    if "uploaded-run-key.data" in triggered:
+        # A new upload always starts zoomed out
+        x_min, x_max = None, None
+    else:
+        visible = _visible_range(relayout_data)
+        if visible is None:
+            # The x window did not change: keep the traces that are already shown
+            return dash.no_update
+        x_min, x_max = visible
+
+    entry = _get_pyramid(key)
+    if entry is not None:
+        title, traces = _pyramid_traces(*entry, x_min, x_max)
+    else:
+        run = run_cache.get(key) if key else None
+        if run is None:
+            return go.Figure()
+        title, traces = run.name, _run_traces(key, run, x_min, x_max)
+
+    figure = go.Figure(
+        data=traces,
+        layout=go.Layout(
+            title=title,
+            xaxis_title="Unix Timestamp",
+            yaxis_title="Value [kg]",
+            template="plotly_white",
+            # Keep the user's zoom when the figure is replaced
+            uirevision=key,
+        ),
+    )
+    return figure
 
 
 if __name__ == "__main__":
@@ -1,38 +1,58 @@
-import time
+import argparse
+import atexit
 import threading
-import csv
-import math
+import time
 from datetime import datetime
 from pathlib import Path
 
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 
+from csv_sink import CsvSink
+from ring_buffer import RingBuffer
+from resample import StreamAligner
+from line_decoder import LEFT, RIGHT
+from acquisition import (AcquisitionCore, AcquisitionThread, CallbackSink, ColumnarSink, CsvRowSink,
+                         DeviceConfig, FakeTransport, PyramidSink)
+from filters import DEFAULT_SPEC, StreamFilter
+from metrics import METRICS_COLUMNS, MetricsSink, OnlineMetrics, metrics_path
+from pyramid import PyramidWriter
+from run_format import ColumnarWriter, columnar_path
+from telemetry import CONTENT_TYPE, REGISTRY, timed
+
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
 use_fake_data = False    # Set to True to generate fake data instead of reading from serial
 SERIAL_PORT = 'COM11'    # Default serial port (adjust if needed)
 BAUD_RATE = 115200       # Baud rate for serial communication
+SUBSCRIBE_SOCKET = None  # Socket of `waage.py --publish`; set to read from it instead of the port
 SHOWN_POINTS = 200       # Number of points to show in the plot
 UPDATE_INTERVAL_MS = 1000  # Plot update interval in milliseconds
 N_DECIMALS = 2           # Number of decimals for values
-
-BLACKLIST = [7.11]
+BUFFER_CAPACITY = 100_000  # Samples kept in memory per channel
+ALIGN_METHOD = 'linear'  # Time alignment of LEFT/RECHTS for the difference trace
+ALIGN_TOLERANCE_S = 1.0  # Max. gap for interpolation / nearest match
+WRITE_COLUMNAR = True    # Also write the run in the binary column format (see run_format.py)
+PERSON_WEIGHT = None     # Body weight in kg for the offset from half body weight (live metrics)
+TELEMETRY = True         # Runtime counters/latencies at /metrics (see telemetry.py)
+FILTERS = DEFAULT_SPEC   # Filter pipeline for live data, e.g. "range:max=500; hampel:window=7" (see filters.py)
 
 DATA_FOLDER = Path('data')
 
 # ------------------------------------------------------------
 # Global Variables
 # ------------------------------------------------------------
-left_data = []
-right_data = []
+left_data = RingBuffer(BUFFER_CAPACITY)
+right_data = RingBuffer(BUFFER_CAPACITY)
+diff_data = RingBuffer(BUFFER_CAPACITY)  # LEFT - RECHTS on the common time base
+aligner = StreamAligner(ALIGN_METHOD, ALIGN_TOLERANCE_S)
+aligner_lock = threading.Lock()
 
-ser = None
-data_thread = None
-stop_event = threading.Event()  # Used to stop threads gracefully
+acquisition = None  # AcquisitionThread running the asyncio acquisition core
+metrics = OnlineMetrics(person_weight=PERSON_WEIGHT)  # Live metrics, see metrics.py
 
 # ------------------------------------------------------------
 # Setup CSV Logging
@@ -41,153 +61,106 @@ timestamp_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
 DATA_FOLDER.mkdir(parents=True, exist_ok=True)
 data_file_path = DATA_FOLDER / f"serial_data_{timestamp_str}.csv"
 
-with data_file_path.open('w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['Unix Timestamp', 'Left Value', 'Right Value'])
-
-def log_data(timestamp: float, left_value, right_value):
-    with data_file_path.open('a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([timestamp, left_value, right_value])
-
-def reset_data_thread():
-    """
-    Reset the data thread and related global states.
-    """
-    global data_thread, ser, left_data, right_data, stop_event
-
-    print("Resetting data thread...")
-    stop_event.set()
-    if data_thread is not None and data_thread.is_alive():
-        data_thread.join(timeout=5.0)
-
-    stop_event.clear()
-
-    # Close serial if open
-    if ser is not None:
-        if ser.is_open:
-            ser.close()
-        ser = None
+data_columnar = None
+if WRITE_COLUMNAR:
+    data_columnar = ColumnarWriter(columnar_path(data_file_path), layout='wide')
+    # Registered before data_sink.stop, so it runs after it (LIFO) and sees the final CSV size
+    atexit.register(lambda: data_columnar.close(source_bytes=data_file_path.stat().st_size))
+
+# One persistent file handle, written in batches by a background thread
+data_sink = CsvSink(data_file_path, header=['Unix Timestamp', 'Left Value', 'Right Value']).start()
+atexit.register(data_sink.stop)
+# Metrics snapshots once per second next to the run, e.g. data/serial_data_<ts>.metrics
+metrics_sink = CsvSink(metrics_path(data_file_path), header=METRICS_COLUMNS, name='metrics').start()
+atexit.register(metrics_sink.stop)
+# Aggregates for zoomed-out views of long runs (see pyramid.py), kept across resets
+data_pyramid = PyramidWriter(data_file_path)
+atexit.register(data_pyramid.close)
+
+def csv_row(sample):
+    if sample.channel == LEFT:
+        return [sample.t, sample.value, '']
+    return [sample.t, '', sample.value]
+
+def record_sample(t: float, value: float, is_left: bool):
+    """Store a sample in its ring buffer and update the difference trace."""
+    if is_left:
+        left_data.append(t, value)
+        push = aligner.push_left
+    else:
+        right_data.append(t, value)
+        push = aligner.push_right
+    with aligner_lock:
+        times, left, right = push((t,), (value,))
+    if len(times):
+        diff_data.extend(times, left - right)
 
-    # Clear existing data
-    left_data.clear()
-    right_data.clear()
-    print("Data thread reset complete.")
+def record_batch(batch):
+    for sample in batch:
+        record_sample(sample.t, sample.value, is_left=(sample.channel == LEFT))
 
 # ------------------------------------------------------------
-# Data Acquisition Functions
+# Data Acquisition
 # ------------------------------------------------------------
-def generate_fake_data():
-    print("Starting fake data generation...")
-    i = 0
-    while not stop_event.is_set():
-        value = math.sin(i / 10) + 0.5 * math.sin(i / 5)
-        value_rounded = round(value, N_DECIMALS)
-        t = time.time()
-
-        if value_rounded not in BLACKLIST:
-            if i % 2 == 0:
-                left_data.append((t, value_rounded))
-                log_data(t, value_rounded, '')
-            else:
-                right_data.append((t, value_rounded))
-                log_data(t, '', value_rounded)
-
-        i += 1
-        time.sleep(0.2)
-    print("Fake data generation stopped.")
-
-def establish_connection():
+def create_acquisition():
     """
-    Try to connect to the serial port, retrying every 5 seconds if it fails.
+    Build the acquisition core: one source (serial board or fake generator),
+    decoded samples go to the CSV file and to the plot buffers.
     """
-    global ser
-    from serial import Serial, SerialException
-    while not stop_event.is_set():
-        try:
-            print(f"Attempting to connect to {SERIAL_PORT}...")
-            ser = Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-            print(f"Connected to {SERIAL_PORT}")
-            return  # Exit once connected
-        except Exception as e:
-            print(f"Failed to connect to {SERIAL_PORT}: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
-
-def read_real_data():
-    print("Starting real data acquisition...")
-    try:
-        import serial
-    except ImportError:
-        print("pyserial not installed. Falling back to fake data.")
-        generate_fake_data()
-        return
-
-    from serial import SerialException
-
-    # Establish initial connection
-    establish_connection()
-
-    while not stop_event.is_set():
-        if ser is None or not ser.is_open:
-            # Try to reconnect if the serial port closed unexpectedly
-            print("Serial port lost. Reconnecting...")
-            establish_connection()
-
+    config = DeviceConfig('board', SERIAL_PORT, BAUD_RATE,
+                          channels={LEFT: LEFT, RIGHT: RIGHT},
+                          scale=1 / 10 ** N_DECIMALS)
+    if SUBSCRIBE_SOCKET is not None:
+        # Samples von waage.py --publish statt eigenem Port
+        from sample_bus import SocketTransport
+        source = SocketTransport(DeviceConfig('bus', str(SUBSCRIBE_SOCKET)))
+    elif use_fake_data:
+        source = FakeTransport(config)
+    else:
+        source = config
+    sinks = [CsvRowSink(data_sink, row=csv_row), PyramidSink(data_pyramid),
+             MetricsSink(metrics, metrics_sink), CallbackSink(record_batch, name='plot')]
+    if data_columnar is not None:
+        sinks.append(ColumnarSink(data_columnar))
+    # A fresh StreamFilter per acquisition: filter state starts over after a reset
+    return AcquisitionCore([source], sinks, process=StreamFilter(FILTERS))
+
+def start_acquisition():
+    global acquisition, use_fake_data
+    if not use_fake_data and SUBSCRIBE_SOCKET is None:
         try:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8', errors='replace').strip()
-                if not line:
-                    continue
-
-                upper_line = line.upper()
-                is_left = 'LEFT' in upper_line
-                is_rechts = 'RECHTS' in upper_line
-
-                if not (is_left or is_rechts):
-                    continue
-
-                filtered = "".join(ch for ch in line if ch.isdigit() or ch == '.' or ch == '-')
-                if not filtered:
-                    continue
-
-                try:
-                    value = float(filtered) / (10 ** N_DECIMALS)
-                except ValueError:
-                    continue
-
-                if value in BLACKLIST:
-                    continue
-
-                t = time.time()
-                if is_left:
-                    left_data.append((t, value))
-                    log_data(t, value, '')
-                elif is_rechts:
-                    right_data.append((t, value))
-                    log_data(t, '', value)
-            else:
-                time.sleep(0.1)
-
-        except (SerialException, OSError) as e:
-            # If a serial error occurs (device unplugged, etc.), try to close and reconnect
-            print(f"Serial error occurred: {e}. Attempting to reconnect...")
-            if ser and ser.is_open:
-                ser.close()
-            ser = None
-            time.sleep(5)  # Wait before reattempting connection
-
-    # Cleanup when stopping
-    if ser and ser.is_open:
-        ser.close()
-    print("Real data acquisition stopped.")
-
-def start_data_thread():
-    global data_thread
-    if use_fake_data:
-        data_thread = threading.Thread(target=generate_fake_data, daemon=True)
+            import serial  # noqa: F401
+        except ImportError:
+            print("pyserial not installed. Falling back to fake data.")
+            use_fake_data = True
+    if SUBSCRIBE_SOCKET is not None:
+        print(f"Subscribing to {SUBSCRIBE_SOCKET}...")
     else:
-        data_thread = threading.Thread(target=read_real_data, daemon=True)
-    data_thread.start()
+        print("Starting " + ("fake" if use_fake_data else "real") + " data acquisition...")
+    acquisition = AcquisitionThread(create_acquisition()).start()
+
+def stop_acquisition():
+    global acquisition
+    if acquisition is not None:
+        acquisition.stop()
+        acquisition = None
+        print("Data acquisition stopped.")
+
+def reset_acquisition():
+    """
+    Stop the acquisition (all received samples are still written), clear the
+    buffers and start again with a fresh connection.
+    """
+    print("Resetting data acquisition...")
+    stop_acquisition()
+    left_data.clear()
+    right_data.clear()
+    diff_data.clear()
+    with aligner_lock:
+        aligner.reset()
+    metrics.reset()
+    start_acquisition()
+    print("Data acquisition reset complete.")
 
 # ------------------------------------------------------------
 # Dash App and Callbacks
@@ -197,21 +170,48 @@ def create_app_layout():
         html.H1("Live Data Monitor", className="text-center mb-4"),
         dcc.Graph(id='live-plot', style={'height': '65vh'}),
         dcc.Interval(id='interval-component', interval=UPDATE_INTERVAL_MS, n_intervals=0),
+        # Per-client cursor: last sequence number sent per channel. Lives in browser
+        # memory, so a reload/reconnect starts without cursor and gets a full redraw.
+        dcc.Store(id='plot-cursor', storage_type='memory'),
+        html.Div(id='live-metrics', className='mt-2'),
         html.Div(f"Data is being saved to: {data_file_path}", className='mt-2 text-center')
     ], style={'padding': '20px'})
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.FLATLY])
 app.layout = create_app_layout()
 
-@app.callback(
-    Output('live-plot', 'figure'),
-    Input('interval-component', 'n_intervals')
-)
-def update_plot(n):
-    left_subset = left_data[-SHOWN_POINTS:]
-    right_subset = right_data[-SHOWN_POINTS:]
+REGISTRY.enable(TELEMETRY)
+# Age of the newest sample when it leaves the server (excludes network and browser rendering)
+screen_latency = REGISTRY.histogram('waage_sample_to_screen_seconds', 'Sample received until sent to the browser')
+
+@app.server.route('/metrics')
+def telemetry_metrics():
+    """Runtime counters and histograms in the Prometheus text format."""
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+# Plotted channels: (cursor key, ring buffer, trace name, color)
+PLOT_CHANNELS = [
+    ('left', left_data, 'LEFT', 'blue'),
+    ('right', right_data, 'RECHTS', 'red'),
+    ('diff', diff_data, 'LEFT - RECHTS', 'purple'),
+]
+
+def _epochs():
+    return [buffer.epoch for _, buffer, _, _ in PLOT_CHANNELS]
+
+def build_figure():
+    """
+    Build the complete figure from the last SHOWN_POINTS samples per channel.
+
+    Returns the figure and a cursor dict (time origin and sequence number per
+    channel) from which incremental updates can continue.
+    """
+    snapshots = [buffer.snapshot(SHOWN_POINTS) for _, buffer, _, _ in PLOT_CHANNELS]
+    cursor = {'epoch': _epochs(), 't0': None}
+    for (key, _, _, _), (_, _, seq) in zip(PLOT_CHANNELS, snapshots):
+        cursor[key] = seq
 
-    if not left_subset and not right_subset:
+    if not any(len(times) for times, _, _ in snapshots):
         figure = go.Figure(layout=go.Layout(
             title='No data yet...',
             template='plotly_white',
@@ -219,49 +219,125 @@ def update_plot(n):
             yaxis_title='Value',
             showlegend=True
         ))
-        figure.add_trace(go.Scatter(x=[], y=[], mode='lines+markers', name='LEFT', line=dict(color='blue')))
-        figure.add_trace(go.Scatter(x=[], y=[], mode='lines+markers', name='RECHTS', line=dict(color='red')))
-        return figure
+        for _, _, name, color in PLOT_CHANNELS:
+            figure.add_trace(go.Scatter(x=[], y=[], mode='lines+markers', name=name, line=dict(color=color)))
+        return figure, cursor
 
-    earliest_left = left_subset[0][0] if left_subset else time.time()
-    earliest_right = right_subset[0][0] if right_subset else time.time()
-    min_time = min(earliest_left, earliest_right)
-
-    left_times = [d[0] - min_time for d in left_subset]
-    left_values = [d[1] for d in left_subset]
-
-    right_times = [d[0] - min_time for d in right_subset]
-    right_values = [d[1] for d in right_subset]
+    min_time = min(times[0] for times, _, _ in snapshots if len(times))
+    cursor['t0'] = float(min_time)
 
     figure = go.Figure(layout=go.Layout(
         title='Live Data Plot',
         xaxis_title='Time (s)',
         yaxis_title='Value',
         template='plotly_white',
-        showlegend=True
-    ))
-    figure.add_trace(go.Scatter(
-        x=left_times,
-        y=left_values,
-        mode='lines+markers',
-        name='LEFT',
-        line=dict(color='blue')
-    ))
-    figure.add_trace(go.Scatter(
-        x=right_times,
-        y=right_values,
-        mode='lines+markers',
-        name='RECHTS',
-        line=dict(color='red')
+        showlegend=True,
+        uirevision='live'
     ))
+    for (_, _, name, color), (times, values, _) in zip(PLOT_CHANNELS, snapshots):
+        figure.add_trace(go.Scatter(
+            x=times - min_time,
+            y=values,
+            mode='lines+markers',
+            name=name,
+            line=dict(color=color)
+        ))
+
+    return figure, cursor
+
+@app.callback(
+    Output('live-plot', 'figure'),
+    Output('live-plot', 'extendData'),
+    Output('plot-cursor', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('plot-cursor', 'data')
+)
+@timed('update_plot')
+def update_plot(n, cursor):
+    """
+    Send only the samples that arrived since the client's cursor via extendData.
+
+    A full redraw happens only if the client has no cursor yet (first load,
+    reload, reconnect), after reset_acquisition() or if it fell further
+    behind than the ring buffer capacity.
+    """
+    if not cursor or cursor.get('t0') is None or cursor.get('epoch') != _epochs():
+        figure, cursor = build_figure()
+        return figure, dash.no_update, cursor
+
+    new = [buffer.since(cursor[key], limit=SHOWN_POINTS) for key, buffer, _, _ in PLOT_CHANNELS]
+    if any(chunk is None for chunk in new):
+        figure, cursor = build_figure()
+        return figure, dash.no_update, cursor
+
+    if not any(len(times) for times, _, _ in new):
+        return dash.no_update, dash.no_update, dash.no_update
+
+    if REGISTRY.enabled:
+        screen_latency.observe(time.time() - max(times[-1] for times, _, _ in new if len(times)))
+    t0 = cursor['t0']
+    extend = (
+        {
+            'x': [(times - t0).tolist() for times, _, _ in new],
+            'y': [values.tolist() for _, values, _ in new],
+        },
+        list(range(len(PLOT_CHANNELS))),
+        SHOWN_POINTS,
+    )
+    cursor = dict(cursor)
+    for (key, _, _, _), (_, _, seq) in zip(PLOT_CHANNELS, new):
+        cursor[key] = seq
+    return dash.no_update, extend, cursor
+
+def _fmt(value, spec='.2f'):
+    return '–' if value != value else format(value, spec)  # NaN -> dash
 
-    return figure
+@app.callback(
+    Output('live-metrics', 'children'),
+    Input('interval-component', 'n_intervals'),
+)
+@timed('update_metrics')
+def update_metrics(n):
+    """Current values of the online metrics engine (O(1), independent of run length)."""
+    snap = metrics.snapshot()
+    rows = [
+        html.Tr([html.Td(name), html.Td(_fmt(c.value)), html.Td(_fmt(c.mean)), html.Td(_fmt(c.std)),
+                 html.Td(_fmt(c.ewma)), html.Td(_fmt(c.trend, '+.3f'))])
+        for name, c in ((LEFT, snap.channels.get(LEFT)), (RIGHT, snap.channels.get(RIGHT)))
+        if c is not None
+    ]
+    channels = dbc.Table(
+        [html.Thead(html.Tr([html.Th(h) for h in
+                             ['', 'Value', f'Mean ({metrics.window})', 'Std', 'EWMA', 'Trend [kg/s]']]))]
+        + [html.Tbody(rows)],
+        bordered=False, size='sm', className='mb-1',
+    )
+    summary = [
+        f"Sum {_fmt(snap.sum)} kg",
+        f"Difference {_fmt(snap.difference)} kg (EWMA {_fmt(snap.difference_ewma)})",
+        f"Asymmetry {_fmt(snap.asymmetry, '+.3f')} (EWMA {_fmt(snap.asymmetry_ewma, '+.3f')})",
+        f"Integral of difference {_fmt(snap.integral_difference, '.1f')} kg·s",
+    ]
+    if metrics.person_weight is not None:
+        summary.append(f"Offset from half weight L {_fmt(snap.offset_left)} / R {_fmt(snap.offset_right)} kg")
+    return [channels, html.Div(' · '.join(summary), className='text-center')]
 
 # ------------------------------------------------------------
 # Main
 # ------------------------------------------------------------
 if __name__ == '__main__':
-    reset_data_thread()
-    time.sleep(2)  # Wait for threads to start
-    start_data_thread()
-    app.run_server(debug=True)
+    parser = argparse.ArgumentParser(description="Live data monitor.")
+    parser.add_argument('--port', default=SERIAL_PORT,
+                        help="Serial port, e.g. COM11, /dev/ttyUSB0 or the pty of fake_device.py")
+    parser.add_argument('--fake', action='store_true', help="Generate fake data instead of reading serial")
+    parser.add_argument('--subscribe', type=Path, default=None, metavar='SOCKET',
+                        help="Read samples from `waage.py --publish SOCKET` instead of the serial port")
+    args = parser.parse_args()
+    SERIAL_PORT = args.port
+    SUBSCRIBE_SOCKET = args.subscribe
+    use_fake_data = use_fake_data or args.fake
+
+    start_acquisition()
+    atexit.register(stop_acquisition)  # runs before data_sink.stop/data_pyramid.close (LIFO)
+    # No reloader: it would start a second acquisition in the child process
+    app.run_server(debug=True, use_reloader=False)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+bench_line_decoder.py
+
+Micro-Benchmark: Zeilen/Sekunde des gemeinsamen LineDecoder im Vergleich zu
+den bisherigen Parsern aus waage.py, app_2.py und main.py (unten als
+Referenz-Implementierungen nachgebaut).
+
+    python benchmarks/bench_line_decoder.py [--lines 200000] [--repeat 9]
+
+Die Verhältnisse hängen stark von Maschine, Python-Version und Last ab;
+deshalb hier keine festen Zahlen, sondern nur Vergleiche innerhalb eines Laufs.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from line_decoder import LineDecoder  # noqa: E402
+
+
+# ------------------------------------------------------------
+# Bisherige Implementierungen (Stand vor line_decoder.py)
+# ------------------------------------------------------------
+def legacy_waage(raw: bytes):
+    """waage.read_serial + extract_float_from_line"""
+    line = raw.decode("utf-8", errors="replace").strip()
+    if not line:
+        return None
+    position = None
+    if "rechts" in line.lower():
+        position = "Right"
+    elif "links" in line.lower():
+        position = "Left"
+    if position:
+        filtered = "".join(ch for ch in line if ch.isdigit() or ch in ".-")
+        try:
+            return position, float(filtered)
+        except ValueError:
+            return None
+    return None
+
+
+def legacy_app_2(raw: bytes, n_decimals: int = 2):
+    """app_2.read_real_data"""
+    line = raw.decode("utf-8", errors="replace").strip()
+    if not line:
+        return None
+    upper_line = line.upper()
+    is_left = "LEFT" in upper_line
+    is_rechts = "RECHTS" in upper_line
+    if not (is_left or is_rechts):
+        return None
+    filtered = "".join(ch for ch in line if ch.isdigit() or ch == "." or ch == "-")
+    if not filtered:
+        return None
+    try:
+        value = float(filtered) / (10 ** n_decimals)
+    except ValueError:
+        return None
+    return ("Left" if is_left else "Right"), value
+
+
+def legacy_main(raw: bytes):
+    """main.update_graph_live"""
+    try:
+        return float(raw.decode("utf-8").strip())
+    except ValueError:
+        return None
+
+
+# ------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------
+def make_lines(n: int, seed: int = 0) -> list:
+    """Zeilen wie von der Firmware, mit gelegentlichen 'nicht bereit'-Zeilen."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n):
+        side = "links" if i % 2 == 0 else "rechts"
+        if rng.random() < 0.02:
+            lines.append(f"HX711 ({side}) nicht bereit!\r\n".encode())
+        else:
+            lines.append(f"Gewicht {side}: {rng.uniform(-1, 90):.2f} kg\r\n".encode())
+    return lines
+
+
+def per_line(func):
+    """Ein Aufruf pro Zeile; Ergebnisse werden wie bei decode_many() gesammelt."""
+    def run(lines):
+        out = []
+        for line in lines:
+            result = func(line)
+            if result is not None:
+                out.append(result)
+        return out
+    return run
+
+
+def bench(candidates: dict, lines, repeat: int) -> dict:
+    """
+    Beste Laufzeit aus `repeat` Durchläufen, in Zeilen/Sekunde. Die Kandidaten
+    laufen abwechselnd, damit Lastschwankungen der Maschine alle gleich treffen.
+    """
+    best = dict.fromkeys(candidates, float("inf"))
+    for _ in range(repeat):
+        for name, run in candidates.items():
+            start = time.perf_counter()
+            run(lines)
+            best[name] = min(best[name], time.perf_counter() - start)
+    return {name: len(lines) / seconds for name, seconds in best.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Zeilen-Parser.")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    candidates = {
+        "waage (legacy)": per_line(legacy_waage),
+        "app_2 (legacy)": per_line(legacy_app_2),
+        "main (legacy)": per_line(legacy_main),
+        "LineDecoder.decode": per_line(LineDecoder().decode),
+        # decode_many() verarbeitet den ganzen Block in einem Aufruf
+        "LineDecoder.decode_many": LineDecoder().decode_many,
+    }
+    results = bench(candidates, lines, args.repeat)
+
+    baseline = results["waage (legacy)"]
+    print(f"{'Parser':<26}{'Zeilen/s':>14}{'vs. waage':>12}")
+    for name, rate in results.items():
+        print(f"{name:<26}{rate:>14,.0f}{rate / baseline:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
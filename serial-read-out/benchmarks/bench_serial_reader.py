@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_serial_reader.py
+
+Latenz und Durchsatz des ChunkedLineReader im Vergleich zur bisherigen
+Polling-Schleife (in_waiting + readline() + sleep(0.1)), gemessen über ein
+Linux-pty als virtuelle serielle Schnittstelle. Kein Board nötig.
+
+    python benchmarks/bench_serial_reader.py [--rate 200] [--seconds 3] [--burst 200000]
+
+Jede Zeile trägt ihre laufende Nummer als Messwert, damit die Latenz
+(Senden -> Sample beim Konsumenten) pro Zeile bestimmt werden kann.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import serial
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from line_decoder import LineDecoder  # noqa: E402
+from serial_reader import ChunkedLineReader  # noqa: E402
+
+
+def open_pty_pair():
+    """Gibt (master_fd, serial.Serial am Slave) zurück."""
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.5)
+    os.close(slave)  # pyserial hält ein eigenes Handle
+    return master, port
+
+
+def writer(master: int, n: int, rate: float, sent: list):
+    """Schreibt n Firmware-Zeilen; rate=0 bedeutet so schnell wie möglich."""
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for i in range(n):
+        if interval:
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        side = "links" if i % 2 == 0 else "rechts"
+        sent.append(time.perf_counter())
+        os.write(master, f"Gewicht {side}: {i}.00 kg\r\n".encode())
+
+
+def consume_legacy(port, n: int, received: list):
+    """Bisherige Schleife aus waage.read_serial / app_2.read_real_data."""
+    decoder = LineDecoder()
+    while len(received) < n:
+        if port.in_waiting > 0:
+            sample = decoder.decode(port.readline())
+            if sample is not None:
+                received.append((time.perf_counter(), int(sample.value)))
+        else:
+            time.sleep(0.1)
+
+
+def consume_chunked(port, n: int, received: list):
+    reader = ChunkedLineReader(port)
+    while len(received) < n:
+        batch = reader.read_batch()
+        now = time.perf_counter()
+        received.extend((now, int(sample.value)) for _, sample in batch)
+
+
+def run(consumer, n: int, rate: float) -> dict:
+    master, port = open_pty_pair()
+    sent, received = [], []
+    thread = threading.Thread(target=consumer, args=(port, n, received), daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    writer(master, n, rate, sent)
+    thread.join()
+    elapsed = time.perf_counter() - start
+    port.close()
+    os.close(master)
+
+    latencies = sorted((t - sent[i]) * 1000 for t, i in received)
+    return {
+        "lines_per_s": n / elapsed,
+        "latency_mean_ms": statistics.fmean(latencies),
+        "latency_p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "latency_max_ms": latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des seriellen Lesers über ein pty.")
+    parser.add_argument("--rate", type=float, default=200, help="Zeilen/s für die Latenzmessung.")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--burst", type=int, default=200_000, help="Zeilen für die Durchsatzmessung.")
+    args = parser.parse_args()
+
+    n_rate = int(args.rate * args.seconds)
+    print(f"{'Leser':<10}{'Test':<22}{'Zeilen/s':>12}{'Ø ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for name, consumer in (("legacy", consume_legacy), ("chunked", consume_chunked)):
+        for label, n, rate in (
+            (f"{args.rate:.0f} Zeilen/s", n_rate, args.rate),
+            (f"Burst {args.burst}", args.burst, 0),
+        ):
+            r = run(consumer, n, rate)
+            print(
+                f"{name:<10}{label:<22}{r['lines_per_s']:>12,.0f}"
+                f"{r['latency_mean_ms']:>9.1f}{r['latency_p95_ms']:>9.1f}{r['latency_max_ms']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
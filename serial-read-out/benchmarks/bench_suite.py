@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+bench_suite.py
+
+Reproduzierbare Benchmark-Suite für die heißen Pfade, auf synthetischen
+Messungen von 1 Minute bis 24 Stunden bei mehreren Abtastraten:
+
+- parse:       Zeilen-Parser (frühere waage/app_2-Parser, LineDecoder,
+               Dekodierstufe der Erfassung)
+- csv:         CSV-Logging pro Sample und in Batches (CsvSink), dazu das
+               frühere Öffnen/Anhängen/Schließen pro Zeile
+- update_plot: app_2.build_figure (volle Neuzeichnung) und app_2.update_plot
+               (inkrementell über extendData)
+- upload:      Upload-Pfad von app.upload_and_display_csv (base64 -> load_run_csv),
+               Server-Datei als CSV und im Spaltenformat
+- analysis:    analysis.load_run + analyze wie in plot.py, optional mit den Plots
+
+Die Daten werden deterministisch (fester Seed) erzeugt und in
+benchmarks/.data/ zwischengespeichert. Ergebnisse gehen als JSON (Median und
+Bestwert pro Benchmark und Datensatz, Commit, Umgebung) in eine Datei;
+`compare` vergleicht zwei solche Dateien und meldet Regressionen.
+
+    python benchmarks/bench_suite.py run --json new.json            # Schnellauswahl
+    python benchmarks/bench_suite.py run --full --json new.json     # bis 24 h
+    python benchmarks/bench_suite.py run --rev HEAD~3 --json old.json
+    python benchmarks/bench_suite.py compare old.json new.json [--threshold 0.1]
+
+Mit --rev läuft diese Suite gegen den Stand eines anderen Commits (in einem
+temporären git worktree). Benchmarks, deren Code es dort noch nicht gibt,
+erscheinen als Fehler statt die Suite abzubrechen.
+"""
+
+import argparse
+import atexit
+import base64
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_SRC = HERE.parent
+DATA_CACHE = HERE / ".data"
+
+GENERATOR_VERSION = 1  # erhöhen, wenn sich die erzeugten Daten ändern
+SEED = 0
+
+DURATIONS = {"1min": 60, "10min": 600, "1h": 3600, "24h": 86400}
+RATES = (10, 80, 1000)  # Hz pro Kanal (das Board liefert ~10 Hz, fake_device bis ~2 kHz)
+QUICK = [("1min", 10), ("1min", 80), ("10min", 80), ("1h", 10), ("1h", 80)]
+
+MAX_LINES = 200_000       # Parser und CSV-Logging: so viele Zeilen pro Datensatz (Rate pro Zeile)
+MAX_LEGACY_ROWS = 20_000  # Öffnen/Schließen pro Zeile ist sehr langsam
+MAX_PLOT_SAMPLES = 1_000_000  # create_plots (matplotlib) nur bis zu dieser Größe
+PLOT_TICKS = 50           # inkrementelle update_plot-Aufrufe pro Messung
+
+BENCHES = ("parse", "csv", "update_plot", "upload", "analysis")
+
+
+# ------------------------------------------------------------
+# Synthetische Daten
+# ------------------------------------------------------------
+@dataclass
+class Dataset:
+    name: str
+    duration_s: int
+    rate_hz: int
+    path: Path
+
+    @property
+    def samples(self) -> int:
+        return 2 * self.duration_s * self.rate_hz  # beide Kanäle
+
+
+def synthetic_channels(duration_s: float, rate_hz: float, seed: int = SEED, weight: float = 75.0):
+    """
+    Zeitstempel und Werte für Left/Right: Stehphase von 10 % bis 90 % der
+    Dauer (1 s Rampe), Schwanken mit 0.3 Hz gegenphasig, Rauschen 0.3 kg.
+    Right ist eine halbe Periode gegen Left versetzt, wie im Wechsel der Firmware.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * rate_hz)
+    t = 1.7e9 + np.arange(n) / rate_hz
+    rel = t - t[0]
+    load = np.clip(np.minimum(rel - 0.1 * duration_s, 0.9 * duration_s - rel), 0.0, 1.0)
+    sway = 5.0 * np.sin(2 * np.pi * 0.3 * rel)
+    left = load * (weight / 2 + sway) + rng.normal(0, 0.3, n)
+    right = load * (weight / 2 - sway) + rng.normal(0, 0.3, n)
+    return t, np.round(left, 2), t + 0.5 / rate_hz, np.round(right, 2)
+
+
+def make_dataset(label: str, rate_hz: int, folder: Path = DATA_CACHE) -> Dataset:
+    """Schreibt die Messung im Format von waage.py (einmalig, danach aus dem Cache)."""
+    duration_s = DURATIONS[label]
+    name = f"{label}@{rate_hz}Hz"
+    path = folder / f"synthetic_{label}_{rate_hz}hz_s{SEED}_v{GENERATOR_VERSION}.csv"
+    if not path.exists():
+        folder.mkdir(parents=True, exist_ok=True)
+        print(f"[INFO] Erzeuge {name} ({2 * duration_s * rate_hz:,} Zeilen) -> {path.name}", file=sys.stderr)
+        t_left, left, t_right, right = synthetic_channels(duration_s, rate_hz)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            f.write("Unix Timestamp,Position,Value [kg]\r\n")
+            step = 500_000
+            for i in range(0, len(t_left), step):
+                f.write("".join(
+                    f"{a!r},Left,{b:.2f}\r\n{c!r},Right,{d:.2f}\r\n"
+                    for a, b, c, d in zip(t_left[i:i + step].tolist(), left[i:i + step].tolist(),
+                                          t_right[i:i + step].tolist(), right[i:i + step].tolist())
+                ))
+        os.replace(tmp, path)
+    return Dataset(name, duration_s, rate_hz, path)
+
+
+def firmware_lines(ds: Dataset, limit: int) -> list:
+    """Firmware-Zeilen aus den Werten des Datensatzes, mit 2 % 'nicht bereit'."""
+    n = min(ds.samples, limit) // 2
+    _, left, _, right = synthetic_channels(ds.duration_s, ds.rate_hz)
+    not_ready = np.random.default_rng(SEED + 1).random(2 * n) < 0.02
+    lines = []
+    for i, (a, b) in enumerate(zip(left[:n].tolist(), right[:n].tolist())):
+        for j, (side, value) in enumerate((("links", a), ("rechts", b))):
+            if not_ready[2 * i + j]:
+                lines.append(f"HX711 ({side}) nicht bereit!\r\n".encode())
+            else:
+                lines.append(f"Gewicht {side}: {value:.2f} kg\r\n".encode())
+    return lines
+
+
+def select_datasets(full: bool, names=None, max_samples: int = 20_000_000) -> list:
+    if names:
+        pairs = []
+        for name in names:
+            label, _, rate = name.partition("@")
+            pairs.append((label, int(rate.lower().removesuffix("hz"))))
+    elif full:
+        pairs = [(label, rate) for label in DURATIONS for rate in RATES
+                 if 2 * DURATIONS[label] * rate <= max_samples]
+    else:
+        pairs = QUICK
+    return [make_dataset(label, rate) for label, rate in pairs]
+
+
+# ------------------------------------------------------------
+# Messung
+# ------------------------------------------------------------
+@dataclass
+class Case:
+    name: str
+    items: int
+    unit: str
+    fn: object           # fn(state) -> None, gemessen
+    setup: object = None  # setup() -> state, nicht gemessen
+
+
+def measure(case: Case, repeat: int) -> list:
+    """
+    Laufzeiten von `repeat` Durchläufen. Ein erster Durchlauf unter 1 s gilt
+    als Aufwärmen und wird verworfen; längere zählen (sonst dauert 24 h doppelt).
+    """
+    times = []
+    warmup = True
+    while len(times) < repeat:
+        state = case.setup() if case.setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        case.fn(state)
+        elapsed = time.perf_counter() - start
+        if warmup:
+            warmup = False
+            if elapsed < 1.0:
+                continue
+        times.append(elapsed)
+    return times
+
+
+class Context:
+    """Gemeinsamer Zustand eines Laufs: Arbeitsordner (aktueller Ordner), importierte Dashboards."""
+
+    def __init__(self, workdir: Path):
+        self.workdir = workdir
+        self._modules = {}
+
+    def module(self, name: str):
+        """
+        app/app_2 legen beim Import data/ im aktuellen Ordner an (daher läuft
+        die Suite im Arbeitsordner) und schalten die Laufzeit-Kennzahlen ein;
+        gemessen wird ohne, wie in waage.py ohne --stats.
+        """
+        if name not in self._modules:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._modules[name] = __import__(name)
+            try:
+                from telemetry import REGISTRY
+                REGISTRY.enable(False)
+            except ImportError:
+                pass
+        return self._modules[name]
+
+
+# ------------------------------------------------------------
+# Benchmarks
+# ------------------------------------------------------------
+def bench_parse(ds: Dataset, ctx: Context) -> list:
+    from acquisition import DeviceConfig, TextStreamDecoder
+    from bench_line_decoder import legacy_app_2, legacy_waage
+    from line_decoder import LineDecoder
+
+    lines = firmware_lines(ds, MAX_LINES)
+    data = b"".join(lines)
+    chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)]
+
+    def per_line(func):
+        # Ergebnisse sammeln wie decode_many(), sonst misst der Vergleich nur die Listen
+        def run(_):
+            out = []
+            for line in lines:
+                result = func(line)
+                if result is not None:
+                    out.append(result)
+        return run
+
+    def stream(_):
+        decoder = TextStreamDecoder(DeviceConfig("bench", "bench"))
+        for chunk in chunks:
+            decoder.feed(0.0, chunk)
+
+    n = len(lines)
+    return [
+        Case("parse.legacy_waage", n, "lines", per_line(legacy_waage)),
+        Case("parse.legacy_app_2", n, "lines", per_line(legacy_app_2)),
+        Case("parse.line_decoder", n, "lines", per_line(LineDecoder().decode)),
+        Case("parse.decode_many", n, "lines", lambda _: LineDecoder().decode_many(lines)),
+        Case("parse.acquisition", n, "lines", stream),
+    ]
+
+
+def bench_csv(ds: Dataset, ctx: Context) -> list:
+    import csv
+
+    from csv_sink import CsvSink
+
+    n = min(ds.samples, MAX_LINES)
+    t_left, left, t_right, right = synthetic_channels(ds.duration_s, ds.rate_hz)
+    half = n // 2
+    rows = [row for a, b, c, d in zip(t_left[:half].tolist(), left[:half].tolist(),
+                                      t_right[:half].tolist(), right[:half].tolist())
+            for row in ([a, "Left", b], [c, "Right", d])]
+    target = ctx.workdir / "bench_csv.csv"
+    header = ["Unix Timestamp", "Position", "Value [kg]"]
+
+    def new_sink():
+        # fsync bleibt aus: misst das Logging, nicht die Platte
+        return CsvSink(target, header=header, fsync_on_stop=False).start()
+
+    def per_row(sink):
+        for row in rows:
+            sink.write(row)
+        sink.stop()
+
+    def batched(sink):
+        for i in range(0, len(rows), 32):  # Batchgröße wie aus der Dekodierstufe
+            sink.write_many(rows[i:i + 32])
+        sink.stop()
+
+    legacy_rows = rows[:MAX_LEGACY_ROWS]
+
+    def legacy(_):
+        # Vor csv_sink.py: pro Messwert öffnen, anhängen, schließen
+        for row in legacy_rows:
+            with open(target, "a", newline="") as f:
+                csv.writer(f).writerow(row)
+
+    return [
+        Case("csv.write_row", len(rows), "rows", per_row, new_sink),
+        Case("csv.write_batch", len(rows), "rows", batched, new_sink),
+        Case("csv.legacy_open_append", len(legacy_rows), "rows", legacy, lambda: target.unlink(missing_ok=True)),
+    ]
+
+
+def bench_update_plot(ds: Dataset, ctx: Context) -> list:
+    app_2 = ctx.module("app_2")
+    capacity = app_2.BUFFER_CAPACITY
+    t_left, left, t_right, right = synthetic_channels(ds.duration_s, ds.rate_hz)
+    diff = left - right
+    per_tick = max(1, int(ds.rate_hz * app_2.UPDATE_INTERVAL_MS / 1000))
+    ticks = min(PLOT_TICKS, max(1, len(t_left) // per_tick - 1))
+    start = max(0, len(t_left) - capacity - ticks * per_tick)
+    split = len(t_left) - ticks * per_tick
+
+    def fill():
+        for buffer, times, values in ((app_2.left_data, t_left, left), (app_2.right_data, t_right, right),
+                                      (app_2.diff_data, t_left, diff)):
+            buffer.clear()
+            buffer.extend(times[start:split], values[start:split])
+
+    def full(_):
+        app_2.build_figure()
+
+    def prepare():
+        fill()
+        return app_2.build_figure()[1]
+
+    def incremental(cursor):
+        for k in range(ticks):
+            a, b = split + k * per_tick, split + (k + 1) * per_tick
+            app_2.left_data.extend(t_left[a:b], left[a:b])
+            app_2.right_data.extend(t_right[a:b], right[a:b])
+            app_2.diff_data.extend(t_left[a:b], diff[a:b])
+            _, _, new_cursor = app_2.update_plot(k, cursor)
+            if new_cursor is not app_2.dash.no_update:
+                cursor = new_cursor
+
+    return [
+        Case("update_plot.full", 1, "calls", full, fill),
+        Case("update_plot.incremental", ticks, "calls", incremental, prepare),
+    ]
+
+
+def bench_upload(ds: Dataset, ctx: Context) -> list:
+    from run_cache import content_key
+    from run_format import csv_to_columnar, read_columnar
+    from run_store import load_run_csv
+
+    raw = ds.path.read_bytes()
+    contents = "data:text/csv;base64," + base64.b64encode(raw).decode()
+    del raw
+    columnar = DATA_CACHE / (ds.path.stem + ".columnar")
+    if not columnar.exists():
+        with contextlib.redirect_stdout(io.StringIO()):
+            csv_to_columnar(ds.path, columnar)
+
+    def browser(_):
+        # Schritte von app.upload_and_display_csv für einen Browser-Upload
+        _, content_string = contents.split(",")
+        decoded = base64.b64decode(content_string)
+        content_key(decoded)
+        load_run_csv(io.BytesIO(decoded), name=ds.path.name)
+
+    return [
+        Case("upload.browser", ds.samples, "samples", browser),
+        Case("upload.server_csv", ds.samples, "samples", lambda _: load_run_csv(ds.path)),
+        Case("upload.server_columnar", ds.samples, "samples", lambda _: read_columnar(columnar)),
+    ]
+
+
+def bench_analysis(ds: Dataset, ctx: Context) -> list:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import plot
+    from analysis import analyze, load_run
+
+    run = load_run(ds.path)
+    cases = [
+        Case("analysis.load_analyze", ds.samples, "samples", lambda _: analyze(load_run(ds.path))),
+        Case("analysis.analyze", ds.samples, "samples", lambda _: analyze(run)),
+    ]
+    if ds.samples <= MAX_PLOT_SAMPLES:
+        def plots(_):
+            with contextlib.redirect_stdout(io.StringIO()):
+                plot.create_plots("bench", ds.path, ctx.workdir)
+        cases.append(Case("analysis.create_plots", ds.samples, "samples", plots))
+    return cases
+
+
+BENCH_FUNCTIONS = {
+    "parse": bench_parse,
+    "csv": bench_csv,
+    "update_plot": bench_update_plot,
+    "upload": bench_upload,
+    "analysis": bench_analysis,
+}
+
+
+# ------------------------------------------------------------
+# run / compare
+# ------------------------------------------------------------
+def _git(src: Path, *args) -> str:
+    try:
+        return subprocess.run(["git", "-C", str(src), *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(args) -> dict:
+    src = Path(args.src).resolve()
+    sys.path[:0] = [str(src), str(HERE)]
+    datasets = select_datasets(args.full, args.dataset, args.max_samples)
+    benches = args.bench or list(BENCHES)
+
+    # Aufräumen erst ganz am Ende (atexit, LIFO): app_2 schließt seine Dateien selbst per atexit
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    os.chdir(workdir)
+    ctx = Context(Path(workdir))
+    results = []
+    for ds in datasets:
+        for bench in benches:
+            try:
+                cases = BENCH_FUNCTIONS[bench](ds, ctx)
+            except Exception as err:  # z. B. Code in einem älteren Commit noch nicht vorhanden
+                results.append({"bench": bench, "dataset": ds.name, "error": f"{type(err).__name__}: {err}"})
+                print(f"{bench:<28}{ds.name:<14}Fehler: {err}")
+                continue
+            for case in cases:
+                entry = {"bench": case.name, "dataset": ds.name, "items": case.items, "unit": case.unit}
+                try:
+                    times = measure(case, args.repeat)
+                except Exception as err:
+                    entry["error"] = f"{type(err).__name__}: {err}"
+                    print(f"{case.name:<28}{ds.name:<14}Fehler: {err}")
+                else:
+                    median = statistics.median(times)
+                    entry.update(times_s=times, best_s=min(times), median_s=median,
+                                 rate_per_s=case.items / median if median > 0 else None)
+                    print(f"{case.name:<28}{ds.name:<14}{median * 1e3:>12.2f} ms"
+                          f"{case.items / median:>16,.0f} {case.unit}/s")
+                results.append(entry)
+
+    status = _git(src, "status", "--porcelain", "--", ".")
+    return {
+        "meta": {
+            "commit": _git(src, "rev-parse", "HEAD"),
+            "dirty": bool(status),
+            "src": str(src),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "generator_version": GENERATOR_VERSION,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def run_rev(args) -> int:
+    """Dieselbe Suite gegen einen anderen Commit, in einem temporären worktree."""
+    root = _git(HERE, "rev-parse", "--show-toplevel")
+    if not root:
+        print("[ERROR] kein git-Repository")
+        return 2
+    relative = DEFAULT_SRC.relative_to(root)
+    worktree = tempfile.mkdtemp(prefix="bench_rev_")
+    try:
+        subprocess.run(["git", "-C", root, "worktree", "add", "--detach", worktree, args.rev], check=True)
+        argv = [sys.executable, __file__, "run", "--src", str(Path(worktree) / relative),
+                "--repeat", str(args.repeat), "--max-samples", str(args.max_samples)]
+        argv += ["--full"] if args.full else []
+        argv += [a for d in args.dataset or [] for a in ("--dataset", d)]
+        argv += [a for b in args.bench or [] for a in ("--bench", b)]
+        argv += ["--json", str(Path(args.json).resolve())] if args.json else []
+        return subprocess.run(argv).returncode
+    finally:
+        subprocess.run(["git", "-C", root, "worktree", "remove", "--force", worktree])
+        shutil.rmtree(worktree, ignore_errors=True)
+
+
+def compare(old: dict, new: dict, threshold: float, min_delta_s: float) -> int:
+    """Tabelle alt/neu pro (Benchmark, Datensatz); Rückgabe: Zahl der Regressionen."""
+    def index(report):
+        return {(r["bench"], r["dataset"]): r for r in report["results"]}
+
+    before, after = index(old), index(new)
+    print(f"alt: {old['meta'].get('commit', '?')[:10]}  neu: {new['meta'].get('commit', '?')[:10]}"
+          f"{' (mit lokalen Änderungen)' if new['meta'].get('dirty') else ''}")
+    print(f"{'Benchmark':<28}{'Datensatz':<14}{'alt [ms]':>12}{'neu [ms]':>12}{'Faktor':>9}")
+    regressions = 0
+    for key in sorted(before.keys() | after.keys()):
+        a, b = before.get(key), after.get(key)
+        if not a or not b or "median_s" not in a or "median_s" not in b:
+            state = "nur alt" if b is None else "nur neu" if a is None else "Fehler"
+            print(f"{key[0]:<28}{key[1]:<14}{'':>33}  {state}")
+            continue
+        ratio = b["median_s"] / a["median_s"] if a["median_s"] > 0 else float("inf")
+        delta = b["median_s"] - a["median_s"]
+        flag = ""
+        if ratio > 1 + threshold and delta > min_delta_s:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold and -delta > min_delta_s:
+            flag = "  schneller"
+        print(f"{key[0]:<28}{key[1]:<14}{a['median_s'] * 1e3:>12.2f}{b['median_s'] * 1e3:>12.2f}"
+              f"{ratio:>8.2f}x{flag}")
+    print(f"{regressions} Regression(en) (Schwelle {threshold:.0%}, mindestens {min_delta_s * 1e3:g} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Suite mit synthetischen Messungen.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Benchmarks ausführen.")
+    run.add_argument("--full", action="store_true", help="Alle Dauern (bis 24 h) und Raten statt der Schnellauswahl.")
+    run.add_argument("--dataset", action="append", metavar="DAUER@RATE", help="z. B. 1h@80Hz (mehrfach angeben).")
+    run.add_argument("--bench", action="append", choices=BENCHES, help="Nur diese Gruppe(n).")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--max-samples", type=int, default=20_000_000, help="Größere Datensätze auslassen (--full).")
+    run.add_argument("--json", default=None, help="Ergebnisse als JSON hierhin schreiben.")
+    run.add_argument("--src", default=str(DEFAULT_SRC), help="Ordner mit den zu messenden Modulen.")
+    run.add_argument("--rev", default=None, help="Gegen diesen Commit messen (git worktree).")
+
+    cmp = commands.add_parser("compare", help="Zwei JSON-Ergebnisse vergleichen.")
+    cmp.add_argument("old", type=Path)
+    cmp.add_argument("new", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Relative Verlangsamung ab der gemeldet wird.")
+    cmp.add_argument("--min-delta-ms", type=float, default=0.5, help="Kleinere Unterschiede sind Rauschen.")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        old = json.loads(args.old.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        sys.exit(1 if compare(old, new, args.threshold, args.min_delta_ms / 1e3) else 0)
+
+    if args.rev:
+        sys.exit(run_rev(args))
+    target = Path(args.json).resolve() if args.json else None  # vor dem Wechsel in den Arbeitsordner
+    report = run_suite(args)
+    if target:
+        target.write_text(json.dumps(report, indent=1), encoding="utf-8")
+        print(f"[INFO] Ergebnisse in {args.json}")
+
+
+if __name__ == "__main__":
+    main()
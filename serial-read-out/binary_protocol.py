@@ -0,0 +1,146 @@
+"""
+binary_protocol.py
+
+Binäres Frame-Protokoll zwischen Firmware (waegezelle/src/main.cpp mit
+BINARY_PROTOCOL 1) und Host. Jedes Frame enthält beide Kanäle:
+
+    Offset  Typ      Feld
+    0       uint16   MAGIC (0x5AA5, auf dem Draht A5 5A)
+    2       uint16   seq     laufender Zähler, läuft bei 65535 über
+    4       uint32   t_us    micros() auf dem Board
+    8       float32  left    [kg]
+    12      float32  right   [kg]
+    16      uint8    flags   Bit 0: links bereit, Bit 1: rechts bereit
+    17      uint16   crc     CRC-16/CCITT-FALSE über die Bytes 0..16
+
+Alle Felder little-endian (wie auf AVR). Der Decoder arbeitet mit
+struct.unpack_from direkt auf dem Empfangspuffer, synchronisiert sich nach
+Störungen über MAGIC neu und erkennt verlorene Frames an Lücken in seq.
+"""
+
+import struct
+from binascii import crc_hqx
+from dataclasses import dataclass
+from typing import NamedTuple
+
+MAGIC = 0x5AA5
+FRAME = struct.Struct("<HHIffBH")
+FRAME_SIZE = FRAME.size  # 19 Bytes
+_MAGIC_BYTES = struct.pack("<H", MAGIC)
+_CRC_INIT = 0xFFFF
+
+FLAG_LEFT_READY = 0x01
+FLAG_RIGHT_READY = 0x02
+
+
+class Frame(NamedTuple):
+    seq: int
+    t_us: int
+    left: float
+    right: float
+    flags: int
+
+    @property
+    def left_ready(self) -> bool:
+        return bool(self.flags & FLAG_LEFT_READY)
+
+    @property
+    def right_ready(self) -> bool:
+        return bool(self.flags & FLAG_RIGHT_READY)
+
+
+@dataclass
+class FrameStats:
+    frames: int = 0
+    crc_errors: int = 0
+    bytes_skipped: int = 0  # Bytes, die beim Resync verworfen wurden
+    lost: int = 0           # aus Lücken in seq geschätzt
+
+
+def crc16(data) -> int:
+    """CRC-16/CCITT-FALSE (Polynom 0x1021, Startwert 0xFFFF), in C über binascii."""
+    return crc_hqx(data, _CRC_INIT)
+
+
+def encode_frame(seq: int, t_us: int, left: float, right: float, flags: int = 3) -> bytes:
+    """Erzeugt ein Frame wie die Firmware (für synthetische Streams und Tests)."""
+    body = FRAME.pack(MAGIC, seq & 0xFFFF, t_us & 0xFFFFFFFF, left, right, flags, 0)[:-2]
+    return body + struct.pack("<H", crc16(body))
+
+
+class DeviceClock:
+    """
+    Rechnet t_us (micros() des Boards, 32 Bit, läuft nach ~71 min über) in
+    Unix-Zeit um. Der erste Frame wird an die Host-Zeit angeheftet, danach
+    zählt nur noch die Board-Uhr, sodass die Abstände zwischen den Samples
+    nicht vom USB-Timing abhängen.
+    """
+
+    def __init__(self):
+        self._offset = None
+        self._last = None
+        self._wraps = 0
+
+    def to_host(self, t_us: int, host_now: float) -> float:
+        if self._last is not None and t_us < self._last:
+            self._wraps += 1
+        self._last = t_us
+        seconds = (t_us + (self._wraps << 32)) / 1e6
+        if self._offset is None:
+            self._offset = host_now - seconds
+        return self._offset + seconds
+
+
+class FrameDecoder:
+    """
+    Zerlegt einen Bytestrom in Frames. feed() nimmt beliebig geschnittene
+    Blöcke an; unvollständige Frames bleiben bis zum nächsten Aufruf im Puffer.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._last_seq = None
+        self.stats = FrameStats()
+
+    def feed(self, data) -> list:
+        """Gibt alle vollständigen, CRC-gültigen Frames aus dem Puffer zurück."""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        stats = self.stats
+        unpack_from = FRAME.unpack_from
+        view = memoryview(buffer)
+        pos = 0
+        end = len(buffer)
+        try:
+            while end - pos >= FRAME_SIZE:
+                if view[pos] != 0xA5 or view[pos + 1] != 0x5A:
+                    # Resync: bis zum nächsten MAGIC springen
+                    nxt = buffer.find(_MAGIC_BYTES, pos + 1)
+                    skip_to = nxt if nxt >= 0 else end - 1
+                    stats.bytes_skipped += skip_to - pos
+                    pos = skip_to
+                    continue
+
+                _, seq, t_us, left, right, flags, crc = unpack_from(buffer, pos)
+                if crc16(view[pos:pos + FRAME_SIZE - 2]) != crc:
+                    stats.crc_errors += 1
+                    stats.bytes_skipped += 1
+                    pos += 1
+                    continue
+
+                if self._last_seq is not None:
+                    stats.lost += (seq - self._last_seq - 1) & 0xFFFF
+                self._last_seq = seq
+                stats.frames += 1
+                frames.append(Frame(seq, t_us, left, right, flags))
+                pos += FRAME_SIZE
+        finally:
+            view.release()
+        del buffer[:pos]
+        return frames
+
+    def reset(self):
+        """Nach einem Reconnect: Puffer leeren und Sequenz neu beginnen."""
+        self._buffer.clear()
+        self._last_seq = None
@@ -0,0 +1,276 @@
+"""
+csv_sink.py
+
+Gepufferte CSV-Senke für die Logger (waage.py, app_2.py).
+
+Statt pro Messwert die Datei zu öffnen, zu beschreiben und wieder zu schließen,
+hält CsvSink ein einziges Datei-Handle offen. Zeilen werden über eine begrenzte
+Queue an einen Hintergrund-Thread übergeben, der sie in Batches schreibt und
+nach einer konfigurierbaren Policy flusht (alle N Zeilen / alle T ms / fsync
+beim Stoppen).
+
+Beispiel:
+    sink = CsvSink(Path("data/run.csv"), header=["Unix Timestamp", "Position", "Value [kg]"])
+    sink.start()
+    sink.write([time.time(), "Left", 0.5])
+    ...
+    sink.stop()
+"""
+
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from telemetry import REGISTRY
+
+_STOP = object()
+
+
+@dataclass
+class SinkStats:
+    """Zähler, mit denen sich nachweisen lässt, dass keine Messwerte verloren gehen."""
+
+    rows_enqueued: int = 0
+    rows_written: int = 0
+    bytes_written: int = 0
+    flushes: int = 0
+    flush_time_total_s: float = 0.0
+    flush_time_max_s: float = 0.0
+    last_flush_s: float = 0.0
+
+    @property
+    def rows_pending(self) -> int:
+        return self.rows_enqueued - self.rows_written
+
+    @property
+    def flush_time_mean_s(self) -> float:
+        return self.flush_time_total_s / self.flushes if self.flushes else 0.0
+
+
+class CsvSink:
+    """
+    Schreibt CSV-Zeilen über einen Hintergrund-Thread in eine dauerhaft geöffnete Datei.
+
+    path:              Zieldatei.
+    header:            Falls angegeben, wird die Datei neu angelegt und der Header geschrieben.
+                       Ohne Header wird an eine bestehende Datei angehängt.
+    flush_rows:        Spätestens nach so vielen gepufferten Zeilen wird geschrieben.
+    flush_interval_ms: Spätestens nach dieser Zeit wird geschrieben (auch bei wenigen Zeilen).
+    fsync_on_stop:     Beim Stoppen zusätzlich os.fsync() aufrufen.
+    max_queue:         Größe der Queue. Ist sie voll, blockiert write() (Back-Pressure),
+                       es wird nichts verworfen.
+    name:              Label `sink` der Telemetrie, z. B. "metrics" für die Kennzahlen-Datei.
+
+    Scheitert das Schreiben im Writer-Thread (z. B. Platte voll), endet der
+    Thread; der Fehler wird beim nächsten write()/write_many() bzw. bei stop()
+    als RuntimeError (mit dem Original als __cause__) ausgelöst, statt dass
+    write() bei voller Queue ewig blockiert.
+    """
+
+    # So oft prüft ein blockiertes write(), ob der Writer-Thread noch lebt
+    PUT_POLL_S = 0.1
+
+    def __init__(
+        self,
+        path: Path,
+        header=None,
+        flush_rows: int = 256,
+        flush_interval_ms: float = 250.0,
+        fsync_on_stop: bool = True,
+        max_queue: int = 65536,
+        name: str = "csv",
+    ):
+        self.path = Path(path)
+        self.header = list(header) if header is not None else None
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval_s = max(0.0, flush_interval_ms / 1000.0)
+        self.fsync_on_stop = fsync_on_stop
+        self.name = name
+        self.stats = SinkStats()
+        self._flush_time = REGISTRY.histogram(
+            "waage_csv_flush_seconds", "Kodieren, Schreiben und Flushen eines Batches", sink=name
+        )
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._thread = None
+        self._stop_sent = False
+        self._error = None
+        self._deadline = 0.0
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+    def start(self):
+        """Öffnet die Datei und startet den Writer-Thread."""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._stop_sent = False
+            self._error = None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            mode = "w" if self.header is not None else "a"
+            self._file = self.path.open(mode, newline="", encoding="utf-8")
+            if self.header is not None:
+                self._file.write(self._encode([self.header]))
+                self._file.flush()
+            self._thread = threading.Thread(
+                target=self._run, name=f"CsvSink({self.path.name})", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """
+        Schreibt alle ausstehenden Zeilen, ruft ggf. fsync auf und schließt die Datei.
+
+        Ist der Writer-Thread nach `timeout` Sekunden nicht fertig (auch wenn
+        die Queue so lange voll bleibt), wird TimeoutError ausgelöst; der Sink
+        bleibt dann running und stop() kann erneut aufgerufen werden.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            if not self._stop_sent and self._put(_STOP, deadline):
+                self._stop_sent = True
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                raise TimeoutError(f"{self.path.name}: Writer-Thread nach {timeout} s nicht beendet")
+            self._thread = None
+        self._raise_error()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # ------------------------------------------------------------
+    # Producer API
+    # ------------------------------------------------------------
+    def write(self, row):
+        """Reiht eine einzelne Zeile ein (thread-sicher)."""
+        if not self._put((row,)):
+            self._raise_error()
+        with self._count_lock:
+            self.stats.rows_enqueued += 1
+
+    def write_many(self, rows):
+        """Reiht mehrere Zeilen als ein Queue-Element ein."""
+        rows = tuple(rows)
+        if not rows:
+            return
+        if not self._put(rows):
+            self._raise_error()
+        with self._count_lock:
+            self.stats.rows_enqueued += len(rows)
+
+    def _put(self, item, deadline: float = None) -> bool:
+        """
+        queue.put() mit Back-Pressure; False, sobald der Writer-Thread gescheitert
+        ist. Mit `deadline` (time.monotonic()) TimeoutError, wenn die Queue bis
+        dahin voll bleibt.
+        """
+        while self._error is None:
+            wait = self.PUT_POLL_S
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+            try:
+                self._queue.put(item, timeout=wait)
+                return True
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"{self.path.name}: Queue bis zum Timeout voll") from None
+        return False
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"CsvSink {self.path.name}: Schreiben fehlgeschlagen ({self._error})") from self._error
+
+    # ------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------
+    @staticmethod
+    def _encode(rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        text = self._encode(batch)
+        self._file.write(text)
+        self._file.flush()
+        elapsed = time.perf_counter() - start
+
+        stats = self.stats
+        stats.rows_written += len(batch)
+        stats.bytes_written += len(text.encode("utf-8"))
+        stats.flushes += 1
+        stats.flush_time_total_s += elapsed
+        stats.flush_time_max_s = max(stats.flush_time_max_s, elapsed)
+        stats.last_flush_s = elapsed
+        if REGISTRY.enabled:
+            self._flush_time.observe(elapsed)
+        batch.clear()
+
+    def _take(self, item, batch):
+        if item is _STOP:
+            return True
+        if not batch:
+            # Frist beginnt mit der ersten gepufferten Zeile
+            self._deadline = time.monotonic() + self.flush_interval_s
+        batch.extend(item)
+        return False
+
+    def _run(self):
+        batch = []
+        self._deadline = 0.0
+        stopping = False
+        try:
+            while not stopping:
+                # Leerer Batch: blockierend warten, sonst höchstens bis zur Flush-Frist
+                timeout = max(0.0, self._deadline - time.monotonic()) if batch else None
+                try:
+                    stopping = self._take(self._queue.get(timeout=timeout), batch)
+                except queue.Empty:
+                    pass
+
+                # Ohne zu blockieren alles mitnehmen, was bereits wartet
+                while not stopping and len(batch) < self.flush_rows:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    stopping = self._take(item, batch)
+
+                if len(batch) >= self.flush_rows or time.monotonic() >= self._deadline:
+                    self._flush(batch)
+            self._flush(batch)
+            if self.fsync_on_stop:
+                os.fsync(self._file.fileno())
+        except Exception as err:
+            # Merken statt still zu enden: write()/stop() lösen ihn beim Aufrufer aus
+            self._error = err
+        finally:
+            try:
+                self._file.close()
+            except Exception as err:
+                if self._error is None:
+                    self._error = err
+            self._file = None
@@ -0,0 +1,182 @@
+"""
+csv_tail.py
+
+Incremental reader for a run CSV that another process (waage.py, app_2.py)
+is still writing.
+
+CsvTail keeps the file open and remembers the byte offset up to which it has
+parsed complete lines. Each poll() reads only the bytes appended since then;
+an unfinished last line stays in a small buffer until its newline arrives.
+The cost per poll is therefore proportional to the new bytes, independent of
+how long the session has been running.
+
+Both CSV layouts are understood:
+    Unix Timestamp, Position, Value [kg]        (waage.py)
+    Unix Timestamp, Left Value, Right Value     (app_2.py)
+
+Example:
+    tail = CsvTail(latest_run(Path("data")))
+    while True:
+        for channel, (times, values) in tail.poll().items():
+            ...
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def latest_run(folder: Path, pattern: str = "*.csv"):
+    """The most recently modified CSV in `folder`, or None."""
+    newest, newest_mtime = None, -1.0
+    for path in Path(folder).glob(pattern):
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            continue  # deleted between glob and stat
+        if mtime > newest_mtime:
+            newest, newest_mtime = path, mtime
+    return newest
+
+
+class CsvTail:
+    """
+    path:          CSV file to follow.
+    backlog_bytes: When attaching to a file that is already large, start this
+                   many bytes before its end instead of parsing all of it.
+    max_read:      Upper bound of bytes read per poll(); a large backlog is
+                   caught up over several polls instead of blocking one.
+    """
+
+    def __init__(self, path: Path, backlog_bytes: int = 4 << 20, max_read: int = 16 << 20):
+        self.path = Path(path)
+        self.backlog_bytes = backlog_bytes
+        self.max_read = max_read
+        self.offset = 0         # file position up to which bytes have been consumed
+        self.bytes_read = 0
+        self.rows = 0
+        self.malformed = 0
+        self.restarts = 0       # file was truncated or replaced
+        self._file = None
+        self._inode = None
+        self._partial = b""
+        self._layout = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        self.close()
+        self._file = open(self.path, "rb")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._partial = b""
+        self._layout = None
+
+        # Header first, then jump close to the end of a long recording
+        header = self._file.readline()
+        if not header.endswith(b"\n"):
+            # Header not complete yet, try again on the next poll
+            self._file.seek(0)
+            self.offset = 0
+            return
+        self._set_layout(header)
+        self.offset = self._file.tell()
+        size = os.fstat(self._file.fileno()).st_size
+        if size - self.offset > self.backlog_bytes:
+            self._file.seek(size - self.backlog_bytes)
+            self._file.readline()  # skip to the start of the next complete line
+            self.offset = self._file.tell()
+
+    def _set_layout(self, header: bytes):
+        columns = [c.strip() for c in header.decode("utf-8", "replace").strip().split(",")]
+        if "Position" in columns:
+            self._layout = "long"
+        elif "Left Value" in columns and "Right Value" in columns:
+            self._layout = "wide"
+        else:
+            raise ValueError(f"{self.path.name}: unknown CSV header {columns}")
+
+    def _replaced(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False  # vanished; keep what we have
+        return st.st_ino != self._inode or st.st_size < self.offset
+
+    def poll(self) -> dict:
+        """
+        Read the bytes appended since the last call.
+
+        Returns {channel: (times, values)} as float64 arrays, only for channels
+        that received rows. Empty dict if nothing new arrived.
+        """
+        if self._file is None:
+            self._open()
+        elif self._replaced():
+            self.restarts += 1
+            self._open()
+
+        self._file.seek(self.offset)
+        data = self._file.read(self.max_read)
+        if not data:
+            return {}
+        self.offset += len(data)
+        self.bytes_read += len(data)
+
+        if self._layout is None:
+            # Still waiting for a complete header line
+            data = self._partial + data
+            end = data.find(b"\n")
+            if end < 0:
+                self._partial = data
+                return {}
+            self._set_layout(data[:end + 1])
+            self._partial = b""
+            data = data[end + 1:]
+
+        data = self._partial + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._partial = data
+            return {}
+        self._partial = data[end + 1:]
+        return self._parse(data[:end].split(b"\n"))
+
+    def _parse(self, lines) -> dict:
+        out = {}
+        malformed = 0
+        wide = self._layout == "wide"
+        for line in lines:
+            fields = line.split(b",")
+            if len(fields) != 3:
+                if line.strip():
+                    malformed += 1
+                continue
+            try:
+                t = float(fields[0])
+                if wide:
+                    for channel, raw in (("Left", fields[1]), ("Right", fields[2])):
+                        if raw.strip():
+                            _add(out, channel, t, float(raw))
+                else:
+                    _add(out, fields[1].strip().decode(), t, float(fields[2]))
+            except ValueError:
+                malformed += 1
+                continue
+            self.rows += 1
+        self.malformed += malformed
+        return {
+            channel: (np.array(times, dtype=np.float64), np.array(values, dtype=np.float64))
+            for channel, (times, values) in out.items()
+        }
+
+
+def _add(out: dict, channel: str, t: float, value: float):
+    column = out.get(channel)
+    if column is None:
+        column = out[channel] = ([], [])
+    column[0].append(t)
+    column[1].append(value)
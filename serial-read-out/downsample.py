@@ -0,0 +1,90 @@
+"""
+downsample.py
+
+Server-side downsampling of (x, y) series for plotting.
+
+- minmax_downsample: keeps the min and max of every bucket (fully vectorized,
+  spikes survive). Good default for zoomed-out views.
+- lttb: Largest-Triangle-Three-Buckets, visually closer to the original line
+  shape for smooth signals.
+- window: cuts a sorted series to a visible x-range via binary search.
+
+All functions take sorted NumPy arrays and return NumPy arrays.
+"""
+
+import numpy as np
+
+
+def window(x, y, x_min=None, x_max=None):
+    """Return the part of the (sorted) series with x_min <= x <= x_max, without copying."""
+    lo = 0 if x_min is None else np.searchsorted(x, x_min, side="left")
+    hi = len(x) if x_max is None else np.searchsorted(x, x_max, side="right")
+    # One point on each side so lines continue to the edge of the view
+    lo = max(0, lo - 1)
+    hi = min(len(x), hi + 1)
+    return x[lo:hi], y[lo:hi]
+
+
+def minmax_downsample(x, y, n_out: int):
+    """
+    Reduce the series to at most ``n_out`` points by keeping the minimum and the
+    maximum of ``(n_out - 2) // 2`` equally sized index buckets plus both end
+    points (in original order).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    n_buckets = (n_out - 2) // 2  # two slots reserved for the end points
+    if n <= n_out or n_buckets < 1:
+        return x, y
+
+    # Buckets of equal length; the remainder is folded into the last bucket
+    size = n // n_buckets
+    main = size * n_buckets
+    y_main = y[:main].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    i_min = offsets + np.argmin(y_main, axis=1)
+    i_max = offsets + np.argmax(y_main, axis=1)
+    if main < n:
+        rest = y[main:]
+        i_min[-1] = i_min[-1] if y[i_min[-1]] <= rest.min() else main + np.argmin(rest)
+        i_max[-1] = i_max[-1] if y[i_max[-1]] >= rest.max() else main + np.argmax(rest)
+
+    idx = np.unique(np.concatenate([i_min, i_max, [0, n - 1]]))
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out: int):
+    """
+    Largest-Triangle-Three-Buckets downsampling to ``n_out`` points.
+
+    The loop runs over output buckets only (a few thousand); the point
+    selection within each bucket is vectorized.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Average point of every bucket, used as the third triangle corner
+    cx = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    cy = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            nx, ny = cx[i + 1], cy[i + 1]
+        else:
+            nx, ny = x[n - 1], y[n - 1]
+        xs = x[lo:hi]
+        ys = y[lo:hi]
+        area = np.abs((x[a] - nx) * (ys - y[a]) - (x[a] - xs) * (ny - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+fake_device.py
+
+Virtuelle serielle Schnittstelle (Linux-pty), die sich wie das Board verhält.
+Damit lassen sich waage.py, app_2.py usw. ohne Hardware und mit beliebiger
+Rate testen.
+
+Quellen:
+    --replay data/serial_data_Any.csv   aufgezeichnete Messung mit Original-Timing
+    --rate 1000                         synthetischer Sinus mit N Samples/s
+
+Optionen:
+    --speed 10          Wiedergabe 10x schneller als Echtzeit
+    --garbage 0.01      Anteil zufälliger Müllzeilen
+    --not-ready 0.01    Anteil "HX711 (...) nicht bereit!"-Zeilen
+    --disconnect 30     alle 30 s die Verbindung trennen und neu aufbauen
+    --protocol binary   binäre Frames statt Textzeilen (siehe binary_protocol.py)
+    --link /tmp/ttyFAKE fester Symlink auf das aktuelle pty (überlebt Disconnects)
+
+Beispiel:
+    python fake_device.py --rate 2000 --link /tmp/ttyFAKE &
+    python waage.py --port /tmp/ttyFAKE
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+import tty
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from binary_protocol import FLAG_LEFT_READY, FLAG_RIGHT_READY, encode_frame
+
+LEFT = 0
+RIGHT = 1
+_SIDE = {LEFT: "links", RIGHT: "rechts"}
+
+# Werte, die in alten Aufnahmen aus "nicht bereit"-Zeilen entstanden sind
+NOT_READY_VALUE = 711.0
+
+
+# ------------------------------------------------------------
+# Quellen: Arrays (t [s, relativ], channel, value)
+# ------------------------------------------------------------
+def csv_source(path: Path):
+    """Liest eine Aufnahme (beide CSV-Layouts) und gibt sie zeitlich sortiert zurück."""
+    df = pd.read_csv(path, skipinitialspace=True)
+    if "Position" in df.columns:
+        t = df["Unix Timestamp"].to_numpy(dtype=np.float64)
+        channel = np.where(df["Position"].astype(str).str.strip() == "Left", LEFT, RIGHT)
+        value = df["Value [kg]"].to_numpy(dtype=np.float64)
+    else:
+        parts = []
+        for ch, column in ((LEFT, "Left Value"), (RIGHT, "Right Value")):
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+            valid = ~np.isnan(values)
+            times = df["Unix Timestamp"].to_numpy(dtype=np.float64)[valid]
+            parts.append((times, np.full(valid.sum(), ch), values[valid]))
+        t, channel, value = (np.concatenate(arrays) for arrays in zip(*parts))
+    if not len(t):
+        raise ValueError(f"{path} enthält keine Messwerte.")
+    order = np.argsort(t, kind="stable")
+    return t[order] - t[order][0], channel[order], value[order]
+
+
+def synthetic_source(rate: float, duration: float, seed: int = 0):
+    """Sinus + Rauschen, Kanäle abwechselnd, `rate` Samples/s insgesamt."""
+    rng = np.random.default_rng(seed)
+    n = max(1, int(rate * duration))
+    t = np.arange(n) / rate
+    channel = np.arange(n) % 2
+    value = 35 + 10 * np.sin(2 * math.pi * 0.2 * t) * np.where(channel == LEFT, 1, -1)
+    value += rng.normal(0, 0.05, n)
+    return t, channel, value
+
+
+# ------------------------------------------------------------
+# Kodierung wie die Firmware
+# ------------------------------------------------------------
+class Encoder:
+    def __init__(self, protocol: str, garbage: float, not_ready: float, seed: int = 0):
+        self.protocol = protocol
+        self.garbage = garbage
+        self.not_ready = not_ready
+        self.random = random.Random(seed)
+        self.seq = 0
+        self.last = [0.0, 0.0]
+        self.start = time.perf_counter()
+
+    def encode(self, channel: int, value: float) -> bytes:
+        rnd = self.random.random
+        out = b""
+        if self.garbage and rnd() < self.garbage:
+            out += bytes(self.random.getrandbits(8) for _ in range(self.random.randint(1, 40))) + b"\r\n"
+        if value == NOT_READY_VALUE or (self.not_ready and rnd() < self.not_ready):
+            if self.protocol == "text":
+                out += f"HX711 ({_SIDE[channel]}) nicht bereit!\r\n".encode()
+            return out
+
+        if self.protocol == "text":
+            # Serial.print(float) gibt zwei Nachkommastellen aus
+            return out + f"Gewicht {_SIDE[channel]}: {value:.2f} kg\r\n".encode()
+
+        self.last[channel] = value
+        flags = FLAG_LEFT_READY if channel == LEFT else FLAG_RIGHT_READY
+        t_us = int((time.perf_counter() - self.start) * 1e6)
+        frame = encode_frame(self.seq, t_us, self.last[LEFT], self.last[RIGHT], flags)
+        self.seq += 1
+        return out + frame
+
+
+# ------------------------------------------------------------
+# pty
+# ------------------------------------------------------------
+class VirtualPort:
+    """Ein pty-Paar; der Slave-Pfad ist die "serielle Schnittstelle"."""
+
+    def __init__(self, link: Path = None):
+        self.link = link
+        self.master = None
+        self.slave = None
+        self.open()
+
+    def open(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # keine Zeilenbearbeitung/Echo durch den tty-Treiber
+        self.path = os.ttyname(self.slave)
+        if self.link is not None:
+            tmp = self.link.with_name(self.link.name + ".tmp")
+            if tmp.is_symlink() or tmp.exists():
+                tmp.unlink()
+            tmp.symlink_to(self.path)
+            tmp.replace(self.link)
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def reconnect(self):
+        self.close()
+        self.open()
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master, view)
+            view = view[written:]
+
+
+def run(port: VirtualPort, source, encoder: Encoder, speed: float, disconnect: float, loop: bool):
+    """Gibt die Quelle zeitrichtig aus; mehrere fällige Samples werden in einem write() gebündelt."""
+    t, channel, value = source
+    channel = channel.tolist()
+    value = value.tolist()
+    n = len(t)
+    written = 0
+    start = time.perf_counter()
+    next_disconnect = start + disconnect if disconnect else None
+    offset = 0.0  # Zeitversatz bei --loop
+    i = 0
+    try:
+        while True:
+            if i == n:
+                if not loop:
+                    break
+                offset += t[-1] + (t[1] - t[0] if n > 1 else 1.0)
+                i = 0
+
+            now = time.perf_counter()
+            if next_disconnect is not None and now >= next_disconnect:
+                port.reconnect()
+                print(f"[INFO] Disconnect simuliert, neues pty: {port.path}")
+                next_disconnect = now + disconnect
+
+            # Alle Samples, die bis jetzt fällig sind
+            due = (now - start) * speed - offset
+            j = int(np.searchsorted(t, due, side="right"))
+            if j <= i:
+                time.sleep(min(0.001, max(0.0, (t[i] - due) / speed)))
+                continue
+
+            port.write(b"".join(encoder.encode(channel[k], value[k]) for k in range(i, j)))
+            written += j - i
+            i = j
+    except KeyboardInterrupt:
+        pass
+    except OSError as err:
+        print(f"[WARN] Schreiben fehlgeschlagen: {err}")
+
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] {written} Samples in {elapsed:.2f} s ({written / max(elapsed, 1e-9):,.0f}/s) gesendet.")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtuelles Board über ein Linux-pty.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", type=Path, help="CSV-Aufnahme, die wiedergegeben wird.")
+    source.add_argument("--rate", type=float, help="Synthetische Samples pro Sekunde.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Dauer der synthetischen Quelle [s].")
+    parser.add_argument("--speed", type=float, default=1.0, help="Faktor gegenüber Echtzeit.")
+    parser.add_argument("--loop", action="store_true", help="Quelle endlos wiederholen.")
+    parser.add_argument("--protocol", choices=["text", "binary"], default="text")
+    parser.add_argument("--garbage", type=float, default=0.0, help="Anteil Müllzeilen (0..1).")
+    parser.add_argument("--not-ready", type=float, default=0.0, help="Anteil 'nicht bereit'-Zeilen (0..1).")
+    parser.add_argument("--disconnect", type=float, default=0.0, help="Disconnect alle N Sekunden (0 = nie).")
+    parser.add_argument("--link", type=Path, default=None, help="Symlink auf das aktuelle pty.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        src = csv_source(args.replay)
+    else:
+        src = synthetic_source(args.rate, args.duration, args.seed)
+
+    port = VirtualPort(args.link)
+    print(f"[INFO] Virtuelle Schnittstelle: {args.link or port.path}")
+    encoder = Encoder(args.protocol, args.garbage, args.not_ready, args.seed)
+    try:
+        run(port, src, encoder, args.speed, args.disconnect, args.loop)
+    finally:
+        port.close()
+        if args.link is not None and args.link.is_symlink():
+            args.link.unlink()
+
+
+if __name__ == "__main__":
+    main()
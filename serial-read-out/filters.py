@@ -0,0 +1,296 @@
+"""
+filters.py
+
+Stateful, chunked filter pipeline for the weight channels, used by the live
+path (as AcquisitionCore `process=`) and the batch path (analysis.load_run).
+
+Every filter keeps the state it needs between chunks (history window, IIR
+state, last accepted sample), so running a channel through a pipeline in
+chunks of any size gives exactly the same output as running it in one go.
+
+- RangeFilter:   drops NaN and values outside [min, max], replaces the former
+                 hard-coded "> 500" threshold
+- HampelFilter:  causal Hampel outlier rejection: a sample further than
+                 `sigmas` scaled MADs from the median of the previous `window`
+                 samples is replaced by that median (or dropped); sigmas=0
+                 turns it into a plain running median
+- LowPassFilter: Butterworth IIR low-pass (scipy.signal.lfilter with carried
+                 zi); assumes a roughly constant sample rate `fs`
+- RateLimit:     drops samples that change faster than `max` per second
+                 relative to the last accepted sample
+
+Pipelines are written as specs, e.g. in runs.json or on the command line:
+
+    "range:max=500; hampel:window=7,sigmas=3; lowpass:cutoff=5,fs=80; rate:max=300"
+
+Example:
+    core = AcquisitionCore(sources, sinks, process=StreamFilter("range:max=500; hampel"))
+    t, v = FilterPipeline.from_spec("range:max=500").process(t, v)
+"""
+
+import numpy as np
+
+try:
+    from scipy import signal
+except ImportError:
+    signal = None
+
+MAX_VALUE = 500  # Values above are faulty readings (e.g. 711.0 from "nicht bereit" lines)
+DEFAULT_SPEC = f"range:max={MAX_VALUE}"
+
+_MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed data
+
+
+class Filter:
+    """
+    process(t, v) returns (keep, values): `keep` is a boolean mask over the
+    input (None: all kept), `values` the possibly replaced values for all
+    input samples.
+    """
+
+    def process(self, t: np.ndarray, v: np.ndarray):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+class RangeFilter(Filter):
+    def __init__(self, min: float = None, max: float = None):
+        self.min = min
+        self.max = max
+
+    def process(self, t, v):
+        keep = ~np.isnan(v)
+        if self.min is not None:
+            keep &= v >= self.min
+        if self.max is not None:
+            keep &= v <= self.max
+        return (None if keep.all() else keep), v
+
+
+class HampelFilter(Filter):
+    def __init__(self, window: int = 7, sigmas: float = 3.0, mode: str = "replace"):
+        if mode not in ("replace", "drop"):
+            raise ValueError(f"mode must be 'replace' or 'drop', not {mode!r}")
+        self.window = max(1, int(window))
+        self.sigmas = sigmas
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self._history = np.empty(0, dtype=np.float64)  # last `window` raw values
+
+    def process(self, t, v):
+        n = len(v)
+        data = np.concatenate([self._history, v])
+        self._history = data[-self.window:]
+        first = len(data) - n  # index of the first new sample in data
+        # Samples without a full history yet pass unchanged
+        start = max(first, self.window)
+        if start >= len(data):
+            return None, v
+
+        windows = np.lib.stride_tricks.sliding_window_view(data[:-1], self.window)[start - self.window:]
+        median = np.median(windows, axis=1)
+        x = data[start:]
+        if self.sigmas > 0:
+            mad = _MAD_SCALE * np.median(np.abs(windows - median[:, None]), axis=1)
+            outlier = np.abs(x - median) > self.sigmas * mad
+            # Constant history (MAD 0) gives no scale to judge by: keep the sample
+            outlier &= mad > 0
+        else:
+            outlier = np.ones(len(x), dtype=bool)
+
+        offset = start - first
+        if self.mode == "drop":
+            keep = np.ones(n, dtype=bool)
+            keep[offset:] = ~outlier
+            return (None if keep.all() else keep), v
+        out = v.copy()
+        out[offset:] = np.where(outlier, median, x)
+        return None, out
+
+
+class LowPassFilter(Filter):
+    def __init__(self, cutoff: float, fs: float, order: int = 2):
+        if signal is None:
+            raise RuntimeError("LowPassFilter needs scipy (pip install scipy)")
+        if not 0 < cutoff < fs / 2:
+            raise ValueError(f"cutoff must be between 0 and fs/2 ({fs / 2} Hz), not {cutoff}")
+        self.b, self.a = signal.butter(int(order), cutoff, fs=fs)
+        self._zi0 = signal.lfilter_zi(self.b, self.a)
+        self.reset()
+
+    def reset(self):
+        self._zi = None
+
+    def process(self, t, v):
+        if not len(v):
+            return None, v
+        if self._zi is None:
+            # Start in steady state at the first value instead of ramping up from 0
+            self._zi = self._zi0 * v[0]
+        out, self._zi = signal.lfilter(self.b, self.a, v, zi=self._zi)
+        return None, out
+
+
+class RateLimit(Filter):
+    """
+    max:    allowed change per second.
+    min_dt: time step assumed for samples with equal or decreasing timestamps
+            (several samples of one line share a timestamp).
+    """
+
+    def __init__(self, max: float, min_dt: float = 0.01):
+        self.max = max
+        self.min_dt = min_dt
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._v = None
+
+    def process(self, t, v):
+        n = len(v)
+        if not n:
+            return None, v
+        if self._t is None:
+            self._t, self._v = t[0], v[0]
+            start = 1
+        else:
+            start = 0
+
+        # Fast path: no violation against the previous raw sample means every
+        # sample is accepted, since then the previous raw sample is also the
+        # last accepted one
+        prev_t = np.concatenate([[self._t], t[:-1]])[start:]
+        prev_v = np.concatenate([[self._v], v[:-1]])[start:]
+        dt = np.maximum(t[start:] - prev_t, self.min_dt)
+        if np.all(np.abs(v[start:] - prev_v) <= self.max * dt):
+            self._t, self._v = t[-1], v[-1]
+            return None, v
+
+        keep = np.ones(n, dtype=bool)
+        last_t, last_v, limit, min_dt = self._t, self._v, self.max, self.min_dt
+        for i in range(start, n):
+            ti, vi = t[i], v[i]
+            if abs(vi - last_v) <= limit * max(ti - last_t, min_dt):
+                last_t, last_v = ti, vi
+            else:
+                keep[i] = False
+        self._t, self._v = last_t, last_v
+        return keep, v
+
+
+FILTERS = {
+    "range": RangeFilter,
+    "hampel": HampelFilter,
+    "lowpass": LowPassFilter,
+    "rate": RateLimit,
+}
+
+_PARAMETERS = {
+    "range": {"min", "max"},
+    "hampel": {"window", "sigmas", "mode"},
+    "lowpass": {"cutoff", "fs", "order"},
+    "rate": {"max", "min_dt"},
+}
+
+
+def parse_spec(spec: str) -> list:
+    """'range:max=500; hampel:window=7' -> [RangeFilter(max=500), HampelFilter(window=7)]"""
+    filters = []
+    for part in (spec or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, args = part.partition(":")
+        name = name.strip().lower()
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter {name!r}, expected one of {sorted(FILTERS)}")
+        kwargs = {}
+        for arg in filter(None, (a.strip() for a in args.split(","))):
+            key, _, value = arg.partition("=")
+            key = key.strip()
+            if key not in _PARAMETERS[name]:
+                raise ValueError(f"{name}: unknown parameter {key!r}, expected one of {sorted(_PARAMETERS[name])}")
+            value = value.strip()
+            try:
+                kwargs[key] = float(value)
+            except ValueError:
+                kwargs[key] = value
+        filters.append(FILTERS[name](**kwargs))
+    return filters
+
+
+class FilterPipeline:
+    """Filters of one channel, applied in order; dropped samples do not reach later filters."""
+
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    @classmethod
+    def from_spec(cls, spec: str):
+        return cls(parse_spec(spec))
+
+    def reset(self):
+        for f in self.filters:
+            f.reset()
+
+    def process(self, t, v):
+        """Returns the filtered (t, v)."""
+        t, v, _ = self.process_indexed(t, v)
+        return t, v
+
+    def process_indexed(self, t, v):
+        """Like process(), plus the input index of every output sample."""
+        t = np.asarray(t, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64)
+        index = np.arange(len(t))
+        for f in self.filters:
+            if not len(t):
+                break
+            keep, v = f.process(t, v)
+            if keep is not None:
+                t, v, index = t[keep], v[keep], index[keep]
+        return t, v, index
+
+
+class StreamFilter:
+    """
+    Batch filter for AcquisitionCore(process=...): one pipeline per channel,
+    created from `spec` when the channel first appears. Keeps the order of the
+    remaining samples.
+    """
+
+    def __init__(self, spec: str = DEFAULT_SPEC):
+        self.spec = spec
+        parse_spec(spec)  # fail early on typos
+        self._pipelines = {}
+
+    def reset(self):
+        self._pipelines = {}
+
+    def __call__(self, batch: list) -> list:
+        if not batch:
+            return batch
+        by_channel = {}
+        for i, sample in enumerate(batch):
+            by_channel.setdefault(sample.channel, []).append(i)
+
+        out = []
+        for channel, positions in by_channel.items():
+            pipeline = self._pipelines.get(channel)
+            if pipeline is None:
+                pipeline = self._pipelines[channel] = FilterPipeline.from_spec(self.spec)
+            t = np.fromiter((batch[i].t for i in positions), dtype=np.float64, count=len(positions))
+            v = np.fromiter((batch[i].value for i in positions), dtype=np.float64, count=len(positions))
+            _, values, index = pipeline.process_indexed(t, v)
+            for j, value in zip(index.tolist(), values.tolist()):
+                i = positions[j]
+                sample = batch[i]
+                out.append((i, sample if sample.value == value else sample._replace(value=value)))
+        if len(by_channel) > 1:
+            out.sort(key=lambda item: item[0])
+        return [sample for _, sample in out]
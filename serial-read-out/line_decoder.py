@@ -0,0 +1,167 @@
+"""
+line_decoder.py
+
+Gemeinsamer Decoder für das Textprotokoll der Firmware (waegezelle/src/main.cpp).
+
+Arbeitet direkt auf den Bytes von ser.readline(), ohne die Zeile zu dekodieren
+oder in Groß-/Kleinschreibung umzuwandeln. Erkannte Zeilen:
+
+    b"Gewicht links: 12.34 kg"        -> Sample("Left", 12.34)
+    b"Gewicht rechts: -0.01 kg"       -> Sample("Right", -0.01)
+    b"HX711 (links) nicht bereit!"    -> kein Sample, zählt als not_ready
+    b"HX711 ist bereit!"              -> kein Sample, zählt als banner
+
+Alles andere wird als malformed gezählt. Früher wurden aus "nicht bereit"-Zeilen
+die Ziffern von "HX711" als Messwert 711.0 gespeichert, das passiert hier nicht.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+LEFT = "Left"
+RIGHT = "Right"
+
+_CHANNELS = {
+    b"links": LEFT,
+    b"left": LEFT,
+    b"rechts": RIGHT,
+    b"right": RIGHT,
+}
+
+# Schneller Pfad für das exakte Firmware-Format "Gewicht <kanal>: <wert> kg"
+_FIRMWARE_HEADS = {
+    b"Gewicht links": LEFT,
+    b"Gewicht rechts": RIGHT,
+}
+
+# Allgemeiner Pfad: Kanalname, dann (ohne Ziffern dazwischen) die erste Zahl
+_SAMPLE = re.compile(rb"(links|rechts|left|right)\D*?(-?\d+(?:\.\d*)?|-?\.\d+)", re.IGNORECASE)
+_NOT_READY = re.compile(rb"nicht\s+bereit|not\s+ready", re.IGNORECASE)
+_BANNER = re.compile(rb"bereit|ready", re.IGNORECASE)
+
+_NAN = float("nan")
+
+
+class Sample(NamedTuple):
+    channel: str  # LEFT oder RIGHT
+    value: float
+
+
+@dataclass
+class DecoderStats:
+    lines: int = 0
+    samples: int = 0
+    not_ready: int = 0
+    banner: int = 0
+    empty: int = 0
+    malformed: int = 0
+
+
+class LineDecoder:
+    """
+    Dekodiert Zeilen (bytes) in Samples und zählt alle Zeilenarten.
+
+    scale: Faktor für den Messwert, z. B. 1 / 100 für Firmware-Versionen,
+           die Hundertstel als ganze Zahl senden.
+    bare:  Kanal für Zeilen, die nur aus einer Zahl bestehen (b"12.34\r\n",
+           Protokoll von main.py); ohne Angabe zählen sie als malformed.
+    """
+
+    def __init__(self, scale: float = 1.0, bare: str = None):
+        self.scale = scale
+        self.bare = bare
+        self.stats = DecoderStats()
+
+    def decode(self, line: bytes) -> Optional[Sample]:
+        """Gibt ein Sample zurück oder None für alle anderen Zeilenarten."""
+        stats = self.stats
+        stats.lines += 1
+
+        if self.bare is not None:
+            try:
+                value = float(line)  # float() ignoriert Leerraum und Zeilenende
+            except ValueError:
+                pass
+            else:
+                if value == value:
+                    stats.samples += 1
+                    return Sample(self.bare, value * self.scale if self.scale != 1.0 else value)
+
+        # Schneller Pfad: exaktes Firmware-Format, float() akzeptiert bytes direkt
+        head, sep, tail = line.partition(b":")
+        channel = _FIRMWARE_HEADS.get(head)
+        if channel is not None:
+            try:
+                value = float(tail.split(None, 1)[0])
+            except (ValueError, IndexError):
+                value = _NAN
+        else:
+            # "nicht bereit"-Zeilen haben nach dem Kanalnamen keine Zahl und
+            # passen daher nie auf _SAMPLE
+            match = _SAMPLE.search(line)
+            if match is not None:
+                name, number = match.groups()
+                channel = _CHANNELS[name.lower()]
+                value = float(number)
+
+        if channel is not None and value == value:  # NaN ("nan" von der Firmware) verwerfen
+            stats.samples += 1
+            if self.scale != 1.0:
+                value *= self.scale
+            return Sample(channel, value)
+
+        if not line.strip():
+            stats.empty += 1
+        elif _NOT_READY.search(line):
+            stats.not_ready += 1
+        elif _BANNER.search(line):
+            stats.banner += 1
+        else:
+            stats.malformed += 1
+        return None
+
+    def decode_many(self, lines) -> list:
+        """
+        Dekodiert mehrere Zeilen und gibt nur die Samples zurück. Gleiches
+        Ergebnis wie decode() pro Zeile; der schnelle Pfad ist hier eingebaut,
+        die Zähler werden einmal pro Aufruf statt pro Zeile erhöht, nur die
+        übrigen Zeilen gehen einzeln durch decode().
+        """
+        heads = _FIRMWARE_HEADS
+        scale = self.scale
+        decode = self.decode
+        samples = []
+        append = samples.append
+        fast = 0
+        for line in lines:
+            head, _, tail = line.partition(b":")
+            channel = heads.get(head)
+            if channel is not None:
+                try:
+                    value = float(tail.split(None, 1)[0])
+                except (ValueError, IndexError):
+                    value = _NAN
+                if value == value:
+                    append(Sample(channel, value * scale if scale != 1.0 else value))
+                    fast += 1
+                    continue
+            sample = decode(line)
+            if sample is not None:
+                append(sample)
+        stats = self.stats
+        stats.lines += fast
+        stats.samples += fast
+        return samples
+
+    def decode_block(self, data, end: int = None) -> list:
+        """
+        Dekodiert alle Zeilen in data[:end] (durch b"\n" getrennt), z. B. direkt
+        aus dem Empfangspuffer (bytearray), und gibt nur die Samples zurück.
+        Der Block wird dabei genau einmal kopiert: decode() braucht bytes, und
+        das Zerlegen per bytes.split() in C ist schneller als jede Suche nach
+        Zeilen im Puffer selbst.
+        """
+        with memoryview(data) as view:
+            block = view[:end].tobytes()
+        return self.decode_many(block.split(b"\n"))
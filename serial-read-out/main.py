@@ -1,16 +1,21 @@
 import serial
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output
-import pandas as pd
+from dash.dependencies import Input, Output, State
 import datetime
 
 import plotly.graph_objs as go
 
+from line_decoder import LEFT, LineDecoder
+
 # Initialize serial port
 # ser = serial.Serial('COM3', 115_200)  # Adjust 'COM3' to your serial port
 ser = 0  # Adjust 'COM3' to your serial port
 
+SHOWN_POINTS = 1000  # Points kept in the browser (maxPoints for extendData)
+
+decoder = LineDecoder(bare=LEFT)  # Das Board sendet hier nur die Zahl pro Zeile
+
 # Initialize Dash app
 app = dash.Dash(__name__)
 app.layout = html.Div([
@@ -19,34 +24,51 @@ app.layout = html.Div([
       id='interval-component',
       interval=1*1000,  # Update every second
       n_intervals=0
-   )
+   ),
+   dcc.Store(id='graph-cursor', storage_type='memory')  # Number of samples the client has
 ])
 
 # Initialize data storage
-data = []
+times = []
+values = []
 
-@app.callback(Output('live-graph', 'figure'),
-           [Input('interval-component', 'n_intervals')])
-def update_graph_live(n):
-   global data
+@app.callback([Output('live-graph', 'figure'),
+               Output('live-graph', 'extendData'),
+               Output('graph-cursor', 'data')],
+           [Input('interval-component', 'n_intervals')],
+           [State('graph-cursor', 'data')])
+def update_graph_live(n, cursor):
    if ser.in_waiting:
-      line = ser.readline().decode('utf-8').strip()
-      timestamp = datetime.datetime.now()
-      data.append({'time': timestamp, 'value': float(line)})
-
-   df = pd.DataFrame(data)
-   figure = {
-      'data': [go.Scatter(
-         x=df['time'],
-         y=df['value'],
-         mode='lines+markers'
-      )],
-      'layout': go.Layout(
-         xaxis=dict(range=[min(df['time']), max(df['time'])]),
-         yaxis=dict(range=[min(df['value']), max(df['value'])]),
-      )
-   }
-   return figure
+      sample = decoder.decode(ser.readline())
+      if sample is not None:
+         times.append(datetime.datetime.now())
+         values.append(sample.value)
+
+   total = len(values)
+
+   # Full redraw only for a new/reconnected client
+   if cursor is None or cursor > total:
+      figure = {
+         'data': [go.Scatter(
+            x=times[-SHOWN_POINTS:],
+            y=values[-SHOWN_POINTS:],
+            mode='lines+markers'
+         )],
+         'layout': go.Layout(
+            xaxis=dict(autorange=True),
+            yaxis=dict(autorange=True),
+            uirevision='live',
+         )
+      }
+      return figure, dash.no_update, total
+
+   if cursor == total:
+      return dash.no_update, dash.no_update, dash.no_update
+
+   # Only send the samples the client has not seen yet
+   start = max(cursor, total - SHOWN_POINTS)
+   extend = ({'x': [times[start:]], 'y': [values[start:]]}, [0], SHOWN_POINTS)
+   return dash.no_update, extend, total
 
 if __name__ == '__main__':
-   app.run_server(debug=True)
\ No newline at end of file
+   app.run_server(debug=True)
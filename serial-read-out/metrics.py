@@ -0,0 +1,352 @@
+"""
+metrics.py
+
+Online-Kennzahlen einer Messung, direkt im Erfassungspfad berechnet, statt
+erst nachträglich in plot.py / analysis.py.
+
+Jedes Sample kostet konstante Zeit, der Speicher ist unabhängig von der
+Messdauer (nur das Fenster der gleitenden Statistik wird gehalten):
+
+- pro Kanal: gleitender Mittelwert und Standardabweichung über die letzten
+  `window` Samples, EWMA-Niveau und -Trend (kg/s) mit Zeitkonstante `tau_s`
+- Left/Right: Summe, Differenz, Asymmetrie (L - R) / (L + R), laufendes
+  Integral der Differenz über der Zeit (kg*s), Abweichung vom halben
+  Körpergewicht; dazu gleitende Mittel von Differenz und Summe sowie EWMAs
+  von Differenz und Asymmetrie
+
+Left und Right kommen nicht gleichzeitig an. Bei jedem Sample eines der beiden
+Kanäle wird mit dem letzten Wert des anderen gerechnet (Sample-and-Hold),
+sofern dieser höchstens `hold_s` alt ist.
+
+Beispiel:
+    engine = OnlineMetrics(person_weight=75)
+    sinks = [..., MetricsSink(engine, CsvSink(metrics_path(csv_path), header=METRICS_COLUMNS, name="metrics"))]
+    ...
+    snap = engine.snapshot()
+    print(snap.asymmetry, snap.integral_difference)
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from acquisition import Sink
+from filters import MAX_VALUE
+from line_decoder import LEFT, RIGHT
+
+METRICS_SUFFIX = ".metrics"  # bewusst nicht .csv: gehört nicht in die Liste der Runs
+
+METRICS_COLUMNS = [
+    "Unix Timestamp",
+    "Left Mean", "Left Std", "Left EWMA", "Left Trend",
+    "Right Mean", "Right Std", "Right EWMA", "Right Trend",
+    "Sum", "Difference", "Asymmetry",
+    "Difference Mean", "Sum Mean", "Difference EWMA", "Difference Trend", "Asymmetry EWMA",
+    "Integral Difference", "Offset Left", "Offset Right",
+]
+
+
+def metrics_path(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(METRICS_SUFFIX)
+
+
+class RollingStats:
+    """Mittelwert/Varianz der letzten `window` Werte, O(1) pro Wert."""
+
+    def __init__(self, window: int):
+        self.window = max(1, int(window))
+        self._values = deque()
+        self._shift = None  # Summen relativ zum ersten Wert: keine Auslöschung bei großem Offset
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._updates = 0
+
+    def push(self, x: float):
+        if self._shift is None:
+            self._shift = x
+        y = x - self._shift
+        self._values.append(y)
+        self._sum += y
+        self._sum_sq += y * y
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._updates += 1
+        if self._updates >= self.window:
+            # Rundungsfehler der laufenden Summen regelmäßig verwerfen (amortisiert O(1))
+            self._updates = 0
+            self._sum = math.fsum(self._values)
+            self._sum_sq = math.fsum(v * v for v in self._values)
+
+    @property
+    def n(self) -> int:
+        return len(self._values)
+
+    @property
+    def mean(self) -> float:
+        if not self._values:
+            return math.nan
+        return self._shift + self._sum / len(self._values)
+
+    @property
+    def variance(self) -> float:
+        n = len(self._values)
+        if n < 2:
+            return math.nan
+        mean = self._sum / n
+        return max(0.0, (self._sum_sq - n * mean * mean) / (n - 1))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Ewma:
+    """
+    Zeitgewichteter exponentieller Mittelwert mit Trend (Holt): `level` folgt
+    dem Signal mit Zeitkonstante tau_s, `trend` ist dessen Steigung pro Sekunde.
+    Werte mit gleichem Zeitstempel (mehrere Samples einer Zeile) zählen als
+    ihr Mittelwert.
+    """
+
+    def __init__(self, tau_s: float):
+        self.tau_s = tau_s
+        self.level = math.nan
+        self.trend = 0.0
+        self._base = None  # (level, trend, t) vor dem aktuellen Zeitstempel
+        self._t = None
+        self._sum = 0.0
+        self._n = 0
+
+    def push(self, t: float, x: float):
+        if self._t is not None and t > self._t:
+            self._base = (self.level, self.trend, self._t)
+            self._sum, self._n = 0.0, 0
+        if self._t is None or t > self._t:
+            self._t = t
+        self._sum += x
+        self._n += 1
+        mean = self._sum / self._n
+
+        if self._base is None:
+            self.level = mean
+            return
+        level, trend, t0 = self._base
+        dt = self._t - t0
+        alpha = 1.0 - math.exp(-dt / self.tau_s)
+        predicted = level + trend * dt
+        self.level = predicted + alpha * (mean - predicted)
+        self.trend = trend + alpha * ((self.level - level) / dt - trend)
+
+
+@dataclass
+class ChannelMetrics:
+    n: int = 0           # Samples seit Start/Reset
+    value: float = math.nan
+    mean: float = math.nan
+    std: float = math.nan
+    ewma: float = math.nan
+    trend: float = math.nan
+
+
+@dataclass
+class MetricsSnapshot:
+    t: float = math.nan
+    channels: dict = field(default_factory=dict)  # Kanal -> ChannelMetrics
+    sum: float = math.nan
+    difference: float = math.nan
+    asymmetry: float = math.nan                  # (L - R) / (L + R)
+    difference_mean: float = math.nan
+    sum_mean: float = math.nan
+    difference_ewma: float = math.nan
+    difference_trend: float = math.nan
+    asymmetry_ewma: float = math.nan
+    integral_difference: float = 0.0             # kg*s
+    offset_left: float = math.nan                # |L - Gewicht/2|
+    offset_right: float = math.nan
+
+    def row(self, left: str = LEFT, right: str = RIGHT) -> list:
+        """Zeile für METRICS_COLUMNS."""
+        out = [self.t]
+        for name in (left, right):
+            c = self.channels.get(name, ChannelMetrics())
+            out += [c.mean, c.std, c.ewma, c.trend]
+        return out + [
+            self.sum, self.difference, self.asymmetry,
+            self.difference_mean, self.sum_mean, self.difference_ewma, self.difference_trend, self.asymmetry_ewma,
+            self.integral_difference, self.offset_left, self.offset_right,
+        ]
+
+
+class _Channel:
+    def __init__(self, window, tau_s):
+        self.stats = RollingStats(window)
+        self.ewma = Ewma(tau_s)
+        self.n = 0
+        self.t = None
+        self.value = math.nan
+
+
+class OnlineMetrics:
+    """
+    left/right:    Kanalnamen für die Paar-Kennzahlen (z. B. "platte1/Left").
+    window:        Samples der gleitenden Statistik.
+    tau_s:         Zeitkonstante der EWMAs in Sekunden.
+    person_weight: Körpergewicht in kg für die Abweichung vom halben Gewicht.
+    hold_s:        So alt darf der Wert des anderen Kanals höchstens sein.
+    min_total:     Unterhalb dieser Summe (niemand auf der Platte) keine Asymmetrie.
+    max_value:     Größere Werte sind Fehlmessungen und werden ignoriert (wie analysis.py).
+
+    update() und snapshot() sind thread-sicher (Erfassung vs. Dash-Callbacks).
+    """
+
+    def __init__(
+        self,
+        left: str = LEFT,
+        right: str = RIGHT,
+        window: int = 500,
+        tau_s: float = 2.0,
+        person_weight: float = None,
+        hold_s: float = 1.0,
+        min_total: float = 1.0,
+        max_value: float = MAX_VALUE,
+    ):
+        self.left = left
+        self.right = right
+        self.window = window
+        self.tau_s = tau_s
+        self.person_weight = person_weight
+        self.hold_s = hold_s
+        self.min_total = min_total
+        self.max_value = max_value
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._channels = {}
+            self._difference = RollingStats(self.window)
+            self._sum = RollingStats(self.window)
+            self._difference_ewma = Ewma(self.tau_s)
+            self._asymmetry_ewma = Ewma(self.tau_s)
+            self._integral = 0.0
+            self._pair_t = None
+            self._pair_difference = math.nan
+            self._pair_sum = math.nan
+            self._asymmetry = math.nan
+            self._t = math.nan
+
+    def update(self, batch):
+        """batch: Iterable von StampedSample (acquisition.py)."""
+        with self._lock:
+            for sample in batch:
+                self._add(sample.t, sample.channel, sample.value)
+
+    def add(self, t: float, channel: str, value: float):
+        with self._lock:
+            self._add(t, channel, value)
+
+    def _add(self, t, channel, value):
+        if not value <= self.max_value:  # auch NaN
+            return
+        state = self._channels.get(channel)
+        if state is None:
+            state = self._channels[channel] = _Channel(self.window, self.tau_s)
+        state.stats.push(value)
+        state.ewma.push(t, value)
+        state.n += 1
+        state.t = t
+        state.value = value
+        self._t = t
+
+        if channel == self.left:
+            other = self._channels.get(self.right)
+        elif channel == self.right:
+            other = self._channels.get(self.left)
+        else:
+            return
+        if other is None or other.t is None or t - other.t > self.hold_s:
+            return
+        left = self._channels[self.left].value
+        right = self._channels[self.right].value
+        difference = left - right
+        total = left + right
+
+        # Integral der Differenz: Rechteckregel mit der bisherigen Differenz (Sample-and-Hold)
+        if self._pair_t is not None and t > self._pair_t:
+            self._integral += self._pair_difference * (t - self._pair_t)
+        self._pair_t = t
+        self._pair_difference = difference
+        self._pair_sum = total
+
+        self._difference.push(difference)
+        self._sum.push(total)
+        self._difference_ewma.push(t, difference)
+        if total >= self.min_total:
+            self._asymmetry = difference / total
+            self._asymmetry_ewma.push(t, self._asymmetry)
+        else:
+            self._asymmetry = math.nan
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            channels = {
+                name: ChannelMetrics(
+                    c.n, c.value, c.stats.mean, c.stats.std, c.ewma.level, c.ewma.trend
+                )
+                for name, c in self._channels.items()
+            }
+            snap = MetricsSnapshot(
+                t=self._t,
+                channels=channels,
+                sum=self._pair_sum,
+                difference=self._pair_difference,
+                asymmetry=self._asymmetry,
+                difference_mean=self._difference.mean,
+                sum_mean=self._sum.mean,
+                difference_ewma=self._difference_ewma.level,
+                difference_trend=self._difference_ewma.trend,
+                asymmetry_ewma=self._asymmetry_ewma.level,
+                integral_difference=self._integral,
+            )
+        if self.person_weight is not None:
+            half = self.person_weight / 2
+            snap.offset_left = abs(channels[self.left].value - half) if self.left in channels else math.nan
+            snap.offset_right = abs(channels[self.right].value - half) if self.right in channels else math.nan
+        return snap
+
+
+class MetricsSink(Sink):
+    """
+    Füttert eine OnlineMetrics-Instanz und schreibt optional alle `interval_s`
+    Sekunden eine Zeile (METRICS_COLUMNS) über einen CsvSink neben den Run.
+    Engine und CsvSink gehören dem Aufrufer.
+    """
+
+    def __init__(self, engine: OnlineMetrics, csv_sink=None, interval_s: float = 1.0, name: str = "metrics"):
+        self.engine = engine
+        self.csv_sink = csv_sink
+        self.interval_s = interval_s
+        self.name = name
+        self._next = 0.0
+
+    async def handle(self, batch: list):
+        self.engine.update(batch)
+        if self.csv_sink is None:
+            return
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval_s
+            self.csv_sink.write(self.engine.snapshot().row(self.engine.left, self.engine.right))
+
+    async def close(self):
+        # Endstand der Messung (u. a. das vollständige Integral) immer festhalten
+        if self.csv_sink is None:
+            return
+        snap = self.engine.snapshot()
+        if snap.channels:
+            self.csv_sink.write(snap.row(self.engine.left, self.engine.right))
@@ -1,198 +1,169 @@
+import argparse
+import json
 import matplotlib.pyplot as plt
-import numpy as np
 from pathlib import Path
 
+from analysis import DEFAULT_PAIRING, analyze, load_run
+from filters import DEFAULT_SPEC
 
 
 IMG_PATH = Path(__file__).parents[1] / "serial-read-out" / "img"
 
-DATA_PATH = Path(__file__).parents[1] / "serial-read-out" / "data" / "serial_data_Lehnuebungen.csv"
+DATA_FOLDER = Path(__file__).parents[1] / "serial-read-out" / "data"
+
+DATA_PATH = DATA_FOLDER / "serial_data_Lehnuebungen.csv"
+
+# Parameter pro Messung stehen in runs.json. Die kuratierten Werte (Gewicht, Start/Ende
+# der Übung) haben Vorrang; nur was dort fehlt, kommt aus der Stehphase (segmentation.py).
+# Die erkannte Stehphase ist länger als die kuratierten Übungsfenster, ersetzt sie also nicht.
+RUNS_CONFIG = Path(__file__).parent / "runs.json"
 
 NAME = "Lehnuebungen"
 
-Person = {
-    "Any":{
-        "weight": 60,
-        "Start": 28,
-        "Ende": 67
-    },
-    "Felix":{
-        "weight": 110,
-        "Start": 28,
-        "Ende": 54
-    },
-    "Giorgio":{
-        "weight": 75,
-        "Start": 21,
-        "Ende": 47
-    },
-    "Max":{
-        "weight": 80,
-        "Start": 13,
-        "Ende": 38
-    },
-    "Lehnuebungen":{
-        "weight": 1,
-        "Start": 0,
-        "Ende": 59
-    }
-
-}
-
-
-print(DATA_PATH)
-# print("CSV-Pfad:", DATA_PATH)
-
-# ---------------------------------------------
-# 1) CSV als Text einlesen
-# ---------------------------------------------
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    lines = f.readlines()
-
-# Erste Zeile enthält den Header, den überspringen wir
-lines = lines[1:]
-
-# ---------------------------------------------
-# 2) Daten-Arrays anlegen
-# ---------------------------------------------
-times_left = []
-vals_left = []
-times_right = []
-vals_right = []
-
-# ---------------------------------------------
-# 3) Zeilen parsen
-# ---------------------------------------------
-for line in lines:
-    line = line.strip()
-    if not line:
-        continue  # leere Zeilen ignorieren
-
-    # CSV-Spalten: timestamp_str, position, value_str
-    cols = line.split(",")
-    if len(cols) < 3:
-        continue  # ungültige Zeile?
-
-    timestamp_str, position_str, value_str = cols
-    timestamp = float(timestamp_str)
-    value = float(value_str)
-
-    if value > 500:
-        continue
-    # Nach Position filtern
-    if position_str.strip() == "Left":
-        times_left.append(timestamp)
-        vals_left.append(value)
-    elif position_str.strip() == "Right":
-        times_right.append(timestamp)
-        vals_right.append(value)
-
-# ---------------------------------------------
-# 4) Zeit normalisieren (t=0 beim kleinsten Timestamp)
-# ---------------------------------------------
-if len(times_left) == 0 and len(times_right) == 0:
-    raise ValueError("Keine Daten gefunden!")
-
-t0 = min(times_left + times_right)
-times_left_rel = [t - t0 for t in times_left]
-times_right_rel = [t - t0 for t in times_right]
-
-# ---------------------------------------------
-# 5) Plot 1: Left & Right vs. Zeit
-# ---------------------------------------------
-plt.figure(figsize=(10, 5))
-plt.plot(times_left_rel, vals_left, label="Left", marker="o", markersize=2)
-plt.plot(times_right_rel, vals_right, label="Right", marker="o", markersize=2)
-
-plt.title("Left- und Right-Werte vs. Zeit (ab 0 Sekunden)")
-plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
-plt.ylabel("Wert [kg]")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(IMG_PATH / f"Messdaten - {NAME}.png")
-plt.cla()
-# plt.show()
-
-# ---------------------------------------------
-# 6) Plot 2: Differenz (Left - Right) vs. Zeit
-# ---------------------------------------------
-# ACHTUNG: Hier gehen wir davon aus, dass die "Left"-
-# und "Right"-Werte 1-zu-1 zusammengehören (gleiche Anzahl
-# und identische Zeitstempel). Wenn das nicht so ist,
-# muss man sie auf gemeinsame Timestamps matchen.
-# Für eine einfache Demo nehmen wir an:
-#   times_left[i] ~ times_right[i].
-# Dann plotten wir difference[i] = vals_left[i] - vals_right[i].
-
-min_length = min(len(vals_left), len(vals_right))
-common_times = times_left_rel[:min_length]
-difference = [vals_left[i] - vals_right[i] for i in range(min_length)]
-
-plt.figure(figsize=(10, 4))
-plt.plot(common_times, difference, marker="o", markersize=2, color="purple")
-plt.title(f"Differenz ($m_\\text{{Left}} - m_\\text{{Right}}$) über die Zeit")
-plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
-plt.ylabel(f"$m_\\text{{Left}} - m_\\text{{Right}}$ [kg]")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(IMG_PATH / f"Differenz - {NAME}.png")
-plt.cla()
-# plt.show()
-
-
-# Plot 3:
-# times_left = []
-# vals_left = []
-# times_right = []
-# vals_right = []
-person_weight = 60
-average_weight = person_weight / 2
-
-left = [abs(vals_left[i] - average_weight) for i in range(min_length)]
-right = [abs(vals_right[i] - average_weight) for i in range(min_length)]
-
-plt.figure(figsize=(10, 4))
-plt.plot(common_times, left, marker="o", markersize=2, color="blue")
-plt.plot(common_times, right, marker="o", markersize=2, color="red")
-plt.title("Average Offset")
-plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
-plt.ylabel("Kraft Delta [kg]")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(IMG_PATH / f"Anys Idea - {NAME}.png")
-plt.cla()
-# plt.show()
-
-
-# time_span = range(Person[NAME]["Start"], Person[NAME]["Ende"])
-differenz = [vals_left[i] - vals_right[i] for i in range(min_length)]
-integral_differenz = [sum(differenz[:i]) for i in range(min_length)]
-
-start_idx = next(i for i, t in enumerate(common_times) if t >= Person[NAME]["Start"])
-end_idx = next(i for i, t in enumerate(common_times) if t > Person[NAME]["Ende"])
-
-personal_adjusted_time = common_times[start_idx:end_idx]
-personal_adjusted_difference = difference[start_idx:end_idx]
-personal_adjusted_integral_difference = np.cumsum(personal_adjusted_difference)
-
-
-plt.figure(figsize=(10, 4))
-# plt.plot(common_times, combined_weight, marker="o", markersize=2, color="green", label="Summe")
-plt.plot(personal_adjusted_time, personal_adjusted_integral_difference, marker="o", markersize=2, color="red", label="Differenz")
-# plt.plot(common_times, right, marker="o", markersize=2, color="red")
-plt.title("Integral der Differenz von Links und Rechts")
-plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
-plt.ylabel("Integral der Masse über die Zeit [kg $\cdot$ s]")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(IMG_PATH / f"Integral der Differenz - {NAME}.png")
-# plt.show()
-plt.cla()
-
-print(f"Plots for {DATA_PATH} have been created")
-
-print(f"Mean right leg in specified time span: {np.mean(vals_right[Person[NAME]['Start']:Person[NAME]['Ende']])}")
-print(f"Mean left leg in specified time span: {np.mean(vals_left[Person[NAME]['Start']:Person[NAME]['Ende']])}")
-
-print(f"Mean difference in specified time span: {np.mean(differenz)}")
+
+def load_run_config(path: Path = RUNS_CONFIG) -> dict:
+    """
+    Liest runs.json und gibt pro CSV-Dateiname die Parameter zurück
+    (name, weight, start, end, pairing, filters), ergänzt um die Defaults.
+    weight/start/end = null: automatisch aus der Stehphase.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    defaults = config.get("defaults", {})
+    return {file: {**defaults, **params} for file, params in config.get("runs", {}).items()}
+
+
+def find_run(config: dict, name: str):
+    """(CSV-Dateiname, Parameter) des Eintrags mit diesem Namen aus load_run_config(), sonst None."""
+    for file, params in config.items():
+        if params.get("name") == name:
+            return file, params
+    return None
+
+
+def create_plots(
+    name: str,
+    data_path: Path,
+    img_path: Path = IMG_PATH,
+    pairing: str = DEFAULT_PAIRING,
+    start: float = None,
+    end: float = None,
+    filters: str = DEFAULT_SPEC,
+    weight: float = None,
+):
+    print(data_path)
+    # print("CSV-Pfad:", DATA_PATH)
+
+    # ---------------------------------------------
+    # 1) CSV vektorisiert einlesen, nach Position trennen, filtern (Standard: Ausreißer > 500 verwerfen)
+    # ---------------------------------------------
+    run = load_run(data_path, filters)
+
+    # start/end/weight kommen vom Aufrufer (Eintrag aus runs.json bzw. --config);
+    # was dort fehlt, bestimmt analyze() aus der Stehphase
+    result = analyze(run, weight, start=start, end=end, pairing=pairing)
+    print(f"Time span: {result.start} - {result.end} s, body weight: {result.person_weight:.1f} kg")
+
+    # ---------------------------------------------
+    # 2) Plot 1: Left & Right vs. Zeit (t=0 beim kleinsten Timestamp)
+    # ---------------------------------------------
+    plt.figure(figsize=(10, 5))
+    plt.plot(result.times_left_rel, run.vals_left, label="Left", marker="o", markersize=2)
+    plt.plot(result.times_right_rel, run.vals_right, label="Right", marker="o", markersize=2)
+
+    plt.title("Left- und Right-Werte vs. Zeit (ab 0 Sekunden)")
+    plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
+    plt.ylabel("Wert [kg]")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(img_path / f"Messdaten - {name}.png")
+    plt.cla()
+    # plt.show()
+
+    # ---------------------------------------------
+    # 3) Plot 2: Differenz (Left - Right) vs. Zeit
+    # ---------------------------------------------
+    # Standardmäßig werden "Left" und "Right" auf gemeinsame Timestamps
+    # gematcht (--pairing linear/nearest). ACHTUNG: Mit --pairing index gehen
+    # wir davon aus, dass die Werte 1-zu-1 zusammengehören (gleiche Anzahl
+    # und identische Zeitstempel).
+    plt.figure(figsize=(10, 4))
+    plt.plot(result.common_times, result.difference, marker="o", markersize=2, color="purple")
+    plt.title(f"Differenz ($m_\\text{{Left}} - m_\\text{{Right}}$) über die Zeit")
+    plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
+    plt.ylabel(f"$m_\\text{{Left}} - m_\\text{{Right}}$ [kg]")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(img_path / f"Differenz - {name}.png")
+    plt.cla()
+    # plt.show()
+
+    # Plot 3: Abweichung vom halben Körpergewicht
+    plt.figure(figsize=(10, 4))
+    plt.plot(result.common_times, result.offset_left, marker="o", markersize=2, color="blue")
+    plt.plot(result.common_times, result.offset_right, marker="o", markersize=2, color="red")
+    plt.title("Average Offset")
+    plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
+    plt.ylabel("Kraft Delta [kg]")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(img_path / f"Anys Idea - {name}.png")
+    plt.cla()
+    # plt.show()
+
+    # Plot 4: Integral der Differenz im Zeitfenster [Start, Ende]
+    plt.figure(figsize=(10, 4))
+    plt.plot(result.window_times, result.window_integral_difference, marker="o", markersize=2, color="red", label="Differenz")
+    plt.title("Integral der Differenz von Links und Rechts")
+    plt.xlabel("Zeit [s] (relativ zum ersten Messwert)")
+    plt.ylabel("Integral der Masse über die Zeit [kg $\\cdot$ s]")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(img_path / f"Integral der Differenz - {name}.png")
+    # plt.show()
+    plt.cla()
+    plt.close("all")
+
+    print(f"Plots for {data_path} have been created")
+
+    print(f"Mean right leg in specified time span: {result.mean_right}")
+    print(f"Mean left leg in specified time span: {result.mean_left}")
+
+    print(f"Mean difference in specified time span: {result.mean_difference}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erstellt die Auswertungs-Plots für eine Messung.")
+    parser.add_argument("--name", default=NAME, help="Name der Messung aus runs.json.")
+    parser.add_argument("--config", type=Path, default=RUNS_CONFIG, help="Parameterdatei (runs.json).")
+    parser.add_argument("--data", type=Path, default=None, help="CSV-Datei (Standard: Datei aus runs.json).")
+    parser.add_argument(
+        "--pairing", default=None, choices=["index", "linear", "nearest"],
+        help="Paarung von Left/Right: zeitlich synchronisiert oder über den Index "
+        f"(Standard: aus runs.json, sonst {DEFAULT_PAIRING}).",
+    )
+    args = parser.parse_args()
+
+    config = load_run_config(args.config)
+    entry = find_run(config, args.name)
+    if entry is None:
+        names = ", ".join(sorted(params["name"] for params in config.values() if "name" in params))
+        parser.error(f"--name {args.name!r} steht nicht in {args.config} (vorhanden: {names})")
+    file, params = entry
+
+    data_path = args.data if args.data is not None else DATA_FOLDER / file
+    create_plots(
+        args.name,
+        data_path,
+        pairing=args.pairing or params.get("pairing", DEFAULT_PAIRING),
+        start=params.get("start"),
+        end=params.get("end"),
+        filters=params.get("filters", DEFAULT_SPEC),
+        weight=params.get("weight"),
+    )
+
+
+if __name__ == "__main__":
+    main()
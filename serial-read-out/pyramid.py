@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+pyramid.py
+
+Multi-resolution aggregates ("pyramid") stored next to a run CSV, so a long
+recording can be shown zoomed out without reading every row.
+
+For every channel and every factor in FACTORS (10x, 100x, 1000x) the pyramid
+holds one record per block of consecutive samples:
+
+    t_first, t_last   time of the first and last sample in the block
+    min, max, mean    of the values
+    count             number of samples (only the last block may be short)
+
+Blocks are formed by sample count per channel, and each level is built from
+the one below it, so a pyramid written while recording (PyramidWriter, fed by
+acquisition.PyramidSink) is identical to one built afterwards from the CSV
+(build_pyramid / the CLI below).
+
+Layout on disk, for data/run.csv:
+    data/run.pyramid/meta.json
+    data/run.pyramid/<channel>.L10.bin, .L100.bin, .L1000.bin   (BLOCK records)
+
+The files are append-only and read through numpy memory maps, so a pyramid
+that is still being written can be queried at any time.
+
+Example:
+    pyramid = open_pyramid(Path("data/run.csv"))
+    t, v, factor = pyramid.query("Left", x_min, x_max, n_out=2000)
+
+    python pyramid.py data/                 # build missing pyramids for all CSVs
+    python pyramid.py data/run.csv --force
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+from downsample import minmax_downsample, window
+
+FACTORS = (10, 100, 1000)
+STEP = 10  # ratio between neighbouring levels
+FLUSH_INTERVAL_S = 1.0  # how often a live writer makes new blocks visible to readers
+
+BLOCK = np.dtype([
+    ("t_first", "<f8"),
+    ("t_last", "<f8"),
+    ("min", "<f8"),
+    ("max", "<f8"),
+    ("mean", "<f8"),
+    ("count", "<u4"),
+])
+
+META_FILE = "meta.json"
+PYRAMID_VERSION = 1
+
+
+def pyramid_dir(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(".pyramid")
+
+
+def _level_file(folder: Path, channel: str, factor: int) -> Path:
+    # Channel names may contain "/" (e.g. "platte1/Left")
+    return folder / f"{quote(channel, safe='')}.L{factor}.bin"
+
+
+# ------------------------------------------------------------
+# Aggregation
+# ------------------------------------------------------------
+def aggregate_samples(t: np.ndarray, v: np.ndarray, size: int) -> np.ndarray:
+    """Blocks of `size` samples; len(t) must be a multiple of size."""
+    n = len(t) // size
+    blocks = np.empty(n, dtype=BLOCK)
+    if n == 0:
+        return blocks
+    t = t.reshape(n, size)
+    v = v.reshape(n, size)
+    blocks["t_first"] = t[:, 0]
+    blocks["t_last"] = t[:, -1]
+    blocks["min"] = v.min(axis=1)
+    blocks["max"] = v.max(axis=1)
+    blocks["mean"] = v.mean(axis=1)
+    blocks["count"] = size
+    return blocks
+
+
+def aggregate_blocks(blocks: np.ndarray, size: int) -> np.ndarray:
+    """Combine every `size` consecutive blocks into one; len(blocks) must be a multiple of size."""
+    n = len(blocks) // size
+    out = np.empty(n, dtype=BLOCK)
+    if n == 0:
+        return out
+    b = blocks.reshape(n, size)
+    count = b["count"].sum(axis=1)
+    out["t_first"] = b["t_first"][:, 0]
+    out["t_last"] = b["t_last"][:, -1]
+    out["min"] = b["min"].min(axis=1)
+    out["max"] = b["max"].max(axis=1)
+    out["mean"] = (b["mean"] * b["count"]).sum(axis=1) / count
+    out["count"] = count
+    return out
+
+
+def _partial_sample_block(t, v) -> np.ndarray:
+    return aggregate_samples(t, v, len(t)) if len(t) else np.empty(0, dtype=BLOCK)
+
+
+def _partial_block(blocks) -> np.ndarray:
+    return aggregate_blocks(blocks, len(blocks)) if len(blocks) else np.empty(0, dtype=BLOCK)
+
+
+class _ChannelLevels:
+    """Per-channel state: samples and blocks that do not fill a block of the next level yet."""
+
+    def __init__(self):
+        self.t = np.empty(0, dtype=np.float64)
+        self.v = np.empty(0, dtype=np.float64)
+        self.pending = [np.empty(0, dtype=BLOCK) for _ in FACTORS[1:]]
+
+    def add(self, t, v) -> list:
+        """Returns the completed blocks per level."""
+        t = np.concatenate([self.t, t])
+        v = np.concatenate([self.v, v])
+        full = len(t) - len(t) % FACTORS[0]
+        blocks = aggregate_samples(t[:full], v[:full], FACTORS[0])
+        self.t, self.v = t[full:], v[full:]
+
+        out = [blocks]
+        for i in range(len(FACTORS) - 1):
+            blocks = np.concatenate([self.pending[i], blocks])
+            full = len(blocks) - len(blocks) % STEP
+            self.pending[i] = blocks[full:]
+            blocks = aggregate_blocks(blocks[:full], STEP)
+            out.append(blocks)
+        return out
+
+    def finish(self) -> list:
+        """The trailing short block of every level (empty where nothing is pending)."""
+        block = _partial_sample_block(self.t, self.v)
+        out = [block]
+        for i in range(len(FACTORS) - 1):
+            block = _partial_block(np.concatenate([self.pending[i], block]))
+            out.append(block)
+        self.__init__()
+        return out
+
+
+# ------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------
+class PyramidWriter:
+    """
+    Append-only pyramid writer for one run.
+
+    add() takes arrays of (time, value) per channel in time order. Completed
+    blocks are appended to the level files right away and flushed at most every
+    FLUSH_INTERVAL_S; close() writes the trailing short blocks and marks the
+    pyramid complete. Not thread-safe: call from one thread (the event loop of
+    the acquisition core).
+    """
+
+    def __init__(self, csv_path: Path, source_bytes: int = None):
+        self.folder = pyramid_dir(csv_path)
+        self.source = Path(csv_path).name
+        self.source_bytes = source_bytes
+        self.samples = 0
+        self._levels = {}
+        self._files = {}
+        self._last_flush = 0.0
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for old in self.folder.glob("*.bin"):
+            old.unlink()  # a new run in the same place starts from scratch
+        self._write_meta(complete=False)
+
+    def _write_meta(self, complete: bool):
+        meta = {
+            "version": PYRAMID_VERSION, "source": self.source, "factors": list(FACTORS),
+            "channels": list(self._levels), "complete": complete, "source_bytes": self.source_bytes,
+        }
+        tmp = self.folder / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(self.folder / META_FILE)
+
+    def add(self, channel: str, t, v):
+        t = np.asarray(t, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64)
+        valid = np.isfinite(t) & np.isfinite(v)
+        if not valid.all():
+            t, v = t[valid], v[valid]
+        if not len(t):
+            return
+        levels = self._levels.get(channel)
+        if levels is None:
+            levels = self._levels[channel] = _ChannelLevels()
+            self._files[channel] = [_level_file(self.folder, channel, f).open("ab") for f in FACTORS]
+            self._write_meta(complete=False)
+        self.samples += len(t)
+        self._append(channel, levels.add(t, v))
+
+        now = time.monotonic()
+        if now - self._last_flush >= FLUSH_INTERVAL_S:
+            self.flush()
+            self._last_flush = now
+
+    def add_samples(self, samples):
+        """StampedSample objects (acquisition.py), grouped per channel."""
+        columns = {}
+        for s in samples:
+            column = columns.get(s.channel)
+            if column is None:
+                column = columns[s.channel] = ([], [])
+            column[0].append(s.t)
+            column[1].append(s.value)
+        for channel, (t, v) in columns.items():
+            self.add(channel, t, v)
+
+    def _append(self, channel, blocks_per_level):
+        for f, blocks in zip(self._files[channel], blocks_per_level):
+            if len(blocks):
+                f.write(blocks.tobytes())
+
+    def flush(self):
+        for files in self._files.values():
+            for f in files:
+                f.flush()
+
+    def close(self):
+        if self._files is None:
+            return
+        for channel, levels in self._levels.items():
+            self._append(channel, levels.finish())
+        for files in self._files.values():
+            for f in files:
+                f.close()
+        self._files = None
+        self._write_meta(complete=True)
+
+
+def build_pyramid(csv_path: Path) -> "Pyramid":
+    """Offline builder: pyramid for an existing CSV (both layouts)."""
+    from run_format import load_run
+
+    csv_path = Path(csv_path)
+    run = load_run(csv_path)
+    writer = PyramidWriter(csv_path, source_bytes=csv_path.stat().st_size)
+    for channel, (t, v) in run.channels.items():
+        writer.add(channel, t, v)
+    writer.close()
+    return Pyramid(writer.folder)
+
+
+# ------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------
+def open_pyramid(csv_path: Path):
+    """The pyramid of a CSV, or None if there is none or it belongs to another version of the file."""
+    folder = pyramid_dir(csv_path)
+    try:
+        meta = json.loads((folder / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != PYRAMID_VERSION or meta.get("factors") != list(FACTORS):
+        return None
+    source_bytes = meta.get("source_bytes")
+    if source_bytes is not None and Path(csv_path).stat().st_size != source_bytes:
+        return None  # CSV was changed after the offline build
+    return Pyramid(folder, meta)
+
+
+class Pyramid:
+    def __init__(self, folder: Path, meta: dict = None):
+        self.folder = Path(folder)
+        self.meta = meta if meta is not None else json.loads((self.folder / META_FILE).read_text())
+        self._maps = {}  # path -> (size, memmap); remapped when a live file grows
+
+    @property
+    def channels(self) -> list:
+        return list(self.meta["channels"])
+
+    def refresh(self):
+        """Re-read meta.json, e.g. for channels that appeared while recording."""
+        self.meta = json.loads((self.folder / META_FILE).read_text())
+
+    def blocks(self, channel: str, factor: int) -> np.ndarray:
+        """All blocks of one level (read-only memory map)."""
+        path = _level_file(self.folder, channel, factor)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return np.empty(0, dtype=BLOCK)
+        n = size // BLOCK.itemsize  # ignore a record that is only partly written
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != n:
+            data = np.memmap(path, dtype=BLOCK, mode="r", shape=(n,)) if n else np.empty(0, dtype=BLOCK)
+            cached = self._maps[path] = (n, data)
+        return cached[1]
+
+    def count(self, channel: str) -> int:
+        """Number of samples of a channel covered by the pyramid."""
+        return int(self.blocks(channel, FACTORS[0])["count"].sum())
+
+    def time_range(self, channel: str):
+        blocks = self.blocks(channel, FACTORS[0])
+        if not len(blocks):
+            return None, None
+        return float(blocks["t_first"][0]), float(blocks["t_last"][-1])
+
+    def window(self, channel: str, factor: int, x_min=None, x_max=None) -> np.ndarray:
+        """Blocks of one level overlapping [x_min, x_max], plus one on each side."""
+        blocks = self.blocks(channel, factor)
+        lo = 0 if x_min is None else np.searchsorted(blocks["t_last"], x_min, side="left")
+        hi = len(blocks) if x_max is None else np.searchsorted(blocks["t_first"], x_max, side="right")
+        return blocks[max(0, lo - 1):min(len(blocks), hi + 1)]
+
+    def query(self, channel: str, x_min=None, x_max=None, n_out: int = 2000, raw=None):
+        """
+        Min/max envelope of [x_min, x_max] with at most about n_out points.
+
+        Uses the coarsest level that still has n_out / 2 blocks in the window,
+        so the work is proportional to n_out, not to the rows in the window.
+        If even the finest level is too coarse and `raw` is given (a callable
+        returning the channel's full-resolution (t, v)), the raw samples are
+        used instead. Returns (t, v, factor) with factor 1 for raw samples.
+        """
+        chosen = None
+        for factor in reversed(FACTORS):
+            blocks = self.window(channel, factor, x_min, x_max)
+            if len(blocks) >= n_out // 2:
+                chosen = factor, blocks
+                break
+
+        if chosen is None and raw is not None:
+            t, v = raw()
+            t, v = window(t, v, x_min, x_max)
+            t, v = minmax_downsample(t, v, n_out)
+            return t, v, 1
+        if chosen is None:
+            factor = FACTORS[0]
+            chosen = factor, self.window(channel, factor, x_min, x_max)
+
+        factor, blocks = chosen
+        # While recording, coarse levels lag behind; fill the end from finer levels
+        parts = [blocks]
+        end = blocks["t_last"][-1] if len(blocks) else -np.inf
+        for finer in FACTORS[:FACTORS.index(factor)][::-1]:
+            tail = self.window(channel, finer, max(end, x_min) if x_min is not None else end, x_max)
+            tail = tail[tail["t_first"] > end]
+            if len(tail):
+                parts.append(tail)
+                end = tail["t_last"][-1]
+        blocks = np.concatenate(parts) if len(parts) > 1 else blocks
+
+        t, v = _envelope(blocks)
+        t, v = minmax_downsample(t, v, n_out)
+        return t, v, factor
+
+
+def _envelope(blocks):
+    """Two points per block, min and max, at the middle of the block."""
+    mid = (blocks["t_first"] + blocks["t_last"]) / 2
+    t = np.repeat(mid, 2)
+    v = np.empty(2 * len(blocks), dtype=np.float64)
+    v[0::2] = blocks["min"]
+    v[1::2] = blocks["max"]
+    return t, v
+
+
+# ------------------------------------------------------------
+# CLI: offline builder
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build aggregate pyramids for existing run CSVs.")
+    parser.add_argument("paths", nargs="*", type=Path, default=[Path("data")],
+                        help="CSV files or folders (searched recursively). Default: data/")
+    parser.add_argument("--force", action="store_true", help="Rebuild existing pyramids.")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        files.extend(sorted(path.rglob("*.csv")) if path.is_dir() else [path])
+    for path in files:
+        if not args.force and open_pyramid(path) is not None:
+            continue
+        start = time.perf_counter()
+        try:
+            pyramid = build_pyramid(path)
+        except (ValueError, OSError) as err:
+            print(f"[WARN] {path}: {err}")
+            continue
+        counts = ", ".join(f"{ch}: {pyramid.count(ch)}" for ch in pyramid.channels)
+        print(f"[INFO] {path} ({counts}) in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
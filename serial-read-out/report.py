@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+report.py
+
+Batch-CLI: erstellt die Auswertungs-Plots (siehe plot.py) und eine Übersicht
+(summary.csv) für alle Messungen in einem Datenordner.
+
+- Parameter pro Messung (Name, Filter, ggf. Gewicht und Start/Ende) kommen
+  aus runs.json, nicht konfigurierte Dateien laufen mit den Defaults. Ohne
+  Angabe werden Zeitfenster und Körpergewicht aus der Stehphase bestimmt
+  (segmentation.py), ganze Datenordner also ohne Handarbeit ausgewertet.
+- Die Messungen werden parallel in einem Prozess-Pool ausgewertet.
+- Die Dateien werden über den Messungskatalog (run_catalog.py) gefunden;
+  Prüfsummen und leere Messungen kommen von dort, ohne erneutes Einlesen.
+- Messungen, deren CSV-Inhalt, Parameter und Auswertungscode sich seit dem
+  letzten Lauf nicht geändert haben, werden übersprungen (Cache in
+  <out>/.report_cache.json).
+
+Beispiel:
+    python report.py                # alle Messungen in data/ -> img/
+    python report.py --force -j 4   # alles neu erzeugen, 4 Prozesse
+    python report.py --person Any   # nur die Messungen einer Person
+"""
+
+import argparse
+import ast
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")  # Kein GUI-Backend in den Worker-Prozessen
+
+import plot  # noqa: E402
+from analysis import DEFAULT_PAIRING  # noqa: E402
+from filters import DEFAULT_SPEC  # noqa: E402
+from run_catalog import RunCatalog  # noqa: E402
+
+CACHE_FILE = ".report_cache.json"
+CATALOG_FILE = ".run_catalog.sqlite"  # im Datenordner, wie bei app.py
+SUMMARY_FILE = "summary.csv"
+
+# Änderungen an diesen Dateien und allen lokalen Modulen, die sie (auch
+# indirekt) importieren, machen alle Cache-Einträge ungültig
+CODE_ROOTS = ["plot.py"]
+
+PLOT_TITLES = ["Messdaten", "Differenz", "Anys Idea", "Integral der Differenz"]
+
+SUMMARY_COLUMNS = [
+    "file", "name", "status", "n_left", "n_right", "duration_s", "start_s", "end_s", "weight",
+    "mean_left", "mean_right", "mean_difference", "window_mean_difference",
+    "integral_difference",
+]
+
+
+def code_files(roots=CODE_ROOTS, folder: Path = Path(__file__).parent) -> list:
+    """
+    `roots` und alle Module aus `folder`, die sie transitiv importieren
+    (per ast, ohne sie auszuführen), sortiert nach Dateiname.
+    """
+    found = set()
+    pending = list(roots)
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.add(name)
+        tree = ast.parse((folder / name).read_bytes(), filename=name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                local = module.split(".")[0] + ".py"
+                if (folder / local).is_file():
+                    pending.append(local)
+    return sorted(found)
+
+
+def code_hash() -> str:
+    digest = hashlib.sha256()
+    folder = Path(__file__).parent
+    for name in code_files(folder=folder):
+        digest.update(name.encode())
+        digest.update((folder / name).read_bytes())
+    return digest.hexdigest()
+
+
+def discover_runs(catalog: RunCatalog, data_folder: Path, config: dict, defaults: dict, person: str = None) -> list:
+    """Findet alle CSV-Dateien über den Katalog und ordnet ihnen ihre Parameter zu."""
+    catalog.update(data_folder, pattern="*.csv")
+    folder = data_folder.resolve()
+    jobs = []
+    for run in catalog.runs(person=person, folder=folder):
+        path = Path(run.path)
+        if path.parent != folder:
+            continue  # Unterordner (z. B. uploads/) gehören nicht zum Bericht
+        params = dict(config.get(path.name) or defaults)
+        params.setdefault("name", path.stem.removeprefix("serial_data_"))
+        jobs.append({"file": path.name, "path": str(path), "params": params, "sha256": run.sha256,
+                     "empty": run.samples == 0, "error": run.error})
+    jobs.sort(key=lambda job: job["file"])
+    return jobs
+
+
+def render_run(job: dict, out_dir: str) -> dict:
+    """Worker: erstellt die Plots für eine Messung und liefert die Kennzahlen."""
+    params = job["params"]
+    row = {"file": job["file"], "name": params["name"]}
+    # Ausgaben von create_plots() nicht zwischen den Prozessen vermischen
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = plot.create_plots(
+                params["name"],
+                Path(job["path"]),
+                Path(out_dir),
+                pairing=params.get("pairing", DEFAULT_PAIRING),
+                start=params.get("start"),
+                end=params.get("end"),
+                filters=params.get("filters", DEFAULT_SPEC),
+                weight=params.get("weight"),
+            )
+        except (ValueError, StopIteration) as err:
+            return {**row, "status": f"skipped: {err}"}
+
+    ends = [t[-1] for t in (result.times_left_rel, result.times_right_rel) if len(t)]
+    row.update(
+        status="ok",
+        n_left=len(result.times_left_rel),
+        n_right=len(result.times_right_rel),
+        duration_s=float(max(ends)) if ends else 0.0,
+        start_s=result.start,
+        end_s=result.end,
+        weight=result.person_weight,
+        mean_left=result.mean_left,
+        mean_right=result.mean_right,
+        mean_difference=result.mean_difference,
+        window_mean_difference=result.window_mean_difference,
+        integral_difference=float(result.window_integral_difference[-1])
+        if len(result.window_integral_difference) else 0.0,
+    )
+    return row
+
+
+def load_cache(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(out_dir: Path, cache: dict):
+    with open(out_dir / CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+
+
+def outputs_exist(out_dir: Path, name: str) -> bool:
+    return all((out_dir / f"{title} - {name}.png").exists() for title in PLOT_TITLES)
+
+
+def build_report(
+    data_folder: Path,
+    out_dir: Path,
+    config_path: Path,
+    jobs: int = None,
+    force: bool = False,
+    person: str = None,
+    catalog_path: Path = None,
+) -> list:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(config_path, "r", encoding="utf-8") as f:
+        defaults = json.load(f).get("defaults", {})
+    catalog = RunCatalog(catalog_path or data_folder / CATALOG_FILE, config_path)
+    try:
+        runs = discover_runs(catalog, data_folder, plot.load_run_config(config_path), defaults, person)
+    finally:
+        catalog.close()
+
+    cache = {} if force else load_cache(out_dir)
+    code = code_hash()
+    rows, todo = [], []
+    for job in runs:
+        key = hashlib.sha256(
+            json.dumps([job["sha256"], job["params"], code], sort_keys=True).encode()
+        ).hexdigest()
+        job["key"] = key
+        entry = cache.get(job["file"])
+        if job["empty"]:
+            # Keine gültigen Messwerte laut Katalog, dafür lohnt kein Worker
+            status = f"skipped: {job['error'] or 'keine Messwerte'}"
+            row = {"file": job["file"], "name": job["params"]["name"], "status": status}
+            cache[job["file"]] = {"key": key, "row": row}
+            rows.append(row)
+        elif entry and entry["key"] == key and (
+            entry["row"]["status"] != "ok" or outputs_exist(out_dir, job["params"]["name"])
+        ):
+            rows.append(entry["row"])
+        else:
+            todo.append(job)
+
+    print(f"[INFO] {len(runs)} Messungen gefunden, {len(todo)} werden neu ausgewertet.")
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            futures = {pool.submit(render_run, job, str(out_dir)): job for job in todo}
+            for future in as_completed(futures):
+                job = futures[future]
+                row = future.result()
+                cache[job["file"]] = {"key": job["key"], "row": row}
+                rows.append(row)
+                print(f"[INFO] {job['file']}: {row['status']}")
+
+    # Einträge für gelöschte Dateien entfernen (bei --person nur die der Person)
+    if person is None:
+        cache = {file: entry for file, entry in cache.items() if file in {job["file"] for job in runs}}
+    save_cache(out_dir, cache)
+
+    rows.sort(key=lambda row: row["file"])
+    with open(out_dir / SUMMARY_FILE, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erstellt Plots und Kennzahlen für alle Messungen.")
+    parser.add_argument("--data", type=Path, default=plot.DATA_FOLDER, help="Ordner mit den CSV-Dateien.")
+    parser.add_argument("--out", type=Path, default=plot.IMG_PATH, help="Zielordner für Plots und summary.csv.")
+    parser.add_argument("--config", type=Path, default=plot.RUNS_CONFIG, help="Parameterdatei (runs.json).")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne).")
+    parser.add_argument("--force", action="store_true", help="Cache ignorieren und alles neu erzeugen.")
+    parser.add_argument("--person", default=None, help="Nur Messungen dieser Person auswerten.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_report(args.data, args.out, args.config, args.jobs, args.force, args.person)
+    print(f"[INFO] Fertig in {time.perf_counter() - start:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+resample.py
+
+Aligns the Left and Right channels on a common time base instead of pairing
+samples by index.
+
+The common time base is the union of both channels' timestamps. At every base
+time each channel is evaluated either by linear interpolation between its
+neighbouring samples or by taking the nearest sample. Base times where a
+channel has no sample within ``tolerance`` seconds are dropped.
+
+- align():       batch version, vectorized, O(n log n)
+- StreamAligner: chunked version for the live path; carries the last sample
+                 of each channel over between chunks and emits exactly the
+                 same rows as align() on the concatenated input, as long as
+                 neither channel lags the other by more than ``max_lag``
+"""
+
+import numpy as np
+
+METHODS = ("linear", "nearest")
+
+
+def _evaluate(t, v, tb, method: str, tolerance: float):
+    """Evaluate the channel (t, v) at base times tb; NaN where not possible."""
+    n = len(t)
+    if n == 0:
+        return np.full(len(tb), np.nan)
+
+    i = np.searchsorted(t, tb, side="right")  # t[i - 1] <= tb < t[i]
+    lo = np.clip(i - 1, 0, n - 1)
+    hi = np.clip(i, 0, n - 1)
+    t_lo, t_hi = t[lo], t[hi]
+    v_lo, v_hi = v[lo], v[hi]
+    outside = (tb < t[0]) | (tb > t[-1])
+    exact = t_lo == tb
+
+    if method == "linear":
+        span = t_hi - t_lo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(span > 0, (tb - t_lo) / span, 0.0)
+        out = v_lo + w * (v_hi - v_lo)
+        invalid = outside | (span > tolerance)
+    elif method == "nearest":
+        take_hi = (t_hi - tb) < (tb - t_lo)
+        out = np.where(take_hi, v_hi, v_lo)
+        distance = np.where(take_hi, t_hi - tb, tb - t_lo)
+        invalid = outside | (distance > tolerance)
+    else:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+
+    out = np.where(exact, v_lo, out)
+    return np.where(invalid & ~exact, np.nan, out)
+
+
+def _align_at(tb, t_left, v_left, t_right, v_right, method, tolerance):
+    left = _evaluate(t_left, v_left, tb, method, tolerance)
+    right = _evaluate(t_right, v_right, tb, method, tolerance)
+    valid = ~(np.isnan(left) | np.isnan(right))
+    return tb[valid], left[valid], right[valid]
+
+
+def _sorted(t, v):
+    t = np.asarray(t, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    if len(t) > 1 and np.any(np.diff(t) < 0):
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+    return t, v
+
+
+def align(t_left, v_left, t_right, v_right, method: str = "linear", tolerance: float = 1.0):
+    """
+    Align both channels on the union of their timestamps.
+
+    Returns ``(times, left, right)`` as float64 arrays of equal length.
+    """
+    t_left, v_left = _sorted(t_left, v_left)
+    t_right, v_right = _sorted(t_right, v_right)
+    tb = np.unique(np.concatenate([t_left, t_right]))
+    return _align_at(tb, t_left, v_left, t_right, v_right, method, tolerance)
+
+
+class _ChannelBuffer:
+    """
+    Growable, preallocated time/value buffer of one channel.
+
+    Appends write into spare capacity; consumed samples at the front only move
+    an offset. The live part is compacted to the front (or the arrays doubled)
+    when the end is reached, so appends are amortized O(chunk size).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._t = np.empty(capacity, dtype=np.float64)
+        self._v = np.empty(capacity, dtype=np.float64)
+        self._lo = 0
+        self._hi = 0
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._t[self._lo:self._hi]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._v[self._lo:self._hi]
+
+    def append(self, times, values):
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(times)
+        if self._hi + n > len(self._t):
+            size = len(self)
+            if size + n <= len(self._t) // 2:
+                self._t[:size] = self.times
+                self._v[:size] = self.values
+            else:
+                capacity = max(2 * len(self._t), 2 * (size + n))
+                t, v = np.empty(capacity, dtype=np.float64), np.empty(capacity, dtype=np.float64)
+                t[:size], v[:size] = self.times, self.values
+                self._t, self._v = t, v
+            self._lo, self._hi = 0, size
+        self._t[self._hi:self._hi + n] = times
+        self._v[self._hi:self._hi + n] = values
+        self._hi += n
+
+    def drop(self, start: int, stop: int):
+        """Remove the samples ``[start, stop)`` (relative to the live part)."""
+        if stop <= start:
+            return
+        if start == 0:
+            self._lo += stop
+            return
+        lo = self._lo
+        tail = slice(lo + stop, self._hi)
+        self._t[lo + start:lo + start + self._hi - lo - stop] = self._t[tail]
+        self._v[lo + start:lo + start + self._hi - lo - stop] = self._v[tail]
+        self._hi -= stop - start
+
+
+class StreamAligner:
+    """
+    Chunked counterpart of align() for the live path.
+
+    Samples of each channel must arrive in time order. A base time is emitted
+    once both channels have a sample at or after it, so interpolation and
+    nearest-neighbour decisions are final and identical to the batch result.
+
+    If one channel stalls, the other one cannot be emitted and would pile up.
+    Samples that arrive more than ``max_lag`` seconds behind the newest sample
+    of the other channel are therefore treated as lost: buffered samples that
+    could only pair with them are dropped, so the buffer holds at most about
+    ``max_lag + 2 * tolerance`` seconds per channel. ``max_lag=None`` keeps
+    everything (exact, but unbounded).
+    """
+
+    def __init__(self, method: str = "linear", tolerance: float = 1.0, max_lag: float = 30.0):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+        self.method = method
+        self.tolerance = tolerance
+        self.max_lag = max_lag
+        self.reset()
+
+    def reset(self):
+        self._buffers = {"left": _ChannelBuffer(), "right": _ChannelBuffer()}
+        self._emitted_until = -np.inf
+
+    def push_left(self, times, values):
+        return self.push("left", times, values)
+
+    def push_right(self, times, values):
+        return self.push("right", times, values)
+
+    def push(self, channel: str, times, values):
+        """Add samples of one channel; returns the newly aligned ``(times, left, right)``."""
+        self._buffers[channel].append(times, values)
+        left, right = self._buffers["left"], self._buffers["right"]
+
+        if not len(left) or not len(right):
+            self._bound(-np.inf)
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty, empty
+
+        t_left, t_right = left.times, right.times
+        horizon = min(t_left[-1], t_right[-1])
+        pending = [
+            t[np.searchsorted(t, self._emitted_until, side="right"):np.searchsorted(t, horizon, side="right")]
+            for t in (t_left, t_right)
+        ]
+        tb = np.unique(np.concatenate(pending))
+        result = _align_at(tb, t_left, left.values, t_right, right.values, self.method, self.tolerance)
+        if len(tb):
+            self._emitted_until = tb[-1]
+
+        # Keep the last sample at or before the horizon as carry-over, plus everything after
+        for buffer in (left, right):
+            buffer.drop(0, max(0, np.searchsorted(buffer.times, horizon, side="right") - 1))
+        self._bound(horizon)
+        return result
+
+    def _bound(self, horizon: float):
+        """
+        Drop samples that can only pair with samples lagging more than max_lag.
+
+        Base times further than ``tolerance`` from every sample of the lagging
+        channel are invalid for both methods, so everything between
+        ``horizon + tolerance`` and ``newest - max_lag - tolerance`` can go,
+        except the neighbours on both sides of that gap.
+        """
+        if self.max_lag is None:
+            return
+        newest = max((b.times[-1] for b in self._buffers.values() if len(b)), default=None)
+        if newest is None:
+            return
+        floor = newest - self.max_lag - self.tolerance
+        if floor <= horizon + self.tolerance:
+            return
+        for buffer in self._buffers.values():
+            t = buffer.times
+            first = np.searchsorted(t, horizon + self.tolerance, side="right") + 1 if horizon > -np.inf else 0
+            last = np.searchsorted(t, floor, side="left") - 1
+            # Only move the tail when at least as much is dropped as kept (amortized O(1) per sample)
+            if last > first and (first == 0 or last - first >= len(t) - last):
+                buffer.drop(first, last)
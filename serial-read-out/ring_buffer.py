@@ -0,0 +1,121 @@
+"""
+ring_buffer.py
+
+Fixed-capacity, NumPy-backed ring buffer for live (timestamp, value) samples.
+
+Timestamps are stored as float64 and values as float64 in two contiguous
+columns. Every sample is written twice (at ``i`` and ``i + capacity``), so the
+most recent ``n <= capacity`` samples always form one contiguous slice and
+``tail()`` can hand out views without copying or reordering.
+
+The buffer is safe to share between one reader thread (appending) and any
+number of Dash callbacks (reading): all index updates happen under a lock.
+Views returned by ``tail()`` stay valid until ``capacity - n`` further samples
+have been appended, which is far longer than a plot callback needs them.
+"""
+
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self._t = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._v = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._head = 0   # next write position in [0, capacity)
+        self._count = 0  # number of valid samples, <= capacity
+        self._total = 0  # samples appended since creation / last clear
+        self._epoch = 0  # incremented by clear(), lets readers detect resets
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def total(self) -> int:
+        """Number of samples appended so far (monotonic sequence number)."""
+        return self._total
+
+    @property
+    def epoch(self) -> int:
+        """Incremented on every ``clear()``; sequence numbers restart at 0."""
+        return self._epoch
+
+    def append(self, t: float, value: float):
+        """Append a single sample in O(1)."""
+        with self._lock:
+            i = self._head
+            self._t[i] = self._t[i + self.capacity] = t
+            self._v[i] = self._v[i + self.capacity] = value
+            self._head = (i + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+            self._total += 1
+
+    def extend(self, times, values):
+        """Append a batch of samples; only the last ``capacity`` are kept."""
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if times.shape != values.shape:
+            raise ValueError("times and values must have the same length")
+        n = len(times)
+        if n == 0:
+            return
+        with self._lock:
+            self._total += n
+            if n > self.capacity:
+                times = times[-self.capacity:]
+                values = values[-self.capacity:]
+                self._head = (self._head + n - self.capacity) % self.capacity
+                n = self.capacity
+            idx = (self._head + np.arange(n)) % self.capacity
+            self._t[idx] = self._t[idx + self.capacity] = times
+            self._v[idx] = self._v[idx + self.capacity] = values
+            self._head = (self._head + n) % self.capacity
+            self._count = min(self.capacity, self._count + n)
+
+    def tail(self, n: int = None):
+        """
+        Return ``(times, values)`` views of the last ``n`` samples (oldest first).
+
+        Without ``n`` the whole buffer content is returned.
+        """
+        times, values, _ = self.snapshot(n)
+        return times, values
+
+    def snapshot(self, n: int = None):
+        """Like ``tail()``, but also returns the matching sequence number for ``since()``."""
+        with self._lock:
+            n = self._count if n is None else max(0, min(int(n), self._count))
+            end = self._head + self.capacity
+            return self._t[end - n:end], self._v[end - n:end], self._total
+
+    def since(self, seq: int, limit: int = None):
+        """
+        Return ``(times, values, total)`` for the samples appended after sequence
+        number ``seq``, as views (oldest first). At most ``limit`` of the newest
+        samples are returned.
+
+        Returns ``None`` if some of the requested samples have already been
+        overwritten, i.e. the caller fell more than ``capacity`` samples behind
+        and has to start over from ``tail()``.
+        """
+        with self._lock:
+            new = self._total - int(seq)
+            if new < 0 or new > self._count:
+                return None
+            if limit is not None:
+                new = min(new, int(limit))
+            end = self._head + self.capacity
+            return self._t[end - new:end], self._v[end - new:end], self._total
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._count = 0
+            self._total = 0
+            self._epoch += 1
@@ -0,0 +1,282 @@
+"""
+run_cache.py
+
+Server-side LRU cache of parsed runs (run_store.RunData), shared by all
+dashboard sessions.
+
+Entries are keyed by a content hash, so the same recording is parsed once no
+matter whether it was uploaded from a browser or picked from data/. The cache
+keeps at most `memory_budget` bytes of channel arrays in RAM; least recently
+used runs are evicted first. With `spill_dir`, evicted runs are written as
+plain .npy files and come back via numpy memory maps, which costs a few
+milliseconds instead of a full CSV parse. The spill tier has its own budget
+and drops its oldest runs when full.
+
+Example:
+    cache = RunCache(memory_budget=512 << 20, spill_dir=Path("data/.run_cache"))
+    key = file_key(path)
+    run = cache.get_or_load(key, lambda: load_run_csv(path))
+"""
+
+import hashlib
+import itertools
+import json
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from run_store import RunData
+
+HASH_CHUNK_BYTES = 1 << 20
+
+# (path, size, mtime_ns) -> content hash, so re-selecting a file does not re-hash it
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def stat_key(path: Path) -> str:
+    """
+    Key from (path, size, mtime) only, without reading the file; for runs that
+    are served from a pyramid and only hashed (file_key) if the raw data is needed.
+    """
+    path = Path(path)
+    st = path.stat()
+    stamp = f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    return "stat-" + hashlib.sha1(stamp.encode()).hexdigest()
+
+
+def file_key(path: Path) -> str:
+    """Content hash of a file, read in chunks; memoised per (path, size, mtime)."""
+    path = Path(path)
+    st = path.stat()
+    stamp = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _file_hashes_lock:
+        key = _file_hashes.get(stamp)
+    if key is None:
+        digest = hashlib.sha1()
+        with path.open("rb") as f:
+            while chunk := f.read(HASH_CHUNK_BYTES):
+                digest.update(chunk)
+        key = digest.hexdigest()
+        with _file_hashes_lock:
+            _file_hashes[stamp] = key
+    return key
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    spills: int = 0
+    bytes: int = 0        # currently held in memory
+    disk_bytes: int = 0   # currently held in spill_dir
+
+
+class RunCache:
+    """
+    memory_budget: bytes of channel arrays kept in RAM. A single run larger than
+                   the budget is still kept (alone) while it is in use.
+    spill_dir:     optional directory for evicted runs; None disables the disk tier.
+    disk_budget:   bytes allowed in spill_dir.
+    """
+
+    def __init__(self, memory_budget: int = 1 << 30, spill_dir: Path = None, disk_budget: int = 8 << 30):
+        self.memory_budget = memory_budget
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.disk_budget = disk_budget
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> RunData, most recently used last
+        self._disk = OrderedDict()     # key -> bytes on disk, most recently used last
+        self._lock = threading.Lock()
+        self._loading = {}             # key -> Event, so concurrent callers parse once
+        self._spilling = {}            # key -> RunData evicted from RAM, being written to disk
+        self._trash = itertools.count()
+        if self.spill_dir is not None:
+            self._scan_spill_dir()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries or key in self._spilling or key in self._disk
+
+    def get(self, key):
+        """The cached run or None; promotes the entry to most recently used."""
+        with self._lock:
+            run = self._entries.get(key)
+            if run is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return run
+            run = self._spilling.get(key)
+            if run is not None:  # evicted, but its spill is still being written
+                self.stats.hits += 1
+                victims = self._insert(key, run)
+            elif key not in self._disk:
+                return None
+            else:
+                self._disk.move_to_end(key)
+        if run is None:
+            run = self._read_spill(key)
+            if run is None:
+                return None
+            with self._lock:
+                self.stats.disk_hits += 1
+                # Memory-mapped arrays count against the budget like loaded ones;
+                # the OS pages them in and out as needed
+                victims = self._insert(key, run)
+        self._spill(victims)
+        return run
+
+    def put(self, key, run: RunData):
+        with self._lock:
+            victims = self._insert(key, run)
+        self._spill(victims)
+
+    def get_or_load(self, key, load):
+        """Return the cached run for key, calling load() at most once per key."""
+        while True:
+            run = self.get(key)
+            if run is not None:
+                return run
+            with self._lock:
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    break
+            event.wait()  # another session is parsing the same file
+
+        try:
+            run = load()
+            with self._lock:
+                self.stats.misses += 1
+                victims = self._insert(key, run)
+            self._spill(victims)
+            return run
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    # ------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------
+    def _insert(self, key, run):
+        """
+        Add run and evict down to the budget; call with the lock held. Returns
+        the evicted (key, run) pairs that still have to go to disk: pass them
+        to _spill() after releasing the lock.
+        """
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.stats.bytes -= old.nbytes
+        self._entries[key] = run
+        self.stats.bytes += run.nbytes
+        victims = []
+        while self.stats.bytes > self.memory_budget and len(self._entries) > 1:
+            old_key, old_run = self._entries.popitem(last=False)
+            self.stats.bytes -= old_run.nbytes
+            self.stats.evictions += 1
+            if self.spill_dir is not None and old_key not in self._disk and old_key not in self._spilling:
+                self._spilling[old_key] = old_run
+                victims.append((old_key, old_run))
+        return victims
+
+    # ------------------------------------------------------------
+    # Disk tier: <spill_dir>/<key>/meta.json + <i>_t.npy, <i>_v.npy
+    # ------------------------------------------------------------
+    def _scan_spill_dir(self):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for folder in self.spill_dir.iterdir():
+            if folder.name.startswith("."):  # unfinished spill or left-over trash
+                shutil.rmtree(folder, ignore_errors=True)
+                continue
+            meta = folder / "meta.json"
+            if meta.is_file():
+                size = sum(p.stat().st_size for p in folder.glob("*.npy"))
+                entries.append((meta.stat().st_mtime, folder.name, size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self.stats.disk_bytes += size
+
+    def _spill(self, victims):
+        """
+        Write evicted runs to spill_dir without holding the lock; only the
+        bookkeeping (and a rename) happens under it. Folders dropped from the
+        disk tier are renamed away under the lock and deleted afterwards.
+        """
+        for key, run in victims:
+            tmp = self.spill_dir / f".{key}.tmp"
+            try:
+                self._write_spill(tmp, run)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+                with self._lock:
+                    self._spilling.pop(key, None)
+                continue
+            trash = []
+            with self._lock:
+                self._spilling.pop(key, None)
+                trash.append(self._discard_folder(key))
+                tmp.rename(self.spill_dir / key)
+                self._disk[key] = run.nbytes
+                self.stats.disk_bytes += run.nbytes
+                self.stats.spills += 1
+                while self.stats.disk_bytes > self.disk_budget and len(self._disk) > 1:
+                    old_key, size = self._disk.popitem(last=False)
+                    self.stats.disk_bytes -= size
+                    trash.append(self._discard_folder(old_key))
+            for folder in trash:
+                if folder is not None:
+                    shutil.rmtree(folder, ignore_errors=True)
+
+    def _discard_folder(self, key):
+        # Under the lock: move the folder out of the way, so it can be deleted
+        # later without racing a new spill of the same key
+        folder = self.spill_dir / key
+        if not folder.exists():
+            return None
+        trash = self.spill_dir / f".{key}.{next(self._trash)}.old"
+        folder.rename(trash)
+        return trash
+
+    @staticmethod
+    def _write_spill(tmp, run):
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        channels = []
+        for i, (channel, (t, v)) in enumerate(run.channels.items()):
+            np.save(tmp / f"{i}_t.npy", np.ascontiguousarray(t))
+            np.save(tmp / f"{i}_v.npy", np.ascontiguousarray(v))
+            channels.append(channel)
+        meta = {
+            "name": run.name, "rows": run.rows, "skipped": run.skipped,
+            "layout": run.layout, "channels": channels,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta))
+
+    def _read_spill(self, key):
+        folder = self.spill_dir / key
+        try:
+            meta = json.loads((folder / "meta.json").read_text())
+            channels = {
+                channel: (
+                    np.load(folder / f"{i}_t.npy", mmap_mode="r"),
+                    np.load(folder / f"{i}_v.npy", mmap_mode="r"),
+                )
+                for i, channel in enumerate(meta["channels"])
+            }
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                size = self._disk.pop(key, 0)
+                self.stats.disk_bytes -= size
+            return None
+        return RunData(meta["name"], channels, meta["rows"], meta["skipped"], meta.get("layout", ""))
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+run_catalog.py
+
+SQLite-Katalog aller Messungen in einem Datenordner, damit Dashboard und
+Batch-Tools Messungen auflisten und filtern können, ohne jede CSV-Datei zu
+öffnen.
+
+Pro Datei werden gespeichert: CSV-Schema (Layout und Version), Name der
+Messung und Person, Zeitspanne, und pro Kanal Anzahl, Min/Max/Mittelwert der
+gültigen Werte sowie die Zahl der Ausreißer (> filters.MAX_VALUE, z. B. 711.0
+aus dem "nicht bereit"-Pfad).
+
+update() arbeitet inkrementell: Dateien mit unveränderter Größe und mtime
+werden übersprungen; hat sich nur die mtime geändert, der Inhalt (SHA-256)
+aber nicht, wird nur der Zeitstempel nachgetragen. Nur neue oder geänderte
+Dateien werden (blockweise, siehe run_store.py) eingelesen.
+
+Beispiel:
+    python run_catalog.py                       # Katalog aktualisieren und auflisten
+    python run_catalog.py --person Max --min-duration 30
+
+    catalog = RunCatalog()
+    catalog.update(Path("data"))
+    for run in catalog.runs(non_empty=True):
+        print(run.file, run.duration_s, run.channels["Left"].mean)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from filters import MAX_VALUE
+from run_format import load_run
+
+DATA_FOLDER = Path(__file__).parent / "data"
+DEFAULT_DB = DATA_FOLDER / ".run_catalog.sqlite"
+RUNS_CONFIG = Path(__file__).parent / "runs.json"
+
+# Version des Katalogs selbst; bei Änderung werden alle Einträge neu erstellt
+CATALOG_VERSION = 1
+
+# Version des CSV-Schemas einer Messung
+SCHEMA_VERSIONS = {"long": 1, "wide": 2}
+
+_TIMESTAMP_SUFFIX = re.compile(r"_?\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
+
+_TABLES = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    person TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    schema_version INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    t_start REAL,
+    t_end REAL,
+    duration_s REAL NOT NULL,
+    error TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS channels (
+    path TEXT NOT NULL REFERENCES runs(path) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    outliers INTEGER NOT NULL,
+    PRIMARY KEY (path, channel)
+);
+CREATE INDEX IF NOT EXISTS runs_person ON runs(person);
+CREATE INDEX IF NOT EXISTS runs_start ON runs(t_start);
+"""
+
+
+@dataclass
+class ChannelSummary:
+    n: int           # gültige Werte
+    min: float
+    max: float
+    mean: float
+    outliers: int    # Werte > MAX_VALUE
+
+
+@dataclass
+class CatalogRun:
+    path: str
+    file: str
+    name: str
+    person: str
+    sha256: str
+    layout: str
+    schema_version: int
+    rows: int
+    skipped: int
+    t_start: float
+    t_end: float
+    duration_s: float
+    error: str
+    channels: dict = field(default_factory=dict)  # Kanal -> ChannelSummary
+
+    @property
+    def samples(self) -> int:
+        return sum(channel.n for channel in self.channels.values())
+
+
+@dataclass
+class UpdateStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_name(path: Path) -> str:
+    """serial_data_Any_1_2025-01-09_16-33-40.csv -> "Any_1"; nur Zeitstempel -> ""."""
+    return _TIMESTAMP_SUFFIX.sub("", path.stem.removeprefix("serial_data_"))
+
+
+def _pattern_regex(pattern: str):
+    """glob-Muster wie in Path.glob ("**/" = beliebig viele Ordner) als Regex für relative Pfade."""
+    out = []
+    for part in re.split(r"(\*\*/|\*|\?)", pattern):
+        if part == "**/":
+            out.append("(?:[^/]*/)*")
+        elif part == "*":
+            out.append("[^/]*")
+        elif part == "?":
+            out.append("[^/]")
+        else:
+            out.append(re.escape(part))
+    return re.compile("".join(out) + r"\Z")
+
+
+def _configured_names(config_path: Path) -> dict:
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            runs = json.load(f).get("runs", {})
+    except (OSError, ValueError):
+        return {}
+    return {file: params["name"] for file, params in runs.items() if "name" in params}
+
+
+def summarize(path: Path):
+    """Liest eine Messung und gibt (Kopfdaten, {Kanal: ChannelSummary}) zurück."""
+    run = load_run(path)
+    channels = {}
+    starts, ends = [], []
+    for channel, (t, v) in run.channels.items():
+        if len(t):
+            starts.append(t[0])
+            ends.append(t[-1])
+        outlier = v > MAX_VALUE
+        valid = v[~outlier]
+        channels[channel] = ChannelSummary(
+            n=len(valid),
+            min=float(valid.min()) if len(valid) else None,
+            max=float(valid.max()) if len(valid) else None,
+            mean=float(np.mean(valid)) if len(valid) else None,
+            outliers=int(outlier.sum()),
+        )
+    t_start = float(min(starts)) if starts else None
+    t_end = float(max(ends)) if ends else None
+    head = {
+        "layout": run.layout,
+        "schema_version": SCHEMA_VERSIONS[run.layout],
+        "rows": run.rows,
+        "skipped": run.skipped,
+        "t_start": t_start,
+        "t_end": t_end,
+        "duration_s": t_end - t_start if starts else 0.0,
+    }
+    return head, channels
+
+
+class RunCatalog:
+    """Dünne Schicht über einer SQLite-Datei; thread-sicher (Dash-Callbacks)."""
+
+    def __init__(self, db_path: Path = DEFAULT_DB, config_path: Path = RUNS_CONFIG):
+        self.db_path = Path(db_path)
+        self.config_path = Path(config_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA foreign_keys = ON")
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+                self._db.executescript("DROP TABLE IF EXISTS channels; DROP TABLE IF EXISTS runs;")
+                self._db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            self._db.executescript(_TABLES)
+
+    def close(self):
+        self._db.close()
+
+    # ------------------------------------------------------------
+    # Aktualisieren
+    # ------------------------------------------------------------
+    def update(self, folder: Path = DATA_FOLDER, pattern: str = "**/*.csv") -> UpdateStats:
+        """Gleicht den Katalog mit den CSV-Dateien in `folder` ab."""
+        stats = UpdateStats()
+        names = _configured_names(self.config_path)
+        folder = Path(folder)
+        seen = set()
+        with self._lock:
+            known = {
+                row["path"]: row
+                for row in self._db.execute("SELECT path, size, mtime_ns, sha256 FROM runs")
+            }
+        for path in sorted(folder.glob(pattern)):
+            key = str(path.resolve())
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            seen.add(key)
+            old = known.get(key)
+            if old is not None and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                stats.unchanged += 1
+                continue
+
+            sha = file_sha256(path)
+            if old is not None and old["sha256"] == sha:
+                with self._lock, self._db:
+                    self._db.execute("UPDATE runs SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, key))
+                stats.unchanged += 1
+                continue
+
+            self._index(path, key, st, sha, names)
+            if old is None:
+                stats.added += 1
+            else:
+                stats.updated += 1
+
+        # Nur Einträge, die dieses Muster erfasst hätte: ein Aufruf mit "*.csv"
+        # darf die Unterordner eines Aufrufs mit "**/*.csv" nicht austragen
+        root = folder.resolve()
+        matches = _pattern_regex(pattern).match
+        gone = [
+            path for path in known
+            if path not in seen and Path(path).is_relative_to(root)
+            and matches(Path(path).relative_to(root).as_posix())
+        ]
+        if gone:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM runs WHERE path = ?", [(path,) for path in gone])
+            stats.removed = len(gone)
+        return stats
+
+    def _index(self, path: Path, key: str, st, sha: str, names: dict):
+        try:
+            head, channels = summarize(path)
+            error = ""
+        except (ValueError, OSError) as err:
+            head = {"layout": "", "schema_version": 0, "rows": 0, "skipped": 0,
+                    "t_start": None, "t_end": None, "duration_s": 0.0}
+            channels = {}
+            error = str(err)
+
+        name = run_name(path)
+        person = names.get(path.name) or name.split("_")[0]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM runs WHERE path = ?", (key,))
+            self._db.execute(
+                "INSERT INTO runs VALUES (:path, :file, :name, :person, :size, :mtime_ns, :sha256, :layout,"
+                " :schema_version, :rows, :skipped, :t_start, :t_end, :duration_s, :error, :indexed_at)",
+                {
+                    "path": key, "file": path.name, "name": name, "person": person,
+                    "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha,
+                    "error": error, "indexed_at": time.time(), **head,
+                },
+            )
+            self._db.executemany(
+                "INSERT INTO channels VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(key, channel, s.n, s.min, s.max, s.mean, s.outliers) for channel, s in channels.items()],
+            )
+
+    # ------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------
+    def runs(
+        self,
+        person: str = None,
+        name: str = None,
+        min_duration: float = None,
+        non_empty: bool = False,
+        since: float = None,
+        folder: Path = None,
+    ) -> list:
+        """
+        Messungen, neueste zuerst. `name` sucht als Teilstring (ohne Groß-/
+        Kleinschreibung), `since` ist eine Unix-Zeit für den Beginn der Messung.
+        """
+        where, params = [], []
+        if person is not None:
+            where.append("person = ? COLLATE NOCASE")
+            params.append(person)
+        if name is not None:
+            where.append("name LIKE ?")
+            params.append(f"%{name}%")
+        if min_duration is not None:
+            where.append("duration_s >= ?")
+            params.append(min_duration)
+        if non_empty:
+            where.append("EXISTS (SELECT 1 FROM channels c WHERE c.path = runs.path AND c.n > 0)")
+        if since is not None:
+            where.append("t_start >= ?")
+            params.append(since)
+        if folder is not None:
+            # Präfixvergleich statt LIKE: kein "data_old" für "data", "_"/"%" sind keine Platzhalter
+            prefix = os.path.join(str(Path(folder).resolve()), "")
+            where.append("substr(path, 1, ?) = ?")
+            params += [len(prefix), prefix]
+        return self._select(where, params)
+
+    def get(self, path: Path):
+        """Eintrag einer Datei oder None."""
+        runs = self._select(["path = ?"], [str(Path(path).resolve())])
+        return runs[0] if runs else None
+
+    def _select(self, where: list, params: list) -> list:
+        condition = " WHERE " + " AND ".join(where) if where else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM runs{condition} ORDER BY t_start IS NULL, t_start DESC, file", params
+            ).fetchall()
+            channels = {}
+            for row in self._db.execute(
+                f"SELECT * FROM channels WHERE path IN (SELECT path FROM runs{condition}) ORDER BY path, channel",
+                params,
+            ):
+                channels.setdefault(row["path"], {})[row["channel"]] = ChannelSummary(
+                    row["n"], row["min"], row["max"], row["mean"], row["outliers"]
+                )
+        columns = CatalogRun.__dataclass_fields__.keys() - {"channels"}
+        return [
+            CatalogRun(**{c: row[c] for c in columns}, channels=channels.get(row["path"], {}))
+            for row in rows
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Katalog aller Messungen aktualisieren und durchsuchen.")
+    parser.add_argument("--data", type=Path, default=DATA_FOLDER, help="Ordner mit den CSV-Dateien.")
+    parser.add_argument("--db", type=Path, default=None, help="Katalogdatei (Standard: <data>/.run_catalog.sqlite).")
+    parser.add_argument("--person", default=None)
+    parser.add_argument("--name", default=None, help="Teil des Messungsnamens.")
+    parser.add_argument("--min-duration", type=float, default=None, help="Mindestdauer [s].")
+    parser.add_argument("--non-empty", action="store_true", help="Nur Messungen mit Daten.")
+    args = parser.parse_args()
+
+    catalog = RunCatalog(args.db or args.data / DEFAULT_DB.name)
+    start = time.perf_counter()
+    stats = catalog.update(args.data)
+    print(
+        f"[INFO] Katalog aktualisiert in {time.perf_counter() - start:.2f} s: {stats.added} neu, "
+        f"{stats.updated} geändert, {stats.unchanged} unverändert, {stats.removed} entfernt."
+    )
+
+    runs = catalog.runs(args.person, args.name, args.min_duration, args.non_empty, folder=args.data)
+    print(f"{'Datei':<45}{'Person':<14}{'Schema':>7}{'Dauer s':>9}{'Left':>7}{'Right':>7}{'Ausr.':>7}  Mittel L/R")
+    for run in runs:
+        left = run.channels.get("Left")
+        right = run.channels.get("Right")
+        means = "/".join(f"{c.mean:.2f}" if c and c.mean is not None else "-" for c in (left, right))
+        outliers = sum(c.outliers for c in run.channels.values())
+        print(
+            f"{run.file:<45}{run.person:<14}{run.schema_version:>7}{run.duration_s:>9.1f}"
+            f"{left.n if left else 0:>7}{right.n if right else 0:>7}{outliers:>7}  {means}"
+            + (f"  FEHLER: {run.error}" if run.error else "")
+        )
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+run_format.py
+
+Columnar binary run format, so a multi-hour run opens in milliseconds
+instead of being re-parsed from CSV text.
+
+A run is a directory next to its CSV (data/run.csv -> data/run.run/):
+
+    header.json          version, layout, channels, value dtype, row counts
+    <channel>.t          float64 timestamps, little-endian, no padding
+    <channel>.v          values (float64, or float32 if exact), same count as .t
+
+The column files are append-only, so the loggers write them incrementally
+(ColumnarWriter, fed by acquisition.ColumnarSink) and read_columnar() maps
+them with numpy.memmap without copying. A run that is still being written can
+be read at any time; columns are cut to the samples present in both files.
+
+Conversion is lossless in both directions: csv_to_columnar() parses with
+round-trip precision and only stores values as float32 if every value reads
+back as exactly the same number (otherwise float64); columnar_to_csv() writes
+the shortest text of each number, in the original layout and time order. Every
+sample comes back with the same time and value; only rows that share a
+timestamp may come back in a different channel order. The live writers store
+float64, exactly what the CSV next to them holds; load_run() only prefers a
+.run over its CSV if the header marks the values as exact.
+
+Example:
+    run = load_run(Path("data/serial_data_Any.csv"))   # .run if present, else CSV
+    t, v = run.channels["Left"]
+
+    python run_format.py data/                   # convert all CSVs without .run
+    python run_format.py data/run.run --to-csv out.csv
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+from run_store import RunData, load_run_csv
+
+RUN_SUFFIX = ".run"
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+TIME_DTYPE = np.dtype("<f8")
+VALUE_DTYPE = np.dtype("<f4")  # compact dtype, used by csv_to_columnar() only if lossless
+FLUSH_INTERVAL_S = 1.0
+
+LONG_HEADER = ["Unix Timestamp", "Position", "Value [kg]"]
+WIDE_HEADER = ["Unix Timestamp", "Left Value", "Right Value"]
+
+
+def columnar_path(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(RUN_SUFFIX)
+
+
+def _column_files(folder: Path, channel: str):
+    # Channel names may contain "/" (e.g. "platte1/Left")
+    stem = quote(channel, safe="")
+    return folder / f"{stem}.t", folder / f"{stem}.v"
+
+
+def _read_header(folder: Path) -> dict:
+    return json.loads((folder / HEADER_FILE).read_text())
+
+
+# ------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------
+class ColumnarWriter:
+    """
+    Append-only writer for one run.
+
+    layout:      "long" or "wide", the CSV layout columnar_to_csv() produces.
+    value_dtype: dtype of the value columns. float64 by default, so live runs
+                 hold the same numbers as their CSV; float32 only after a check
+                 like csv_to_columnar()'s.
+    exact:       whether the values are stored without loss (written to the
+                 header); defaults to True for float64.
+
+    add() appends (time, value) arrays of one channel; new samples become
+    visible to readers at most FLUSH_INTERVAL_S later. close() marks the run
+    complete. Not thread-safe: call from one thread (the writer thread of the
+    acquisition core's ColumnarSink).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        layout: str = "long",
+        name: str = None,
+        value_dtype=np.float64,
+        line_terminator: str = "\r\n",  # what csv.writer (CsvSink) writes
+        exact: bool = None,
+    ):
+        self.folder = Path(path)
+        self.layout = layout
+        self.line_terminator = line_terminator
+        self.name = name or self.folder.with_suffix(".csv").name
+        self.value_dtype = np.dtype(value_dtype).newbyteorder("<")
+        self.exact = self.value_dtype.itemsize >= 8 if exact is None else exact
+        self.rows = 0
+        self.skipped = 0
+        self.source_bytes = None
+        self._channels = []
+        self._files = {}
+        self._last_flush = 0.0
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for old in self.folder.glob("*.[tv]"):
+            old.unlink()  # a new run in the same place starts from scratch
+        self._write_header(complete=False)
+
+    def _write_header(self, complete: bool):
+        header = {
+            "version": FORMAT_VERSION, "name": self.name, "layout": self.layout,
+            "time_dtype": TIME_DTYPE.str, "value_dtype": self.value_dtype.str, "exact": self.exact,
+            "channels": self._channels, "rows": self.rows, "skipped": self.skipped,
+            "line_terminator": self.line_terminator, "complete": complete, "source_bytes": self.source_bytes,
+        }
+        tmp = self.folder / (HEADER_FILE + ".tmp")
+        tmp.write_text(json.dumps(header))
+        tmp.replace(self.folder / HEADER_FILE)
+
+    def add(self, channel: str, t, v):
+        if not len(t):
+            return
+        files = self._files.get(channel)
+        if files is None:
+            files = self._files[channel] = [p.open("ab") for p in _column_files(self.folder, channel)]
+            self._channels.append(channel)
+            self._write_header(complete=False)
+        files[0].write(np.asarray(t, dtype=TIME_DTYPE).tobytes())
+        files[1].write(np.asarray(v, dtype=self.value_dtype).tobytes())
+        self.rows += len(t)
+
+        now = time.monotonic()
+        if now - self._last_flush >= FLUSH_INTERVAL_S:
+            self.flush()
+            self._last_flush = now
+
+    def add_samples(self, samples):
+        """StampedSample objects (acquisition.py), grouped per channel."""
+        columns = {}
+        for s in samples:
+            column = columns.get(s.channel)
+            if column is None:
+                column = columns[s.channel] = ([], [])
+            column[0].append(s.t)
+            column[1].append(s.value)
+        for channel, (t, v) in columns.items():
+            self.add(channel, t, v)
+
+    def flush(self):
+        # Times after values: a reader never sees a timestamp without its value
+        for t_file, v_file in self._files.values():
+            v_file.flush()
+            t_file.flush()
+
+    def close(self, source_bytes: int = None):
+        """source_bytes: size of the CSV written alongside, to detect later edits."""
+        if self._files is None:
+            return
+        self.flush()
+        for files in self._files.values():
+            for f in files:
+                f.close()
+        self._files = None
+        self.source_bytes = source_bytes
+        self._write_header(complete=True)
+
+
+# ------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------
+def read_columnar(path: Path) -> RunData:
+    """Open a .run directory; channels are read-only memory maps (no copy, no parse)."""
+    folder = Path(path)
+    header = _read_header(folder)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{folder.name}: unsupported run format version {header.get('version')}")
+    time_dtype = np.dtype(header["time_dtype"])
+    value_dtype = np.dtype(header["value_dtype"])
+    channels = {}
+    for channel in header["channels"]:
+        t_path, v_path = _column_files(folder, channel)
+        # While recording, one file may be ahead of the other by a partial write
+        n = min(t_path.stat().st_size // time_dtype.itemsize, v_path.stat().st_size // value_dtype.itemsize)
+        channels[channel] = (_memmap(t_path, time_dtype, n), _memmap(v_path, value_dtype, n))
+    return RunData(header["name"], channels, header["rows"], header["skipped"], header["layout"])
+
+
+def _memmap(path, dtype, n):
+    if n == 0:
+        return np.empty(0, dtype=dtype)  # np.memmap refuses empty files
+    return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+
+def _values_exact(header: dict) -> bool:
+    # Runs from before the "exact" field: only float64 is known to be lossless
+    return bool(header.get("exact", np.dtype(header["value_dtype"]).itemsize >= 8))
+
+
+def open_columnar(csv_path: Path):
+    """The complete, up-to-date .run next to a CSV that holds its values without loss, or None."""
+    folder = columnar_path(csv_path)
+    try:
+        header = _read_header(folder)
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != FORMAT_VERSION or not header.get("complete"):
+        return None
+    source_bytes = header.get("source_bytes")
+    try:
+        if source_bytes is not None and Path(csv_path).stat().st_size != source_bytes:
+            return None  # CSV was changed after the conversion
+        if not _values_exact(header):
+            return None  # the CSV holds more precision
+    except OSError:
+        pass  # only the binary run is left
+    return folder
+
+
+def load_run(path: Path) -> RunData:
+    """Load a run from its .run directory if there is a usable one, else parse the CSV."""
+    path = Path(path)
+    if path.suffix == RUN_SUFFIX:
+        return read_columnar(path)
+    folder = open_columnar(path)
+    if folder is not None:
+        run = read_columnar(folder)
+        run.name = path.name
+        return run
+    return load_run_csv(path)
+
+
+# ------------------------------------------------------------
+# Conversion
+# ------------------------------------------------------------
+def _float32_exact(v: np.ndarray) -> bool:
+    """True if every value is the float64 parse of its shortest float32 text."""
+    if not len(v):
+        return True
+    text = v.astype(np.float32).astype(str)
+    return bool(np.array_equal(text.astype(np.float64), v, equal_nan=True))
+
+
+def csv_to_columnar(csv_path: Path, out: Path = None) -> Path:
+    csv_path = Path(csv_path)
+    out = Path(out) if out is not None else columnar_path(csv_path)
+    run = load_run_csv(csv_path, exact=True)
+    exact = all(_float32_exact(v) for _, v in run.channels.values())
+    with open(csv_path, "rb") as f:
+        line_terminator = "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+    writer = ColumnarWriter(
+        out, run.layout, csv_path.name, VALUE_DTYPE if exact else np.float64, line_terminator, exact=True
+    )
+    for channel, (t, v) in run.channels.items():
+        writer.add(channel, t, v)
+    writer.rows = run.rows
+    writer.skipped = run.skipped
+    writer.close(source_bytes=csv_path.stat().st_size)
+    return out
+
+
+def _format_values(v: np.ndarray) -> np.ndarray:
+    # numpy's str() of a float is its shortest round-trip text, for float32 as well
+    return v.astype(str)
+
+
+def columnar_to_csv(path: Path, csv_path: Path):
+    """Write a .run back as CSV in its original layout, rows in time order."""
+    header = _read_header(Path(path))
+    run = read_columnar(path)
+    names = list(run.channels)
+    t = np.concatenate([t for t, _ in run.channels.values()]) if names else np.empty(0)
+    v = np.concatenate([_format_values(v) for _, v in run.channels.values()]) if names else np.empty(0, str)
+    channel = np.repeat(np.arange(len(names)), [len(t) for t, _ in run.channels.values()])
+    # Equal timestamps (several samples of one line) alternate between the
+    # channels, as the loggers write them: order by time, then by the rank of
+    # the sample within its channel's run of equal timestamps, then by channel
+    rank = np.concatenate([np.arange(len(t)) - np.searchsorted(t, t) for t, _ in run.channels.values()]) \
+        if names else np.empty(0, dtype=np.int64)
+    order = np.lexsort((channel, rank, t))
+    t_text = t[order].astype(str)
+    v, channel = v[order], channel[order]
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator=header.get("line_terminator", "\r\n"))
+        if run.layout == "wide":
+            writer.writerow(WIDE_HEADER)
+            left = names.index("Left") if "Left" in names else -1
+            for ts, value, c in zip(t_text, v, channel):
+                writer.writerow([ts, value, ""] if c == left else [ts, "", value])
+        else:
+            writer.writerow(LONG_HEADER)
+            writer.writerows(zip(t_text, np.asarray(names, dtype=object)[channel], v))
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Convert runs between CSV and the columnar .run format.")
+    parser.add_argument("paths", nargs="*", type=Path, default=[Path("data")],
+                        help="CSV files or folders (searched recursively), or one .run with --to-csv.")
+    parser.add_argument("--to-csv", type=Path, default=None, metavar="CSV", help="Convert a .run back to CSV.")
+    parser.add_argument("--force", action="store_true", help="Convert again even if an up-to-date .run exists.")
+    args = parser.parse_args()
+
+    if args.to_csv is not None:
+        if len(args.paths) != 1:
+            parser.error("--to-csv takes exactly one .run")
+        columnar_to_csv(args.paths[0], args.to_csv)
+        print(f"[INFO] {args.paths[0]} -> {args.to_csv}")
+        return
+
+    files = []
+    for path in args.paths:
+        files.extend(sorted(path.rglob("*.csv")) if path.is_dir() else [path])
+    for path in files:
+        if not args.force and open_columnar(path) is not None:
+            continue
+        start = time.perf_counter()
+        try:
+            out = csv_to_columnar(path)
+        except (ValueError, OSError) as err:
+            shutil.rmtree(columnar_path(path), ignore_errors=True)
+            print(f"[WARN] {path}: {err}")
+            continue
+        header = _read_header(out)
+        print(f"[INFO] {path} -> {out.name} ({header['value_dtype']}) in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
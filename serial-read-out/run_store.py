@@ -0,0 +1,154 @@
+"""
+run_store.py
+
+Bounded-memory loader for (large) run CSVs.
+
+The file is parsed in chunks of CHUNK_ROWS rows by pandas' C parser, straight
+from a path or a binary file object, without first materialising the whole
+file as a string. Each chunk is split into channels in a single pass and
+appended to growable per-channel float64 columns, so peak memory is the final
+columns plus one chunk, instead of several full copies of the file.
+
+Both CSV layouts are understood:
+    Unix Timestamp, Position, Value [kg]        (waage.py)
+    Unix Timestamp, Left Value, Right Value     (app_2.py)
+
+Example:
+    run = load_run_csv(Path("data/serial_data_Any.csv"))
+    t, v = run.channels["Left"]
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 250_000  # ~20 MB of parsed chunk; larger chunks are barely faster
+
+TIME = "Unix Timestamp"
+LONG_COLUMNS = [TIME, "Position", "Value [kg]"]
+WIDE_COLUMNS = [TIME, "Left Value", "Right Value"]
+
+
+class Column:
+    """Append-only float64 (time, value) column with amortised O(1) growth."""
+
+    def __init__(self, capacity: int = 1024):
+        self._t = np.empty(capacity, dtype=np.float64)
+        self._v = np.empty(capacity, dtype=np.float64)
+        self.n = 0
+
+    def extend(self, t: np.ndarray, v: np.ndarray):
+        end = self.n + len(t)
+        if end > len(self._t):
+            capacity = max(end, 2 * len(self._t))
+            # ndarray.resize grows/shrinks in place where the allocator allows it
+            self._t.resize(capacity, refcheck=False)
+            self._v.resize(capacity, refcheck=False)
+        self._t[self.n:end] = t
+        self._v[self.n:end] = v
+        self.n = end
+
+    def finish(self):
+        """Trim to size and sort by time if needed; returns (t, v)."""
+        self._t.resize(self.n, refcheck=False)
+        self._v.resize(self.n, refcheck=False)
+        t, v = self._t, self._v
+        if self.n > 1 and np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind="stable")
+            t, v = t[order], v[order]
+        return t, v
+
+
+@dataclass
+class RunData:
+    """Parsed run: channel name -> (sorted times, values) as float64 arrays."""
+
+    name: str
+    channels: dict = field(default_factory=dict)
+    rows: int = 0
+    skipped: int = 0  # rows without a valid timestamp/value
+    layout: str = ""  # "long" (Position/Value [kg]) or "wide" (Left/Right Value)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes + v.nbytes for t, v in self.channels.values())
+
+
+def _layout(source) -> list:
+    header = pd.read_csv(source, nrows=0, skipinitialspace=True).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    columns = [c.strip() for c in header]
+    if set(LONG_COLUMNS).issubset(columns):
+        return LONG_COLUMNS
+    if set(WIDE_COLUMNS).issubset(columns):
+        return WIDE_COLUMNS
+    raise ValueError(
+        "CSV file must contain 'Unix Timestamp' and either 'Position' and 'Value [kg]' "
+        "or 'Left Value' and 'Right Value' columns."
+    )
+
+
+def load_run_csv(source, name: str = None, chunk_rows: int = CHUNK_ROWS, exact: bool = False) -> RunData:
+    """
+    source: path or binary file object (e.g. io.BytesIO of an upload).
+    exact:  parse numbers with round-trip precision (slower), so every value is
+            the float64 nearest to its text; needed for lossless conversion.
+    """
+    if name is None:
+        name = Path(source).name if isinstance(source, (str, Path)) else "upload.csv"
+    columns = _layout(source)
+    long = columns is LONG_COLUMNS
+
+    store = {}
+    run = RunData(name, layout="long" if long else "wide")
+    reader = pd.read_csv(
+        source,
+        usecols=columns,
+        # Numeric columns are parsed as float64 directly; stray text becomes NaN below
+        dtype={"Position": "category"} if long else None,
+        skipinitialspace=True,
+        chunksize=chunk_rows,
+        on_bad_lines="skip",
+        float_precision="round_trip" if exact else None,
+    )
+    for chunk in reader:
+        run.rows += len(chunk)
+        t = _numeric(chunk[TIME])
+        if long:
+            v = _numeric(chunk["Value [kg]"])
+            position = chunk["Position"].cat
+            codes = position.codes.to_numpy()
+            # One stable (radix) sort by channel code instead of one boolean scan per channel
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(-1, len(position.categories) + 1))
+            run.skipped += int(bounds[1] - bounds[0])  # code -1: empty Position
+            for code, category in enumerate(position.categories):
+                idx = order[bounds[code + 1]:bounds[code + 2]]
+                if len(idx):
+                    _append(store, run, str(category).strip(), t[idx], v[idx])
+        else:
+            for channel, column in (("Left", "Left Value"), ("Right", "Right Value")):
+                v = _numeric(chunk[column])
+                _append(store, run, channel, t, v, blanks_expected=True)
+
+    run.channels = {channel: column.finish() for channel, column in store.items()}
+    return run
+
+
+def _numeric(series) -> np.ndarray:
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _append(store, run, channel, t, v, blanks_expected=False):
+    valid = ~(np.isnan(t) | np.isnan(v))
+    if not valid.all():
+        if not blanks_expected:
+            run.skipped += int((~valid).sum())
+        t, v = t[valid], v[valid]
+    column = store.get(channel)
+    if column is None:
+        column = store[channel] = Column()
+    column.extend(t, v)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+sample_bus.py
+
+Verteilt dekodierte Samples über einen Unix-Domain-Socket an beliebig viele
+Abonnenten (Dashboards, Logger, Online-Auswertung). Die Erfassung läuft
+dadurch in einem eigenen, kopflosen Prozess (waage.py --publish), und ein
+Neustart des Dashboards verliert keine Messwerte.
+
+Protokoll (alle Zahlen little-endian):
+
+    Begrüßung   b"WAAG" + uint8 VERSION, einmal nach dem Verbinden
+    Nachricht   uint8 Typ, uint32 Länge, Nutzdaten
+      CHANNEL   uint16 id, UTF-8 "gerät\\0kanal"
+                wird vor dem ersten Sample eines Kanals gesendet, neue
+                Abonnenten bekommen die komplette Tabelle nach der Begrüßung
+      SAMPLES   n x (float64 t, uint16 id, float32 value), 14 Bytes pro Sample
+
+Langsame Abonnenten bremsen die Erfassung nie: Jeder hat eine eigene,
+begrenzte Queue; läuft sie voll, wird die Verbindung getrennt.
+
+Nur POSIX (Linux/macOS); unter Windows fehlen Unix-Sockets in asyncio.
+
+Beispiel:
+    python waage.py --port /dev/ttyUSB0 --publish /tmp/waage.sock
+    python sample_bus.py --socket /tmp/waage.sock          # Monitor
+    python app_2.py --subscribe /tmp/waage.sock            # Dashboard
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from acquisition import DeviceStatus, RawChunk, Sink, StampedSample, _sleep_or_stop
+
+MAGIC = b"WAAG"
+VERSION = 1
+HELLO = MAGIC + bytes([VERSION])
+
+TYPE_CHANNEL = 1
+TYPE_SAMPLES = 2
+
+HEADER = struct.Struct("<BI")
+CHANNEL_ID = struct.Struct("<H")
+SAMPLE = struct.Struct("<dHf")
+
+DEFAULT_SOCKET = Path("/tmp/waage.sock")
+
+
+def encode_channel(channel_id: int, device: str, channel: str) -> bytes:
+    payload = CHANNEL_ID.pack(channel_id) + f"{device}\0{channel}".encode()
+    return HEADER.pack(TYPE_CHANNEL, len(payload)) + payload
+
+
+def encode_samples(samples) -> bytes:
+    """samples: Iterable von (t, channel_id, value)."""
+    pack = SAMPLE.pack
+    payload = b"".join(pack(t, channel_id, value) for t, channel_id, value in samples)
+    return HEADER.pack(TYPE_SAMPLES, len(payload)) + payload
+
+
+class BusDecoder:
+    """
+    Zerlegt den Bytestrom eines Abonnenten in StampedSamples. feed() nimmt
+    beliebig geschnittene Blöcke an; Reste bleiben bis zum nächsten Aufruf im Puffer.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._hello = False
+        self._channels = {}
+
+    def feed(self, data) -> list:
+        buffer = self._buffer
+        buffer += data
+        if not self._hello:
+            if len(buffer) < len(HELLO):
+                return []
+            if bytes(buffer[:len(MAGIC)]) != MAGIC:
+                raise ValueError("Kein sample_bus-Server (falsche Begrüßung)")
+            if buffer[len(MAGIC)] != VERSION:
+                raise ValueError(f"Nicht unterstützte Protokollversion {buffer[len(MAGIC)]}")
+            del buffer[:len(HELLO)]
+            self._hello = True
+
+        out = []
+        pos = 0
+        end = len(buffer)
+        channels = self._channels
+        while end - pos >= HEADER.size:
+            kind, length = HEADER.unpack_from(buffer, pos)
+            start = pos + HEADER.size
+            if end - start < length:
+                break
+            if kind == TYPE_CHANNEL:
+                (channel_id,) = CHANNEL_ID.unpack_from(buffer, start)
+                name = bytes(buffer[start + CHANNEL_ID.size:start + length]).decode()
+                channels[channel_id] = tuple(name.split("\0", 1))
+            elif kind == TYPE_SAMPLES:
+                for t, channel_id, value in SAMPLE.iter_unpack(buffer[start:start + length]):
+                    device, channel = channels[channel_id]
+                    out.append(StampedSample(t, device, channel, value))
+            pos = start + length
+        del buffer[:pos]
+        return out
+
+    def reset(self):
+        self._buffer.clear()
+        self._hello = False
+        self._channels = {}
+
+
+# ------------------------------------------------------------
+# Server: Senke für den AcquisitionCore
+# ------------------------------------------------------------
+@dataclass
+class PublisherStats:
+    subscribers: int = 0     # aktuell verbunden
+    connections: int = 0     # insgesamt
+    dropped: int = 0         # wegen voller Queue getrennt
+    batches: int = 0
+    bytes_sent: int = 0
+
+
+class SamplePublisher(Sink):
+    """
+    path:        Pfad des Unix-Sockets; eine verwaiste Socket-Datei wird ersetzt.
+    max_pending: Nachrichten, die pro Abonnent höchstens warten dürfen.
+    """
+
+    name = "publish"
+
+    def __init__(self, path: Path = DEFAULT_SOCKET, max_pending: int = 1024):
+        self.path = Path(path)
+        self.max_pending = max_pending
+        self.stats = PublisherStats()
+        self._server = None
+        self._clients = {}  # writer -> Queue
+        self._channel_ids = {}
+        self._channel_table = []
+
+    async def start(self):
+        if self.path.is_socket():
+            self.path.unlink()
+        self._server = await asyncio.start_unix_server(self._serve, path=str(self.path))
+        print(f"[INFO] Samples werden über {self.path} veröffentlicht.")
+
+    async def close(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for writer, queue in list(self._clients.items()):
+            try:
+                queue.put_nowait(None)  # ausstehende Nachrichten noch senden
+            except asyncio.QueueFull:
+                self._drop(writer, queue)
+        await self._server.wait_closed()
+        self._server = None
+        if self.path.is_socket():
+            self.path.unlink()
+
+    async def handle(self, batch: list):
+        messages = []
+        ids = self._channel_ids
+        for sample in batch:
+            key = (sample.device, sample.channel)
+            if key not in ids:
+                ids[key] = len(ids)
+                message = encode_channel(ids[key], *key)
+                self._channel_table.append(message)
+                messages.append(message)
+        messages.append(encode_samples((s.t, ids[(s.device, s.channel)], s.value) for s in batch))
+        data = b"".join(messages)
+
+        self.stats.batches += 1
+        for writer, queue in list(self._clients.items()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.stats.dropped += 1
+                print(f"[WARN] Abonnent {_peer(writer)} zu langsam, Verbindung getrennt.")
+                self._drop(writer, queue)
+
+    def _drop(self, writer, queue):
+        """Trennt einen Abonnenten sofort; ausstehende Nachrichten werden verworfen."""
+        self._detach(writer)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        writer.close()
+
+    def _detach(self, writer):
+        if self._clients.pop(writer, None) is not None:
+            self.stats.subscribers -= 1
+
+    async def _serve(self, reader, writer):
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        queue.put_nowait(HELLO + b"".join(self._channel_table))
+        self._clients[writer] = queue
+        self.stats.subscribers += 1
+        self.stats.connections += 1
+        try:
+            while True:
+                data = await queue.get()
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+                self.stats.bytes_sent += len(data)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._detach(writer)
+            writer.close()
+
+
+def _peer(writer) -> str:
+    return str(writer.get_extra_info("peername") or id(writer))
+
+
+# ------------------------------------------------------------
+# Client
+# ------------------------------------------------------------
+class SocketTransport:
+    """
+    Transport für den AcquisitionCore, der einen SamplePublisher abonniert
+    (config.port ist der Socket-Pfad). Verbindet bei Abbruch neu; Kanalnamen
+    lassen sich über config.channels umbenennen.
+    """
+
+    RECONNECT_S = 1.0
+    MAX_CHUNK = 65536
+
+    def __init__(self, config):
+        self.config = config
+        self.status = DeviceStatus()
+
+    def make_decoder(self):
+        return BusStreamDecoder(self.config)
+
+    async def run(self, source: int, queue: asyncio.Queue, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.config.port)
+            except OSError as err:
+                self.status.last_error = str(err)
+                await _sleep_or_stop(stop, self.RECONNECT_S)
+                continue
+
+            self.status.connected = True
+            print(f"[INFO] {self.config.name}: abonniert {self.config.port}")
+            await queue.put(RawChunk(time.time(), source, None))
+            stop_wait = asyncio.ensure_future(stop.wait())
+            try:
+                while True:
+                    read = asyncio.ensure_future(reader.read(self.MAX_CHUNK))
+                    await asyncio.wait({read, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    if not read.done():
+                        read.cancel()
+                        break
+                    data = read.result()
+                    if not data:
+                        raise ConnectionError("Server hat die Verbindung beendet")
+                    await queue.put(RawChunk(time.time(), source, data))
+            except (ConnectionError, OSError) as err:
+                self.status.last_error = str(err)
+                print(f"[WARN] {self.config.name}: {err}, verbinde neu...")
+            finally:
+                stop_wait.cancel()
+                self.status.connected = False
+                writer.close()
+            if not stop.is_set():
+                self.status.reconnects += 1
+                await _sleep_or_stop(stop, self.RECONNECT_S)
+
+
+class BusStreamDecoder:
+    """Dekodierstufe zu SocketTransport: Bus-Nachrichten -> StampedSample."""
+
+    def __init__(self, config):
+        self.bus = BusDecoder()
+        self.rename = config.channels
+
+    def feed(self, t: float, data: bytes) -> list:
+        samples = self.bus.feed(data)
+        if self.rename:
+            rename = self.rename
+            samples = [s._replace(channel=rename.get(s.channel, s.channel)) for s in samples]
+        return samples
+
+    def reset(self):
+        self.bus.reset()
+
+
+async def subscribe(path: Path = DEFAULT_SOCKET):
+    """Einfacher Client: Async-Iterator über Listen von StampedSample."""
+    reader, writer = await asyncio.open_unix_connection(str(path))
+    decoder = BusDecoder()
+    try:
+        while True:
+            data = await reader.read(SocketTransport.MAX_CHUNK)
+            if not data:
+                return
+            samples = decoder.feed(data)
+            if samples:
+                yield samples
+    finally:
+        writer.close()
+
+
+async def monitor(path: Path, interval: float):
+    """Gibt pro Kanal Rate und letzten Wert aus."""
+    counts = {}
+    last = {}
+    next_report = time.monotonic() + interval
+    async for samples in subscribe(path):
+        for sample in samples:
+            counts[sample.channel] = counts.get(sample.channel, 0) + 1
+            last[sample.channel] = sample.value
+        now = time.monotonic()
+        if now >= next_report:
+            print("  ".join(f"{ch}: {n / interval:,.0f}/s ({last[ch]:.2f})" for ch, n in sorted(counts.items())))
+            counts.clear()
+            next_report = now + interval
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Abonniert die Samples von waage.py --publish.")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET)
+    parser.add_argument("--interval", type=float, default=1.0, help="Ausgabeintervall [s].")
+    args = parser.parse_args()
+    try:
+        asyncio.run(monitor(args.socket, args.interval))
+    except KeyboardInterrupt:
+        pass
+    except OSError as err:
+        print(f"[ERROR] {args.socket}: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+segmentation.py
+
+Automatische Erkennung der Stehphase einer Messung aus der Summe Left + Right,
+statt Start/Ende und Körpergewicht pro Person von Hand in runs.json zu pflegen.
+
+Vorgehen (vektorisiert, jeder Schritt ein Durchlauf über das Array):
+
+1. Belastungsniveau: Median aller Summen >= `min_load` (niemand auf der
+   Platte liefert ~0 kg, Stehen den Großteil der belasteten Samples).
+2. Schwelle mit Hysterese: "belastet" ab `on * Niveau`, "frei" erst unter
+   `off * Niveau`; dazwischen gilt der vorherige Zustand (Vorwärtsfüllen per
+   np.maximum.accumulate). Kurzes Wackeln an der Schwelle zerlegt die Phase
+   so nicht in viele Stücke.
+3. Phasen: zusammenhängende belastete Abschnitte; Lücken kürzer als `min_gap_s`
+   werden überbrückt, Phasen kürzer als `min_duration_s` verworfen, an beiden
+   Enden `settle_s` für Auf- und Absteigen abgeschnitten.
+4. Körpergewicht: Median der Summe innerhalb der Phase (Plateau).
+
+Beispiel:
+    phase = standing_phase(common_times, left + right)
+    if phase is not None:
+        print(phase.start, phase.end, phase.weight)
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class Phase:
+    """Belasteter Abschnitt; Zeiten in den Einheiten von `times`, Indizes halboffen."""
+
+    start: float
+    end: float
+    start_idx: int
+    end_idx: int
+    weight: float  # Median der Summe (kg)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def hysteresis(values: np.ndarray, on: float, off: float) -> np.ndarray:
+    """
+    Zustand pro Sample: True ab values >= on, False ab values <= off, dazwischen
+    (und bei NaN) bleibt der vorherige Zustand. Beginnt im Zustand False.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    event = np.full(len(values), -1, dtype=np.int8)
+    event[values <= off] = 0
+    event[values >= on] = 1
+    # Index des letzten Samples mit eindeutigem Zustand, vorwärts gefüllt
+    last = np.where(event >= 0, np.arange(len(values)), -1)
+    np.maximum.accumulate(last, out=last)
+    return (last >= 0) & (event[np.maximum(last, 0)] == 1)
+
+
+def segment_standing(
+    times: np.ndarray,
+    total: np.ndarray,
+    min_load: float = 10.0,
+    on: float = 0.8,
+    off: float = 0.5,
+    min_duration_s: float = 3.0,
+    min_gap_s: float = 1.0,
+    settle_s: float = 1.0,
+) -> list:
+    """
+    Alle Stehphasen in `total` (Summe Left + Right über `times`, aufsteigend).
+
+    min_load:       Summen darunter gelten als "niemand auf der Platte" (kg).
+    on/off:         Hysterese-Schwellen relativ zum Belastungsniveau.
+    min_duration_s: kürzere Phasen werden verworfen (nach dem Abschneiden).
+    min_gap_s:      kürzere Entlastungen innerhalb einer Phase werden überbrückt.
+    settle_s:       wird an beiden Enden einer Phase abgeschnitten.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    loaded = total[total >= min_load]
+    if not len(loaded):
+        return []
+    level = float(np.median(loaded))
+
+    state = hysteresis(total, on * level, off * level).astype(np.int8)
+    edges = np.diff(state, prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exklusiv
+    if not len(starts):
+        return []
+
+    # Kurze Lücken überbrücken: nur Grenzen mit ausreichend langer Lücke bleiben
+    gaps = times[starts[1:]] - times[ends[:-1] - 1]
+    split = gaps >= min_gap_s
+    starts = np.concatenate([starts[:1], starts[1:][split]])
+    ends = np.concatenate([ends[:-1][split], ends[-1:]])
+
+    t_start = times[starts] + settle_s
+    t_end = times[ends - 1] - settle_s
+    keep = t_end - t_start >= min_duration_s
+    t_start, t_end = t_start[keep], t_end[keep]
+    first = np.searchsorted(times, t_start, side="left")
+    last = np.searchsorted(times, t_end, side="right")
+
+    return [
+        Phase(float(a), float(b), int(i), int(j), float(np.nanmedian(total[i:j])))
+        for a, b, i, j in zip(t_start, t_end, first, last)
+    ]
+
+
+def standing_phase(times: np.ndarray, total: np.ndarray, **kwargs):
+    """Längste Stehphase (siehe segment_standing) oder None."""
+    phases = segment_standing(times, total, **kwargs)
+    return max(phases, key=lambda p: p.duration) if phases else None
@@ -0,0 +1,95 @@
+"""
+serial_reader.py
+
+Blockierender, blockweiser Leser für die serielle Schnittstelle.
+
+Statt `in_waiting` zu pollen, eine einzelne Zeile zu lesen und sonst
+`time.sleep(0.1)` zu schlafen, liest ChunkedLineReader mit
+`read(max(1, in_waiting))`: Der Aufruf blockiert bis mindestens ein Byte da ist
+(oder der Port-Timeout abläuft) und holt dann alles, was bereits im Puffer
+liegt, auf einmal. Alle vollständigen Zeilen im persistenten bytearray werden
+in einem Aufruf dekodiert (LineDecoder.decode_block) und als Batch zurückgegeben.
+
+Beispiel:
+    ser = serial.Serial(port, 115200, timeout=0.5)
+    reader = ChunkedLineReader(ser)
+    while True:
+        for timestamp, sample in reader.read_batch():
+            ...
+"""
+
+import time
+
+from line_decoder import LineDecoder
+
+# Schutz gegen Endlos-Zeilen (z. B. falsche Baudrate): so viele Bytes ohne
+# Zeilenende werden verworfen
+MAX_LINE_BYTES = 4096
+
+
+class ChunkedLineReader:
+    """
+    port:      Objekt mit read(n) und in_waiting (serial.Serial oder kompatibel).
+               Der Port-Timeout bestimmt, wie lange read_batch() höchstens blockiert.
+               Kann None sein, wenn nur feed() benutzt wird.
+    decoder:   LineDecoder für die Zeilen; Standard ist ein neuer LineDecoder().
+    max_chunk: Obergrenze für die Bytes pro read()-Aufruf.
+    """
+
+    def __init__(self, port, decoder: LineDecoder = None, max_chunk: int = 65536):
+        self.port = port
+        self.decoder = decoder if decoder is not None else LineDecoder()
+        self.max_chunk = max_chunk
+        self._buffer = bytearray()
+        self.bytes_read = 0
+        self.reads = 0
+        self.overflows = 0
+
+    def read_samples(self) -> list:
+        """
+        Liest einen Block und gibt die Samples aller darin vollständigen Zeilen
+        zurück. Leere Liste, wenn der Timeout ohne Daten abläuft.
+        """
+        waiting = self.port.in_waiting
+        chunk = self.port.read(min(max(1, waiting), self.max_chunk))
+        if not chunk:
+            return []
+        self.reads += 1
+        return self.feed(chunk)
+
+    def feed(self, chunk) -> list:
+        """
+        Hängt bereits gelesene Bytes an den Puffer an und gibt die Samples
+        aller damit vollständigen Zeilen zurück (für Aufrufer, die selbst lesen).
+        """
+        self.bytes_read += len(chunk)
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            if len(buffer) > MAX_LINE_BYTES:
+                self.overflows += 1
+                buffer.clear()
+            return []
+
+        # Alle vollständigen Zeilen in einem Aufruf direkt aus dem Puffer dekodieren;
+        # der Rest (angefangene Zeile) bleibt stehen
+        samples = self.decoder.decode_block(buffer, end)
+        del buffer[:end + 1]
+        return samples
+
+    def read_batch(self) -> list:
+        """
+        Liest einen Block und gibt die enthaltenen Samples als Liste von
+        (timestamp, Sample) zurück. Alle Samples eines Blocks erhalten den
+        Empfangszeitpunkt des Blocks.
+        """
+        samples = self.read_samples()
+        if not samples:
+            return []
+        timestamp = time.time()
+        return [(timestamp, sample) for sample in samples]
+
+    def reset(self):
+        """Verwirft eine angefangene Zeile (z. B. nach einem Reconnect)."""
+        self._buffer.clear()
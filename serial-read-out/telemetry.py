@@ -0,0 +1,290 @@
+"""
+telemetry.py
+
+Laufzeit-Kennzahlen der Erfassung und der Dashboards: Zähler, Messwerte
+(Gauges) und Histogramme, abrufbar im Prometheus-Textformat (Route /metrics
+in app.py / app_2.py) oder als Zusammenfassung in einer Zeile (waage.py --stats).
+
+Abgeschaltet (Standard) kostet die Instrumentierung im heißen Pfad nur die
+Abfrage von REGISTRY.enabled einmal pro Block bzw. Batch, nie pro Zeile.
+Was ohnehin schon gezählt wird (DecoderStats, FrameStats, DeviceStatus,
+Queue-Füllstände), wird nicht doppelt gezählt, sondern erst beim Abruf über
+Collector-Funktionen eingesammelt.
+
+Einschalten: REGISTRY.enable() oder Umgebungsvariable WAAGE_TELEMETRY=1.
+
+Beispiel:
+    REGISTRY.enable()
+    flush = REGISTRY.histogram("waage_csv_flush_seconds", "Dauer eines Flushs", sink="csv")
+    if REGISTRY.enabled:
+        flush.observe(elapsed)
+    print(REGISTRY.summary())
+    text = REGISTRY.render()
+"""
+
+import asyncio
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Obergrenzen in Sekunden: 50 µs bis 10 s, etwa drei Stufen pro Dekade
+LATENCY_BUCKETS = (
+    5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1):
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Histogram:
+    """Feste Buckets (Obergrenzen); quantile() schätzt aus den Bucket-Grenzen."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # letzter: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Obergrenze des Buckets, in dem das Quantil q liegt (NaN ohne Werte)."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Registry:
+    """
+    Instrumente nach (Name, Labels). counter()/gauge()/histogram() liefern bei
+    gleichem Namen und gleichen Labels dasselbe Objekt; einmal holen, dann im
+    heißen Pfad nur noch `if REGISTRY.enabled: inst.observe(...)`.
+
+    Collector-Funktionen liefern beim Abruf Tupel (name, kind, help, labels, value)
+    für Werte, die anderswo ohnehin gezählt werden.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._instruments = {}  # name -> (kind, help, {label_key: (labels, instrument)})
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_summary = None  # (monotonic, {name: counter total}) für Raten
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+        return self
+
+    def _get(self, cls, name, help, labels, *args):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            kind, _, series = self._instruments.setdefault(name, (cls.kind, help, {}))
+            if kind != cls.kind:
+                raise ValueError(f"{name} ist bereits als {kind} registriert")
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = (dict(labels), cls(*args))
+        return entry[1]
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", buckets=LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def add_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def remove_collector(self, fn):
+        with self._lock:
+            if fn in self._collectors:
+                self._collectors.remove(fn)
+
+    def _collect(self) -> dict:
+        """name -> (kind, help, [(labels, value or Histogram)])"""
+        with self._lock:
+            out = {
+                name: (kind, help, [(labels, inst) for labels, inst in series.values()])
+                for name, (kind, help, series) in self._instruments.items()
+            }
+            collectors = list(self._collectors)
+        for fn in collectors:
+            for name, kind, help, labels, value in fn():
+                out.setdefault(name, (kind, help, []))[2].append((labels, value))
+        return out
+
+    def render(self) -> str:
+        """Alle Werte im Prometheus-Textformat."""
+        lines = []
+        for name, (kind, help, series) in sorted(self._collect().items()):
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, inst in series:
+                if isinstance(inst, Histogram):
+                    cumulative = 0
+                    for bound, n in zip(inst.buckets + (math.inf,), inst.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {float(inst.sum)!r}")
+                    lines.append(f"{name}_count{_labels(labels)} {inst.count}")
+                else:
+                    value = inst.value if isinstance(inst, (Counter, Gauge)) else inst
+                    lines.append(f"{name}{_labels(labels)} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Eine Zeile für die CLI: Zähler als Summe über alle Labels (mit Rate seit
+        dem letzten Aufruf), Gauges als Summe, Histogramme als p50/p99 in ms.
+        """
+        now = time.monotonic()
+        previous = self._last_summary
+        totals = {}
+        parts = []
+        for name, (kind, _, series) in sorted(self._collect().items()):
+            short = name.removeprefix("waage_")
+            if kind == "histogram":
+                for labels, inst in series:
+                    if inst.count:
+                        label = "/".join(str(v) for v in labels.values())
+                        parts.append(
+                            f"{short}{'[' + label + ']' if label else ''} "
+                            f"p50 {inst.quantile(0.5) * 1e3:.3g} ms p99 {inst.quantile(0.99) * 1e3:.3g} ms"
+                        )
+                continue
+            total = sum(inst.value if isinstance(inst, (Counter, Gauge)) else inst for _, inst in series)
+            if kind == "counter":
+                totals[name] = total
+                if previous is not None and name in previous[1] and now > previous[0]:
+                    rate = (total - previous[1][name]) / (now - previous[0])
+                    parts.append(f"{short} {total:,.0f} ({rate:+,.0f}/s)")
+                else:
+                    parts.append(f"{short} {total:,.0f}")
+            else:
+                parts.append(f"{short} {total:g}")
+        self._last_summary = (now, totals)
+        return " · ".join(parts)
+
+
+REGISTRY = Registry(enabled=os.environ.get("WAAGE_TELEMETRY", "") not in ("", "0"))
+
+
+def timed(name: str, registry: Registry = None):
+    """
+    Dekorator für Dash-Callbacks: Dauer als waage_callback_seconds{callback=name}.
+    Abgeschaltet bleibt nur die Abfrage von registry.enabled.
+    """
+    registry = registry or REGISTRY
+    histogram = registry.histogram("waage_callback_seconds", "Dauer der Dash-Callbacks", callback=name)
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorate
+
+
+async def summary_loop(interval_s: float, registry: Registry = None):
+    """Gibt alle `interval_s` Sekunden registry.summary() aus (als Task neben der Erfassung)."""
+    registry = registry or REGISTRY
+    registry.summary()  # Ausgangswerte für die Raten
+    while True:
+        await asyncio.sleep(interval_s)
+        print(f"[STATS] {registry.summary()}")
+
+
+class SampledLog:
+    """
+    Ersetzt Debug-Ausgaben pro Zeile: höchstens `per_s` Meldungen pro Sekunde,
+    der Rest wird nur gezählt und mit der nächsten Meldung gemeldet. `message`
+    darf eine Funktion sein, damit verworfene Meldungen nicht formatiert werden.
+    """
+
+    def __init__(self, per_s: float = 1.0, enabled: bool = False, prefix: str = "[DEBUG]"):
+        self.interval_s = 1.0 / per_s
+        self.enabled = enabled
+        self.prefix = prefix
+        self._next = 0.0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next:
+                self._suppressed += 1
+                return
+            self._next = now + self.interval_s
+            suppressed, self._suppressed = self._suppressed, 0
+        text = message() if callable(message) else message
+        if suppressed:
+            text += f" ({suppressed} weitere unterdrückt)"
+        print(f"{self.prefix} {text}")
+
+
+DEBUG_LOG = SampledLog()
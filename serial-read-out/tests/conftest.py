@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Die Module liegen als Skripte direkt in serial-read-out/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
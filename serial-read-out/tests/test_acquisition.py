@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from acquisition import AcquisitionCore, DeviceConfig, DeviceStatus, RawChunk, Sink, StampedSample
+
+
+class ListSource:
+    """Transport, der feste Blöcke liefert und dann endet."""
+
+    def __init__(self, chunks):
+        self.config = DeviceConfig("fake", "fake")
+        self.status = DeviceStatus()
+        self.chunks = chunks
+
+    async def run(self, source, queue, stop):
+        for data in self.chunks:
+            await queue.put(RawChunk(0.0, source, data))
+
+
+class ListSink(Sink):
+    name = "list"
+
+    def __init__(self):
+        self.samples = []
+
+    async def handle(self, batch):
+        self.samples += batch
+
+
+class SampleSource(ListSource):
+    """Liefert fertige StampedSamples (wie ein binäres Board mit eigener Uhr)."""
+
+    def __init__(self, name, chunks):
+        super().__init__(chunks)
+        self.config = DeviceConfig(name, name)
+
+    def make_decoder(self):
+        return PassDecoder()
+
+
+class PassDecoder:
+    def feed(self, t, data):
+        return list(data)
+
+    def reset(self):
+        pass
+
+
+def run(source, process=None, sources=None, reorder_window=0.0):
+    sink = ListSink()
+
+    async def main():
+        core = AcquisitionCore(sources or [source], [sink], process=process, reorder_window=reorder_window)
+        await core.start()
+        await core.stop()
+
+    asyncio.run(main())
+    return [s.value for s in sink.samples]
+
+
+def test_failing_process_drops_only_that_batch():
+    def process(batch):
+        if batch[0].value == 2:
+            raise RuntimeError("boom")
+        return batch
+
+    source = ListSource([b"Gewicht links: %d kg\n" % i for i in range(4)])
+
+    assert run(source, process) == [0, 1, 3]
+    assert source.status.decode_errors == 1
+    assert "boom" in source.status.last_error
+
+
+def test_failing_decoder_drops_block_and_continues():
+    # Kein bytes-Objekt: feed() wirft TypeError
+    source = ListSource([b"Gewicht links: 1 kg\n", object(), b"Gewicht links: 2 kg\n"])
+
+    assert run(source) == [1, 2]
+    assert source.status.decode_errors == 1
+
+
+def test_reorder_window_merges_sources_by_time():
+    now = time.time()
+
+    def samples(name, *times):
+        return [StampedSample(now + t, name, name, t) for t in times]
+
+    a = SampleSource("a", [samples("a", 0.00, 0.02), samples("a", 0.04)])
+    b = SampleSource("b", [samples("b", 0.01, 0.03)])
+
+    assert run(None, sources=[a, b]) != [0.00, 0.01, 0.02, 0.03, 0.04]
+    assert run(None, sources=[a, b], reorder_window=0.05) == [0.00, 0.01, 0.02, 0.03, 0.04]
@@ -0,0 +1,81 @@
+import pytest
+
+from binary_protocol import FRAME_SIZE, FrameDecoder, encode_frame
+
+
+def stream(seqs, left=1.5, right=2.5):
+    return b"".join(encode_frame(seq, 1000 * seq, left + seq, right + seq) for seq in seqs)
+
+
+def test_clean_stream():
+    decoder = FrameDecoder()
+    frames = decoder.feed(stream(range(5)))
+
+    assert [f.seq for f in frames] == [0, 1, 2, 3, 4]
+    assert [f.t_us for f in frames] == [0, 1000, 2000, 3000, 4000]
+    assert frames[2].left == pytest.approx(3.5)
+    assert frames[2].right == pytest.approx(4.5)
+    assert frames[0].left_ready and frames[0].right_ready
+    assert decoder.stats.frames == 5
+    assert (decoder.stats.crc_errors, decoder.stats.bytes_skipped, decoder.stats.lost) == (0, 0, 0)
+
+
+def test_corrupted_crc_drops_only_that_frame():
+    data = bytearray(stream(range(3)))
+    data[FRAME_SIZE + 8] ^= 0xFF  # Nutzdaten im zweiten Frame verfälschen
+    decoder = FrameDecoder()
+    frames = decoder.feed(bytes(data))
+
+    assert [f.seq for f in frames] == [0, 2]
+    assert decoder.stats.crc_errors == 1
+    assert decoder.stats.bytes_skipped == FRAME_SIZE
+    assert decoder.stats.lost == 1
+
+
+def test_resync_after_dropped_bytes():
+    data = stream(range(4))
+    data = data[:FRAME_SIZE + 5] + data[2 * FRAME_SIZE:]  # Anfang des zweiten Frames fehlt
+    decoder = FrameDecoder()
+    frames = decoder.feed(b"\x00\x13\x37" + data)
+
+    assert [f.seq for f in frames] == [0, 2, 3]
+    assert decoder.stats.bytes_skipped == 3 + 5
+    assert decoder.stats.lost == 1
+
+
+def test_frame_split_across_chunks():
+    data = stream(range(3))
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(0, len(data), 7):
+        frames += decoder.feed(data[i:i + 7])
+
+    assert [f.seq for f in frames] == [0, 1, 2]
+    assert decoder.feed(b"") == []
+    assert decoder.stats.bytes_skipped == 0
+
+
+def test_partial_frame_stays_buffered():
+    data = stream([0])
+    decoder = FrameDecoder()
+
+    assert decoder.feed(data[:-1]) == []
+    assert [f.seq for f in decoder.feed(data[-1:])] == [0]
+
+
+@pytest.mark.parametrize("seqs, lost", [([0, 1, 5, 6], 3), ([65534, 65535, 0, 1], 0), ([65535, 2], 2)])
+def test_sequence_gap_counts_lost_frames(seqs, lost):
+    decoder = FrameDecoder()
+    frames = decoder.feed(stream(seqs))
+
+    assert [f.seq for f in frames] == seqs
+    assert decoder.stats.lost == lost
+
+
+def test_reset_forgets_sequence_and_buffer():
+    decoder = FrameDecoder()
+    decoder.feed(stream([0]) + stream([1])[:5])
+    decoder.reset()
+
+    assert [f.seq for f in decoder.feed(stream([10]))] == [10]
+    assert decoder.stats.lost == 0
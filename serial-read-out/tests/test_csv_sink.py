@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from csv_sink import CsvSink
+
+
+def test_writes_all_rows(tmp_path):
+    path = tmp_path / "run.csv"
+    with CsvSink(path, header=["t", "value"], flush_rows=3) as sink:
+        for i in range(10):
+            sink.write([i, i / 2])
+        sink.write_many([[10, 5.0], [11, 5.5]])
+
+    assert path.read_text().splitlines()[:2] == ["t,value", "0,0.0"]
+    assert sink.stats.rows_written == 12
+    assert sink.stats.rows_pending == 0
+
+
+def test_writer_error_is_raised_instead_of_blocking(tmp_path):
+    sink = CsvSink(tmp_path / "run.csv", header=["t"], flush_rows=1, max_queue=2).start()
+
+    def fail(rows):
+        raise OSError("No space left on device")
+
+    sink._encode = fail
+    with pytest.raises(RuntimeError, match="No space left") as info:
+        # Ohne Fehlerweitergabe blockiert write() hier, sobald die Queue voll ist
+        for i in range(100):
+            sink.write([i])
+            time.sleep(0.01)
+    assert isinstance(info.value.__cause__, OSError)
+
+    with pytest.raises(RuntimeError):
+        sink.stop()
+    assert not sink.running
+
+
+def test_stop_timeout_keeps_thread(tmp_path):
+    sink = CsvSink(tmp_path / "run.csv", header=["t"], flush_rows=1).start()
+    release = threading.Event()
+    flush = sink._flush
+
+    def slow_flush(batch):
+        release.wait()
+        flush(batch)
+
+    sink._flush = slow_flush
+    sink.write([1])
+    with pytest.raises(TimeoutError):
+        sink.stop(timeout=0.05)
+    assert sink.running
+
+    release.set()
+    sink.stop()
+    assert not sink.running
+    assert sink.stats.rows_written == 1
+
+
+def test_stop_timeout_covers_full_queue(tmp_path):
+    sink = CsvSink(tmp_path / "run.csv", header=["t"], flush_rows=1, max_queue=1).start()
+    release = threading.Event()
+    flush = sink._flush
+
+    def slow_flush(batch):
+        release.wait()
+        flush(batch)
+
+    sink._flush = slow_flush
+    sink.write([1])
+    while sink._queue.qsize():  # Writer-Thread hängt in slow_flush
+        time.sleep(0.01)
+    sink.write([2])  # Queue jetzt voll
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        sink.stop(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+    assert sink.running
+
+    release.set()
+    sink.stop()
+    assert sink.stats.rows_written == 2
+
+
+def test_fsync_error_is_raised(tmp_path, monkeypatch):
+    sink = CsvSink(tmp_path / "run.csv", header=["t"]).start()
+
+    def fail(fd):
+        raise OSError("I/O error")
+
+    monkeypatch.setattr("csv_sink.os.fsync", fail)
+    sink.write([1])
+    with pytest.raises(RuntimeError, match="I/O error"):
+        sink.stop()
@@ -0,0 +1,19 @@
+from line_decoder import LEFT, RIGHT, LineDecoder
+
+
+def test_firmware_lines():
+    decoder = LineDecoder()
+    lines = [b"Gewicht links: 12.34 kg\r", b"Gewicht rechts: -0.01 kg", b"HX711 (links) nicht bereit!", b""]
+
+    assert decoder.decode_many(lines) == [(LEFT, 12.34), (RIGHT, -0.01)]
+    assert (decoder.stats.samples, decoder.stats.not_ready, decoder.stats.empty) == (2, 1, 1)
+
+
+def test_bare_numbers_only_in_bare_mode():
+    assert LineDecoder().decode(b"12.34\r\n") is None
+
+    decoder = LineDecoder(bare=LEFT)
+    assert decoder.decode(b"12.34\r\n") == (LEFT, 12.34)
+    assert decoder.decode(b"Gewicht rechts: 1.5 kg") == (RIGHT, 1.5)
+    assert decoder.decode(b"nan") is None
+    assert decoder.stats.malformed == 1
@@ -0,0 +1,50 @@
+import threading
+
+import numpy as np
+
+import run_cache
+from run_cache import RunCache
+from run_store import RunData
+
+
+def make_run(name, n=1000):
+    t = np.arange(n, dtype=np.float64)
+    return RunData(name, {"Left": (t, t * 0.5)}, rows=n)
+
+
+def test_evicted_run_comes_back_from_disk(tmp_path):
+    run = make_run("a")
+    cache = RunCache(memory_budget=run.nbytes, spill_dir=tmp_path)
+    cache.put("a", run)
+    cache.put("b", make_run("b"))
+
+    assert cache.stats.spills == 1
+    again = cache.get("a")
+    assert cache.stats.disk_hits == 1
+    np.testing.assert_array_equal(again.channels["Left"][1], run.channels["Left"][1])
+
+
+def test_spill_is_written_without_the_lock(tmp_path, monkeypatch):
+    run = make_run("a")
+    cache = RunCache(memory_budget=run.nbytes, spill_dir=tmp_path)
+    cache.put("a", run)
+    writing, release = threading.Event(), threading.Event()
+    save = run_cache.np.save
+
+    def slow_save(*args, **kwargs):
+        writing.set()
+        release.wait(5)
+        save(*args, **kwargs)
+
+    monkeypatch.setattr(run_cache.np, "save", slow_save)
+    b = make_run("b")
+    spiller = threading.Thread(target=cache.put, args=("b", b))
+    spiller.start()
+    assert writing.wait(5)
+
+    # While "a" is being written, the cache stays usable
+    assert cache.get("b") is b
+    assert "a" in cache
+    release.set()
+    spiller.join(5)
+    assert cache.stats.spills == 1
@@ -0,0 +1,45 @@
+from run_catalog import RunCatalog
+
+CSV = "Unix Timestamp,Position,Value [kg]\n1.0,Left,10.0\n1.1,Right,11.0\n"
+
+
+def make_catalog(tmp_path):
+    return RunCatalog(tmp_path / "catalog.sqlite", config_path=tmp_path / "runs.json")
+
+
+def test_narrow_pattern_keeps_entries_outside_it(tmp_path):
+    data = tmp_path / "data"
+    (data / "uploads").mkdir(parents=True)
+    (data / "a.csv").write_text(CSV)
+    (data / "uploads" / "b.csv").write_text(CSV)
+    catalog = make_catalog(tmp_path)
+
+    assert catalog.update(data).added == 2
+    stats = catalog.update(data, pattern="*.csv")
+    assert (stats.removed, stats.unchanged) == (0, 1)
+    assert catalog.update(data).added == 0
+
+
+def test_deleted_file_is_removed(tmp_path):
+    data = tmp_path / "data"
+    (data / "uploads").mkdir(parents=True)
+    (data / "a.csv").write_text(CSV)
+    (data / "uploads" / "b.csv").write_text(CSV)
+    catalog = make_catalog(tmp_path)
+    catalog.update(data)
+
+    (data / "uploads" / "b.csv").unlink()
+    assert catalog.update(data, pattern="*.csv").removed == 0
+    assert catalog.update(data).removed == 1
+
+
+def test_runs_folder_is_a_path_prefix(tmp_path):
+    for folder in ("data", "data_old", "dat%"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / f"{folder.strip('%')}x.csv").write_text(CSV)
+    catalog = make_catalog(tmp_path)
+    for folder in ("data", "data_old", "dat%"):
+        catalog.update(tmp_path / folder)
+
+    assert [run.file for run in catalog.runs(folder=tmp_path / "data")] == ["datax.csv"]
+    assert [run.file for run in catalog.runs(folder=tmp_path / "dat%")] == ["datx.csv"]
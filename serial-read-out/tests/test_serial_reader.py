@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from fake_device import Encoder, VirtualPort, synthetic_source
+from line_decoder import LEFT, RIGHT
+from serial_reader import ChunkedLineReader
+
+serial = pytest.importorskip("serial")
+
+
+@pytest.fixture
+def port():
+    port = VirtualPort()
+    yield port
+    port.close()
+
+
+def send(port, data: bytes, chunk: int):
+    """Schreibt in Stücken, die Zeilen mitten durchschneiden (wie USB-Blöcke)."""
+    def run():
+        for i in range(0, len(data), chunk):
+            port.write(data[i:i + chunk])
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def read_until(reader, n: int, max_reads: int = 1000) -> list:
+    samples = []
+    for _ in range(max_reads):
+        samples += [sample for _, sample in reader.read_batch()]
+        if len(samples) >= n:
+            break
+    return samples
+
+
+def test_reads_firmware_lines_from_pty(port):
+    t, channel, value = synthetic_source(rate=1000, duration=2.0)
+    encoder = Encoder("text", garbage=0.0, not_ready=0.02, seed=1)
+    data = b"".join(encoder.encode(ch, v) for ch, v in zip(channel.tolist(), value.tolist()))
+    expected = data.count(b"Gewicht")
+
+    with serial.Serial(port.path, timeout=0.5) as ser:
+        reader = ChunkedLineReader(ser)
+        thread = send(port, data, chunk=333)
+        samples = read_until(reader, expected)
+        thread.join(timeout=5)
+
+    assert len(samples) == expected
+    assert {s.channel for s in samples} == {LEFT, RIGHT}
+    assert reader.decoder.stats.not_ready == data.count(b"nicht bereit")
+    assert reader.decoder.stats.malformed == 0
+    assert reader.bytes_read == len(data)
+    assert reader.reads < expected  # blockweise, nicht pro Zeile
+
+
+def test_values_survive_chunk_boundaries(port):
+    data = b"".join(f"Gewicht {'links' if i % 2 == 0 else 'rechts'}: {i / 100:.2f} kg\r\n".encode() for i in range(500))
+
+    with serial.Serial(port.path, timeout=0.5) as ser:
+        reader = ChunkedLineReader(ser)
+        thread = send(port, data, chunk=7)
+        samples = read_until(reader, 500)
+        thread.join(timeout=5)
+
+    assert [s.value for s in samples] == pytest.approx([i / 100 for i in range(500)])
+    assert [s.channel for s in samples[:2]] == [LEFT, RIGHT]
+
+
+def test_feed_keeps_partial_line():
+    reader = ChunkedLineReader(None)
+
+    assert reader.feed(b"Gewicht links: 1.") == []
+    assert reader.feed(b"50 kg\r\nGewicht rechts: 2") == [(LEFT, 1.5)]
+    assert reader.feed(b".25 kg\r\n") == [(RIGHT, 2.25)]
+    assert reader.decoder.stats.lines == 2
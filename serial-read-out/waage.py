@@ -7,15 +7,27 @@ Die Daten werden nach Erkennen von "links" oder "rechts" zeilenweise in einer CS
 
 CSV-Format:
     Unix Timestamp, Position, Value [kg]
+
+Mit --publish läuft das Tool als kopfloser Erfassungsdienst, den Dashboards
+und andere Clients über einen Unix-Socket abonnieren (siehe sample_bus.py).
 """
 
 import argparse
+import asyncio
 import csv
-import time
-import threading
+import os
+import signal
 from datetime import datetime
 from pathlib import Path
 
+from csv_sink import CsvSink
+from filters import StreamFilter, parse_spec
+from acquisition import AcquisitionCore, ColumnarSink, CsvRowSink, DeviceConfig, PyramidSink, parse_device_spec
+from metrics import METRICS_COLUMNS, MetricsSink, OnlineMetrics, metrics_path
+from pyramid import PyramidWriter
+from run_format import ColumnarWriter, columnar_path
+from telemetry import DEBUG_LOG, REGISTRY, summary_loop
+
 # Optional: falls pyserial nicht installiert ist, gibt es nur einen Warnhinweis
 try:
     import serial
@@ -25,101 +37,65 @@ except ImportError:
         "WARNUNG: 'pyserial' ist nicht installiert. Es können keine Daten empfangen werden."
     )
 
-# Globale Variablen für den Datenaustausch zwischen Threads
-ser = None
-connected = False
 data_file_path = None
+REORDER_MS = 50.0  # Sortierfenster für mehrere binäre Boards (siehe acquisition.TimeMerger)
 
 
-def connect_to_serial(port: str, baudrate: int):
-    """
-    Baut eine serielle Verbindung auf. Schlägt es fehl, wird alle 5 Sekunden erneut versucht.
-    """
-    global ser, connected
-    if serial is None:
-        print("Das 'serial'-Modul ist nicht verfügbar. Verbindung nicht möglich.")
-        return
-
-    while True:
-        try:
-            ser = serial.Serial(port, baudrate, timeout=1)
-            if ser.is_open:
-                connected = True
-                print(f"[INFO] Verbunden mit {port} bei {baudrate} Baud.")
-                break
-        except Exception as err:
-            print(
-                f"[WARN] Konnte nicht mit {port} verbinden: {err}. Erneuter Versuch in 5 Sekunden..."
-            )
-            time.sleep(5)
-
-
-def extract_float_from_line(line: str):
-    """
-    Extrahiert eine Kommazahl aus einem beliebigen String.
-    Erlaubt Ziffern, Punkt und Minuszeichen.
-    Beispiel:
-        'Gewicht rechts [kg]: -0.00118' -> -0.00118
-    """
-    filtered = "".join(ch for ch in line if ch.isdigit() or ch in ".-")
-    try:
-        return float(filtered)
-    except ValueError:
-        print(f"[WARN] Konnte keine gültige Zahl aus Zeile extrahieren: {repr(line)}.")
-        return None
-
-
-def read_serial():
+def run_acquisition(
+    configs,
+    sinks: list,
+    publish: Path = None,
+    filters: str = None,
+    stats_interval: float = None,
+    reorder_window: float = 0.0,
+):
     """
-    Liest fortlaufend Zeilen vom seriellen Port, erkennt 'links' oder 'rechts',
-    extrahiert den Wert und schreibt ihn in eine CSV-Datei.
+    Liest ein oder mehrere Boards über den asyncio-Kern (siehe acquisition.py)
+    und gibt alle Samples an `sinks` (CSV, Pyramide, Kennzahlen, ... des Runs).
+    Mit `publish` werden die Samples zusätzlich über einen Unix-Socket an
+    Abonnenten verteilt (siehe sample_bus.py). Verbindungsaufbau und
+    Reconnects übernimmt der Kern. Mit `filters` (Spec wie in filters.py)
+    werden die Samples vor allen Sinks gefiltert, sonst bleiben sie roh.
+    Mit `stats_interval` erscheint alle so viele Sekunden eine Zeile mit den
+    Laufzeit-Kennzahlen (telemetry.py). `reorder_window` (Sekunden) sortiert
+    die Samples mehrerer Boards nach Zeitstempel (siehe acquisition.py).
+    Läuft bis Strg+C oder SIGTERM; danach werden alle bereits empfangenen
+    Samples noch geschrieben.
     """
-    global ser, connected, data_file_path
-
     if serial is None:
         print("Ohne 'serial'-Modul kann nichts gelesen werden.")
         return
 
-    # Warte, bis die serielle Verbindung aufgebaut ist
-    while not connected:
-        time.sleep(0.5)
-
-    print("[INFO] Starte das Einlesen der seriellen Daten...")
-
-    while True:
+    sinks = list(sinks)
+    if publish is not None:
+        from sample_bus import SamplePublisher
+        sinks.append(SamplePublisher(publish))
+
+    async def run():
+        core = AcquisitionCore(
+            configs, sinks, process=StreamFilter(filters) if filters else None, reorder_window=reorder_window
+        )
+        await core.start()
+        if os.name == "posix":
+            # Als Dienst beendet: genauso sauber herunterfahren wie bei Strg+C
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        stats = None
+        if stats_interval:
+            stats = asyncio.create_task(summary_loop(stats_interval))
         try:
-            if ser and ser.is_open and ser.in_waiting > 0:
-                line = ser.readline().decode("utf-8", errors="replace").strip()
-                if not line:
-                    continue
-
-                print(f"[DEBUG] Empfangen: {repr(line)}")
-
-                # Prüfe, ob die Zeile "links" oder "rechts" enthält
-                position = None
-                if "rechts" in line.lower():
-                    position = "Right"
-                elif "links" in line.lower():
-                    position = "Left"
-
-                if position:
-                    value = extract_float_from_line(line)
-                    if value is not None:
-                        timestamp = time.time()
-                        print(f"[INFO] Speichere: {timestamp}, {position}, {value}")
-
-                        # In CSV-Datei schreiben
-                        if data_file_path:
-                            with data_file_path.open("a", newline="") as csvfile:
-                                writer = csv.writer(csvfile)
-                                writer.writerow([timestamp, position, value])
-
-            else:
-                time.sleep(0.1)
-
-        except Exception as err:
-            print(f"[ERROR] Fehler beim Lesen der seriellen Daten: {err}")
-            time.sleep(1)
+            await core.wait()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await core.stop()
+            if stats is not None:
+                stats.cancel()
+
+    print(f"[INFO] Starte das Einlesen von {len(configs)} Board(s)...")
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
 
 
 def start_new_run(run_name: str) -> Path:
@@ -157,19 +133,124 @@ def main():
     parser.add_argument(
         "--run-name", default="", help="Optionaler Zusatzname für den Datenordner."
     )
+    parser.add_argument(
+        "--device",
+        action="append",
+        default=[],
+        metavar="NAME=PORT[,Left=..,Right=..]",
+        help="Mehrere Boards gleichzeitig lesen (mehrfach angeben). Ersetzt --port.",
+    )
+    parser.add_argument(
+        "--protocol",
+        choices=["text", "binary"],
+        default="text",
+        help="Protokoll der Firmware: Textzeilen oder binäre Frames (BINARY_PROTOCOL 1).",
+    )
+    parser.add_argument(
+        "--reorder-ms",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="Samples mehrerer Boards über dieses Fenster nach Zeitstempel sortieren "
+        f"(Standard: {REORDER_MS:g} bei mehreren binären Boards, sonst 0 = Empfangsreihenfolge).",
+    )
+    parser.add_argument(
+        "--publish",
+        type=Path,
+        default=None,
+        metavar="SOCKET",
+        help="Samples zusätzlich über einen Unix-Socket veröffentlichen (z.B. /tmp/waage.sock).",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Run zusätzlich im binären Spaltenformat schreiben (siehe run_format.py).",
+    )
+    parser.add_argument(
+        "--weight",
+        type=float,
+        default=None,
+        help="Körpergewicht in kg für die Online-Kennzahlen (Abweichung vom halben Gewicht).",
+    )
+    parser.add_argument(
+        "--filter",
+        default=None,
+        metavar="SPEC",
+        help='Samples vor dem Schreiben filtern, z.B. "range:max=500; hampel:window=7" (siehe filters.py). '
+        "Standard: Rohdaten.",
+    )
+    parser.add_argument(
+        "--stats",
+        type=float,
+        default=None,
+        metavar="SEKUNDEN",
+        help="Laufzeit-Kennzahlen (Zeilen, Fehler, Reconnects, Queues, Latenzen) regelmäßig ausgeben.",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Empfangene Samples stichprobenartig ausgeben (höchstens eine Meldung pro Sekunde).",
+    )
     args = parser.parse_args()
+    if args.stats:
+        REGISTRY.enable()
+    DEBUG_LOG.enabled = args.debug
+    if args.filter:
+        # Tippfehler melden, bevor ein leerer Run angelegt wird
+        try:
+            parse_spec(args.filter)
+        except (ValueError, TypeError, RuntimeError) as err:
+            parser.error(f"--filter: {err}")
 
     # 1. Neues Run-Verzeichnis anlegen und CSV-Datei vorbereiten
     global data_file_path
     data_file_path = start_new_run(args.run_name)
-
-    # 2. Thread für Verbindungsaufbau starten
-    threading.Thread(
-        target=connect_to_serial, args=(args.port, args.baudrate), daemon=True
-    ).start()
-
-    # 3. Serielle Daten einlesen (läuft in der Haupt-Thread)
-    read_serial()
+    sink = CsvSink(data_file_path).start()
+    pyramid = PyramidWriter(data_file_path)
+    metrics = OnlineMetrics(person_weight=args.weight)
+    metrics_sink = CsvSink(metrics_path(data_file_path), header=METRICS_COLUMNS, name="metrics").start()
+    sinks = [CsvRowSink(sink), PyramidSink(pyramid), MetricsSink(metrics, metrics_sink)]
+    columnar = None
+    if args.columnar:
+        columnar = ColumnarWriter(columnar_path(data_file_path), layout="long")
+        sinks.append(ColumnarSink(columnar))
+
+    # 2. Boards festlegen: ein Board über --port oder mehrere über --device
+    if args.device:
+        # Position enthält den Kanalnamen, z. B. "platte1/Left"
+        configs = [parse_device_spec(spec, args.baudrate, args.protocol) for spec in args.device]
+    else:
+        # Ein Board: Position bleibt "Left"/"Right" wie bisher
+        channels = {"Left": "Left", "Right": "Right"}
+        configs = [DeviceConfig(args.port, args.port, args.baudrate, channels, protocol=args.protocol)]
+
+    reorder_ms = args.reorder_ms
+    if reorder_ms is None:
+        # Textzeilen tragen die Empfangszeit und kommen schon in Zeitfolge an;
+        # binäre Boards mit eigener Uhr müssen gegeneinander sortiert werden
+        reorder_ms = REORDER_MS if args.protocol == "binary" and len(configs) > 1 else 0.0
+
+    # 3. Einlesen (asyncio-Schleife im Haupt-Thread)
+    try:
+        run_acquisition(configs, sinks, args.publish, args.filter, args.stats, reorder_ms / 1000.0)
+    finally:
+        # Ausstehende Zeilen schreiben und Datei sauber schließen
+        sink.stop()
+        metrics_sink.stop()
+        pyramid.close()
+        if columnar is not None:
+            # Erst nach sink.stop(): die CSV-Größe erkennt spätere Änderungen an der Datei
+            columnar.close(source_bytes=data_file_path.stat().st_size)
+        print(
+            f"[INFO] {sink.stats.rows_written} Zeilen ({sink.stats.bytes_written} Bytes) "
+            f"in {sink.stats.flushes} Flushes geschrieben."
+        )
+        snap = metrics.snapshot()
+        if snap.channels:
+            print(
+                f"[INFO] Asymmetrie (EWMA) {snap.asymmetry_ewma:+.3f}, "
+                f"Integral der Differenz {snap.integral_difference:.1f} kg*s."
+            )
 
 
 if __name__ == "__main__":
@@ -9,10 +9,42 @@
 #define DOUT_PIN_2 D7  // DOUT-Pin des HX711 (rechts)
 #define SCK_PIN_2  D5  // PD_SCK-Pin des HX711 (rechts)
 
+// Protokoll: 0 = Textzeilen ("Gewicht links: <x> kg"), 1 = binäre Frames
+// (Format siehe serial-read-out/binary_protocol.py)
+#define BINARY_PROTOCOL 0
+
 // HX711-Instanzen erstellen
 HX711 scale_left;
 HX711 scale_right;
 
+#if BINARY_PROTOCOL
+// Frame-Layout, little-endian, ohne Padding (19 Bytes)
+struct __attribute__((packed)) Frame {
+    uint16_t magic;   // 0x5AA5
+    uint16_t seq;     // laufender Zähler
+    uint32_t t_us;    // micros()
+    float left;       // [kg]
+    float right;      // [kg]
+    uint8_t flags;    // Bit 0: links bereit, Bit 1: rechts bereit
+    uint16_t crc;     // CRC-16/CCITT-FALSE über alle vorherigen Bytes
+};
+
+uint16_t frame_seq = 0;
+float last_left = 0.0f;
+float last_right = 0.0f;
+
+uint16_t crc16_ccitt(const uint8_t *data, size_t len) {
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < len; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (uint8_t b = 0; b < 8; b++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+#endif
+
 void setup() {
     // Seriellen Monitor starten
     Serial.begin(115200);
@@ -32,9 +64,36 @@ void setup() {
     scale_right.set_scale(15244.f);
     scale_right.tare(); // Nullpunkt setzen
 
+#if !BINARY_PROTOCOL
     Serial.println("HX711 ist bereit!");
+#endif
 }
 
+#if BINARY_PROTOCOL
+void loop() {
+    // Ohne Mittelung und ohne delay(): jede neue Wandlung wird sofort gesendet
+    Frame frame;
+    frame.magic = 0x5AA5;
+    frame.flags = 0;
+    if (scale_left.is_ready()) {
+        last_left = scale_left.get_units(1);
+        frame.flags |= 0x01;
+    }
+    if (scale_right.is_ready()) {
+        last_right = scale_right.get_units(1);
+        frame.flags |= 0x02;
+    }
+    if (frame.flags == 0) {
+        return;  // Noch keine neue Wandlung
+    }
+    frame.seq = frame_seq++;
+    frame.t_us = micros();
+    frame.left = last_left;
+    frame.right = last_right;
+    frame.crc = crc16_ccitt((const uint8_t *)&frame, sizeof(Frame) - sizeof(frame.crc));
+    Serial.write((const uint8_t *)&frame, sizeof(Frame));
+}
+#else
 void loop() {
     // Linke Zelle auslesen
     if (scale_left.is_ready()) {
@@ -58,3 +117,4 @@ void loop() {
 
     delay(500);
 }
+#endif